@@ -0,0 +1,160 @@
+"""
+action_history.py - Per-zone history of issued DRL actions
+
+Each zone gets a fixed-size ring buffer in one preallocated slab of arrays,
+so the store's memory is bounded by max_zones x capacity. The most recent
+entry fills the previous irrigation / fertilizer slots of the next state for
+that zone. Least recently used zones are evicted from memory; with an
+SQLite path configured they are reloaded from disk on their next call.
+SQLite keeps the same last capacity entries per zone, so the file is
+bounded by the number of zones rather than growing with every call.
+"""
+
+import numpy as np
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_CAPACITY = 30
+DEFAULT_MAX_ZONES = 50000
+
+
+class ActionHistoryStore:
+    """Bounded, thread-safe ring buffers of (irrigation_mm, fertilizer_kg) per zone id"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_zones: int = DEFAULT_MAX_ZONES,
+                 db_path: Optional[str] = None):
+        self.capacity = capacity
+        self.max_zones = max_zones
+
+        self._actions = np.zeros((max_zones, capacity, 2), dtype=np.int16)
+        self._timestamps = np.zeros((max_zones, capacity), dtype=np.float64)
+        self._heads = np.zeros(max_zones, dtype=np.int32)   # next write position
+        self._counts = np.zeros(max_zones, dtype=np.int32)
+
+        self._slots = OrderedDict()  # zone_id -> slot, in LRU order
+        self._free = list(range(max_zones - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        self.db_path = db_path
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS action_history ("
+                "zone_id TEXT NOT NULL, ts REAL NOT NULL, irrigation_mm INTEGER NOT NULL, "
+                "fertilizer_kg INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_action_history_zone ON action_history (zone_id, ts)")
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> "ActionHistoryStore":
+        """Build from DRL_HISTORY_CAPACITY, DRL_HISTORY_MAX_ZONES and DRL_HISTORY_DB"""
+        return cls(
+            capacity=int(os.getenv("DRL_HISTORY_CAPACITY", DEFAULT_CAPACITY)),
+            max_zones=int(os.getenv("DRL_HISTORY_MAX_ZONES", DEFAULT_MAX_ZONES)),
+            db_path=os.getenv("DRL_HISTORY_DB") or None,
+        )
+
+    def _slot(self, zone_id: str, create: bool) -> Optional[int]:
+        """Slot for a zone (caller holds the lock), loading it from SQLite if evicted"""
+        slot = self._slots.get(zone_id)
+        if slot is not None:
+            self._slots.move_to_end(zone_id)
+            return slot
+
+        rows = []
+        if self._db is not None:
+            rows = self._db.execute(
+                "SELECT ts, irrigation_mm, fertilizer_kg FROM action_history "
+                "WHERE zone_id = ? ORDER BY ts DESC, rowid DESC LIMIT ?",
+                (zone_id, self.capacity)
+            ).fetchall()[::-1]
+        if not rows and not create:
+            return None
+
+        if not self._free:
+            _, evicted = self._slots.popitem(last=False)
+            self._free.append(evicted)
+            self.evictions += 1
+        slot = self._free.pop()
+        self._slots[zone_id] = slot
+
+        count = len(rows)
+        if count:
+            self._timestamps[slot, :count] = [row[0] for row in rows]
+            self._actions[slot, :count] = [row[1:] for row in rows]
+        self._heads[slot] = count % self.capacity
+        self._counts[slot] = count
+        return slot
+
+    def last_actions(self, zone_ids: Sequence[Optional[str]]) -> np.ndarray:
+        """(n, 2) previous (irrigation_mm, fertilizer_kg) per zone; zeros when unknown"""
+        previous = np.zeros((len(zone_ids), 2), dtype=np.float64)
+        with self._lock:
+            for i, zone_id in enumerate(zone_ids):
+                if zone_id is None:
+                    continue
+                slot = self._slot(zone_id, create=False)
+                if slot is not None and self._counts[slot]:
+                    previous[i] = self._actions[slot, (self._heads[slot] - 1) % self.capacity]
+        return previous
+
+    def record(self, zone_ids: Sequence[Optional[str]], irrigation_mm: Sequence[int],
+               fertilizer_kg: Sequence[int], timestamp: Optional[float] = None) -> None:
+        """Append one issued action per zone (rows without a zone id are skipped)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        persisted = []
+        with self._lock:
+            for zone_id, irrigation, fertilizer in zip(zone_ids, irrigation_mm, fertilizer_kg):
+                if zone_id is None:
+                    continue
+                slot = self._slot(zone_id, create=True)
+                head = self._heads[slot]
+                self._actions[slot, head] = (irrigation, fertilizer)
+                self._timestamps[slot, head] = timestamp
+                self._heads[slot] = (head + 1) % self.capacity
+                self._counts[slot] = min(self._counts[slot] + 1, self.capacity)
+                persisted.append((zone_id, timestamp, int(irrigation), int(fertilizer)))
+
+            if self._db is not None and persisted:
+                self._db.executemany("INSERT INTO action_history VALUES (?, ?, ?, ?)", persisted)
+                # Drop rows that fell out of the zones' ring buffers
+                self._db.executemany(
+                    "DELETE FROM action_history WHERE zone_id = ? AND rowid NOT IN ("
+                    "SELECT rowid FROM action_history WHERE zone_id = ? ORDER BY ts DESC, rowid DESC LIMIT ?)",
+                    [(zone_id, zone_id, self.capacity) for zone_id in dict.fromkeys(row[0] for row in persisted)]
+                )
+                self._db.commit()
+
+    def history(self, zone_id: str) -> List[Dict]:
+        """Buffered actions for a zone, oldest first"""
+        with self._lock:
+            slot = self._slot(zone_id, create=False)
+            if slot is None:
+                return []
+            count, head = self._counts[slot], self._heads[slot]
+            order = [(head - count + i) % self.capacity for i in range(count)]
+            return [
+                {
+                    "timestamp": float(self._timestamps[slot, i]),
+                    "irrigation_mm": int(self._actions[slot, i, 0]),
+                    "fertilizer_kg": int(self._actions[slot, i, 1])
+                }
+                for i in order
+            ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "zones": len(self._slots),
+                "max_zones": self.max_zones,
+                "capacity_per_zone": self.capacity,
+                "evictions": self.evictions,
+                "persistent": self._db is not None,
+            }
@@ -7,33 +7,56 @@ app.py - Complete FastAPI Server for Agriculture AI Services
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import uuid
 from pydantic import BaseModel, Field
 from typing import Dict, Optional, List
 import uvicorn
-import shutil
 from pathlib import Path
 import os
 from groq import Groq
 from dotenv import load_dotenv
 import time
+import numpy as np
 
 # Load environment variables
 load_dotenv()
 
-# Import existing modules
-try:
-    from load_model import get_recommendation
-    DRL_AVAILABLE = True
-except ImportError:
-    print("⚠️  Warning: load_model.py not found. DRL recommendations disabled.")
-    DRL_AVAILABLE = False
-
-try:
-    from disease_detector import detect_disease
-    DISEASE_DETECTION_AVAILABLE = True
-except ImportError:
-    print("⚠️  Warning: disease_detector.py not found. Disease detection disabled.")
-    DISEASE_DETECTION_AVAILABLE = False
+# Import existing modules. Detection workers are spawned and re-import the launch
+# module (python app.py) as __mp_main__; they load disease_detector themselves with
+# their own ORT settings and must not load the DRL model, so skip both there.
+DRL_AVAILABLE = False
+DISEASE_DETECTION_AVAILABLE = False
+if __name__ != "__mp_main__":
+    try:
+        from load_model import get_recommendations_batch, DRL_BACKEND, STATE_FIELDS, recommendation_cache, action_history
+        from recommendation_batcher import MicroBatcher
+        # Single /recommend calls are micro-batched on a worker thread, off the event loop
+        recommendation_batcher = MicroBatcher.from_env(get_recommendations_batch)
+        from season_simulator import simulate_seasons
+        from recommendation_view import RecommendationView
+        # Latest recommendation per zone, recomputed incrementally on soil/weather updates
+        recommendation_view = RecommendationView()
+        DRL_AVAILABLE = True
+    except ImportError:
+        print("⚠️  Warning: load_model.py not found. DRL recommendations disabled.")
+        DRL_AVAILABLE = False
+
+    try:
+        from disease_detector import detector_status, generate_treatment_async, resolve_language, summarize_visit
+        from detection_pool import DetectionPool, QueueFullError
+        from treatment_jobs import TreatmentJobs
+        detection_pool = DetectionPool.from_env()
+        # Treatment reports of deferred detections, generated on this event loop
+        treatment_jobs = TreatmentJobs.from_env(generate_treatment_async)
+        DISEASE_DETECTION_AVAILABLE = True
+    except ImportError:
+        print("⚠️  Warning: disease_detector.py not found. Disease detection disabled.")
+        DISEASE_DETECTION_AVAILABLE = False
 
 # Initialize Groq client
 GROQ_API_KEY = ""
@@ -44,11 +67,22 @@ else:
     print("⚠️  Warning: GROQ_API_KEY not found. Voice assistant disabled.")
     VOICE_ASSISTANT_AVAILABLE = False
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Spawn the detection workers (each loads its own model) before serving"""
+    if DISEASE_DETECTION_AVAILABLE:
+        await run_in_threadpool(detection_pool.start)
+    yield
+    if DISEASE_DETECTION_AVAILABLE:
+        treatment_jobs.shutdown()
+        detection_pool.shutdown()
+
 # Initialize FastAPI
 app = FastAPI(
     title="Agriculture AI API",
     description="Complete AI solution for farmers: DRL recommendations, Disease detection, Voice assistant",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -69,6 +103,24 @@ app.add_middleware(
 UPLOAD_DIR = Path("./uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Upload limits for /detect-disease (read in chunks, never written to disk)
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 256 * 1024
+
+# Limits for /detect-disease/batch (one scouting visit)
+MAX_DETECT_BATCH_FILES = 100
+MAX_DETECT_BATCH_BYTES = 200 * 1024 * 1024
+
+# /detect-disease/video uploads are streamed to UPLOAD_DIR in chunks, up to this size
+MAX_VIDEO_BYTES = int(os.getenv("MAX_VIDEO_MB", 2048)) * 1024 * 1024
+
+# Maximum number of zones accepted by /recommend/batch
+MAX_RECOMMEND_BATCH_SIZE = 10000
+
+# Limits for /recommend/simulate
+MAX_SIMULATION_DAYS = 366
+MAX_SIMULATION_FIELD_DAYS = 2_000_000
+
 
 # ============================================================
 # PYDANTIC MODELS
@@ -85,6 +137,51 @@ class SoilDataInput(BaseModel):
     temp: float = Field(..., ge=-10, le=50, description="Temperature (°C)")
     humidity: float = Field(..., ge=0, le=100, description="Humidity percentage")
     rain_prob: float = Field(..., ge=0.0, le=1.0, description="Rain probability (0-1)")
+    zone_id: Optional[str] = Field(None, max_length=128,
+                                   description="Zone id; its previous action is fed back into the model")
+
+
+class SoilDataBatchInput(BaseModel):
+    """DRL Model Batch Input (e.g. every zone of every field)"""
+    items: List[SoilDataInput] = Field(..., min_length=1, max_length=MAX_RECOMMEND_BATCH_SIZE,
+                                       description="Soil readings, one per zone")
+
+
+class ZoneStateInput(SoilDataInput):
+    """Latest readings for a materialized zone"""
+    zone_id: str = Field(..., min_length=1, max_length=128, description="Zone id")
+    location: str = Field(..., min_length=1, max_length=200, description="Location used for weather updates")
+
+
+class ZoneStateBatchInput(BaseModel):
+    """Zones to register or update"""
+    items: List[ZoneStateInput] = Field(..., min_length=1, max_length=MAX_RECOMMEND_BATCH_SIZE)
+
+
+class WeatherUpdateInput(BaseModel):
+    """Weather delta for every zone at a location (omitted values are unchanged)"""
+    location: str = Field(..., min_length=1, max_length=200)
+    temp: Optional[float] = Field(None, ge=-10, le=50, description="Temperature (°C)")
+    humidity: Optional[float] = Field(None, ge=0, le=100, description="Humidity percentage")
+    rain_prob: Optional[float] = Field(None, ge=0.0, le=1.0, description="Rain probability (0-1)")
+
+
+class WeatherDay(BaseModel):
+    """One day of a weather trajectory"""
+    temp: float = Field(..., ge=-10, le=50, description="Temperature (°C)")
+    humidity: float = Field(..., ge=0, le=100, description="Humidity percentage")
+    rain_prob: float = Field(..., ge=0.0, le=1.0, description="Rain probability (0-1)")
+    rain_mm: Optional[float] = Field(None, ge=0, description="Observed/forecast rainfall (mm)")
+
+
+class SeasonSimulationInput(BaseModel):
+    """What-if season simulation for many fields"""
+    fields: List[SoilDataInput] = Field(..., min_length=1, description="Starting soil readings, one per field")
+    weather: Optional[List[WeatherDay]] = Field(None, min_length=1, max_length=MAX_SIMULATION_DAYS,
+                                                description="Daily weather shared by all fields")
+    field_weather: Optional[List[List[WeatherDay]]] = Field(None, description="Daily weather per field")
+    stochastic: bool = Field(False, description="Sample rain/evaporation like the training environment")
+    seed: Optional[int] = Field(None, description="Random seed for stochastic runs")
 
 
 class FieldContext(BaseModel):
@@ -139,7 +236,13 @@ async def root():
             "health": "/health",
             "docs": "/docs",
             "drl_recommendation": "/recommend" if DRL_AVAILABLE else "disabled",
+            "drl_recommendation_batch": "/recommend/batch" if DRL_AVAILABLE else "disabled",
+            "drl_season_simulation": "/recommend/simulate" if DRL_AVAILABLE else "disabled",
+            "drl_zone_changes": "/recommend/zones/changes" if DRL_AVAILABLE else "disabled",
             "disease_detection": "/detect-disease" if DISEASE_DETECTION_AVAILABLE else "disabled",
+            "disease_detection_batch": "/detect-disease/batch" if DISEASE_DETECTION_AVAILABLE else "disabled",
+            "disease_treatment": "/detect-disease/treatment/{treatment_id}" if DISEASE_DETECTION_AVAILABLE else "disabled",
+            "disease_detection_video": "/detect-disease/video" if DISEASE_DETECTION_AVAILABLE else "disabled",
             "voice_assistant": "/voice-assistant/ask" if VOICE_ASSISTANT_AVAILABLE else "disabled",
             "field_analysis": "/voice-assistant/analyze-field" if VOICE_ASSISTANT_AVAILABLE else "disabled"
         },
@@ -161,9 +264,17 @@ async def health_check():
         },
         "configuration": {
             "groq_api_configured": bool(GROQ_API_KEY),
+            "drl_backend": DRL_BACKEND if DRL_AVAILABLE else None,
             "upload_dir": str(UPLOAD_DIR),
             "cors_enabled": True
-        }
+        },
+        "drl_cache": recommendation_cache.stats() if DRL_AVAILABLE else None,
+        "drl_batching": recommendation_batcher.stats() if DRL_AVAILABLE else None,
+        "drl_action_history": action_history.stats() if DRL_AVAILABLE else None,
+        "drl_zone_view": recommendation_view.stats() if DRL_AVAILABLE else None,
+        "detector_models": detector_status(detection_pool.worker_environment()) if DISEASE_DETECTION_AVAILABLE else None,
+        "detector_pool": detection_pool.stats() if DISEASE_DETECTION_AVAILABLE else None,
+        "treatment_jobs": treatment_jobs.stats() if DISEASE_DETECTION_AVAILABLE else None
     }
 
 
@@ -189,17 +300,7 @@ async def get_irrigation_recommendation(data: SoilDataInput) -> Dict:
         )
     
     try:
-        recommendation = get_recommendation(
-            moisture=data.moisture,
-            nitrogen=data.nitrogen,
-            phosphorus=data.phosphorus,
-            potassium=data.potassium,
-            ph=data.ph,
-            growth=data.growth,
-            temp=data.temp,
-            humidity=data.humidity,
-            rain_prob=data.rain_prob
-        )
+        recommendation = await recommendation_batcher.recommend(data.model_dump())
         return {
             "success": True,
             "timestamp": time.time(),
@@ -212,12 +313,227 @@ async def get_irrigation_recommendation(data: SoilDataInput) -> Dict:
         )
 
 
+@app.post("/recommend/batch", tags=["DRL Recommendations"])
+async def get_irrigation_recommendations_batch(data: SoilDataBatchInput) -> Dict:
+    """
+    Get irrigation and fertilizer recommendations for many zones at once
+
+    All rows are stacked into one observation matrix and run through the
+    DRL model in a single forward pass.
+
+    Returns:
+    - One recommendation per input row, in the same order
+    """
+    if not DRL_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="DRL recommendation service not available. load_model.py not found."
+        )
+
+    try:
+        recommendations = await run_in_threadpool(
+            get_recommendations_batch, [item.model_dump() for item in data.items]
+        )
+        return {
+            "success": True,
+            "timestamp": time.time(),
+            "count": len(recommendations),
+            "recommendations": recommendations
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"DRL model error: {str(e)}"
+        )
+
+
+@app.put("/recommend/zones", tags=["DRL Recommendations"])
+async def upsert_zone_states(data: ZoneStateBatchInput) -> Dict:
+    """
+    Register or update zones in the materialized recommendation view
+
+    The given zones are recomputed in one batch.
+
+    Returns:
+    - How many zones were updated and how many recommendations changed
+    - The current change cursor
+    """
+    if not DRL_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="DRL recommendation service not available. load_model.py not found."
+        )
+
+    try:
+        update = await run_in_threadpool(
+            recommendation_view.upsert_zones, [item.model_dump() for item in data.items]
+        )
+        return {"success": True, "timestamp": time.time(), **update}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"DRL model error: {str(e)}"
+        )
+
+
+@app.post("/recommend/zones/weather", tags=["DRL Recommendations"])
+async def apply_zone_weather(data: WeatherUpdateInput) -> Dict:
+    """
+    Apply a weather update to every zone at a location
+
+    Only zones whose state actually changes are recomputed, in one batch.
+    """
+    if not DRL_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="DRL recommendation service not available. load_model.py not found."
+        )
+
+    try:
+        update = await run_in_threadpool(
+            recommendation_view.apply_weather, data.location,
+            temp=data.temp, humidity=data.humidity, rain_prob=data.rain_prob
+        )
+        return {"success": True, "timestamp": time.time(), **update}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"DRL model error: {str(e)}"
+        )
+
+
+@app.get("/recommend/zones/changes", tags=["DRL Recommendations"])
+async def get_zone_changes(since: int = 0, limit: Optional[int] = None) -> Dict:
+    """
+    Zones whose recommendation changed after the given cursor
+
+    Pass the returned cursor as `since` on the next poll.
+    """
+    if not DRL_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="DRL recommendation service not available. load_model.py not found."
+        )
+
+    changes = recommendation_view.changes_since(since, limit)
+    return {"success": True, "timestamp": time.time(), **changes}
+
+
+def _run_season_simulation(data: SeasonSimulationInput) -> Dict:
+    """Stack the request into arrays, simulate, and build per-field trajectories"""
+    initial = np.array([[getattr(f, name) for name in STATE_FIELDS] for f in data.fields])
+    weather = data.field_weather if data.field_weather is not None else [data.weather] * len(data.fields)
+
+    def column(name):
+        return np.array([[getattr(day, name) for day in days] for days in weather], dtype=np.float64)
+
+    has_rain_mm = all(day.rain_mm is not None for days in weather for day in days)
+    trajectory = simulate_seasons(
+        initial, column("temp"), column("humidity"), column("rain_prob"),
+        rain_mm=column("rain_mm") if has_rain_mm else None,
+        stochastic=data.stochastic, seed=data.seed
+    )
+
+    irrigation = trajectory["irrigation_mm"]
+    fertilizer = trajectory["fertilizer_kg"]
+    health = trajectory["health"]
+    results = [
+        {
+            "irrigation_mm": irrigation[i].astype(int).tolist(),
+            "fertilizer_kg": fertilizer[i].astype(int).tolist(),
+            "health": np.round(health[i], 2).tolist(),
+            "total_water_mm": int(irrigation[i].sum()),
+            "total_fertilizer_kg": int(fertilizer[i].sum()),
+            "mean_health": round(float(health[i].mean()), 2)
+        }
+        for i in range(len(data.fields))
+    ]
+    return {
+        "fields": results,
+        "summary": {
+            "total_water_mm": int(irrigation.sum()),
+            "total_fertilizer_kg": int(fertilizer.sum()),
+            "mean_health": round(float(health.mean()), 2)
+        }
+    }
+
+
+@app.post("/recommend/simulate", tags=["DRL Recommendations"])
+async def simulate_irrigation_season(data: SeasonSimulationInput) -> Dict:
+    """
+    Simulate a whole season of DRL recommendations for many fields
+
+    The policy is rolled forward day by day over the supplied weather, with
+    its previous actions fed back into the state.
+
+    Returns:
+    - Daily irrigation, fertilizer and health trajectory per field
+    - Season totals per field and for all fields
+    """
+    if not DRL_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="DRL recommendation service not available. load_model.py not found."
+        )
+
+    if (data.weather is None) == (data.field_weather is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of weather or field_weather")
+
+    if data.field_weather is not None:
+        if len(data.field_weather) != len(data.fields):
+            raise HTTPException(status_code=400, detail="field_weather must have one trajectory per field")
+        days = {len(trajectory) for trajectory in data.field_weather}
+        if len(days) != 1 or not 1 <= days.pop() <= MAX_SIMULATION_DAYS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"All field_weather trajectories must have the same length (1-{MAX_SIMULATION_DAYS} days)"
+            )
+
+    days = len(data.weather) if data.weather is not None else len(data.field_weather[0])
+    if len(data.fields) * days > MAX_SIMULATION_FIELD_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Simulation too large: at most {MAX_SIMULATION_FIELD_DAYS} field-days per request"
+        )
+
+    try:
+        simulation = await run_in_threadpool(_run_season_simulation, data)
+        return {
+            "success": True,
+            "timestamp": time.time(),
+            "days": days,
+            **simulation
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"DRL simulation error: {str(e)}"
+        )
+
+
 # ============================================================
 # DISEASE DETECTION ENDPOINT
 # ============================================================
 
+async def read_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytearray:
+    """Read an upload in chunks, rejecting it as soon as it exceeds max_bytes"""
+    data = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return data
+        data += chunk
+        if len(data) > max_bytes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File size must be less than {max_bytes // (1024 * 1024)}MB"
+            )
+
+
 @app.post("/detect-disease", tags=["Disease Detection"])
-async def detect_crop_disease(file: UploadFile = File(...)):
+async def detect_crop_disease(file: UploadFile = File(...), return_all: bool = False,
+                              variant: Optional[str] = None, input_size: Optional[int] = None,
+                              language: Optional[str] = None, defer_treatment: bool = False):
     """
     Upload crop/leaf image and get AI disease detection results
     
@@ -230,6 +546,21 @@ async def detect_crop_disease(file: UploadFile = File(...)):
     - Confidence score
     - Severity level
     - Treatment recommendations (powered by Groq LLM)
+    - With return_all=true, every detection (crop, disease, confidence, bbox)
+    
+    Optional: variant (e.g. fp32, int8) and input_size (320/480/640) select a
+    cheaper model or resolution for this request; language (Hinglish, English,
+    Hindi, Marathi) the treatment plan language
+    
+    With defer_treatment=true the detection is returned right after
+    inference. Unless its treatment is already cached, the response has
+    treatment_pending=true and a treatment_id: stream the summary and plan
+    from /detect-disease/treatment/{treatment_id}/stream (Server-Sent Events)
+    or fetch them from /detect-disease/treatment/{treatment_id}.
+    
+    Blurry, badly exposed or non-plant photos are rejected with 400 and
+    detail {"error": message, "rejected": too_dark | overexposed | blurry |
+    no_vegetation, "quality": sharpness, brightness, vegetation, width, height}.
     """
     if not DISEASE_DETECTION_AVAILABLE:
         raise HTTPException(
@@ -245,34 +576,27 @@ async def detect_crop_disease(file: UploadFile = File(...)):
                 detail="File must be an image (JPEG, PNG, JPG)"
             )
         
-        # Check file size (10MB limit)
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        if file_size > 10 * 1024 * 1024:
-            raise HTTPException(
-                status_code=400,
-                detail="File size must be less than 10MB"
-            )
-        
-        # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Run disease detection
-        result = detect_disease(str(file_path))
+        # Read the upload into memory, enforcing the 10MB limit as it streams in
+        data = await read_upload(file)
         
-        # Clean up uploaded file
-        try:
-            file_path.unlink()
-        except:
-            pass
+        # Run disease detection in the worker pool, off the event loop
+        result = await detection_pool.run(
+            "detect_disease_bytes", data, return_all=return_all, variant=variant, input_size=input_size,
+            language=language, defer_treatment=defer_treatment
+        )
         
+        if "rejected" in result:
+            # Quality gate: tell the client what to fix (reason, message and the measured metrics)
+            raise HTTPException(status_code=400, detail={key: result[key] for key in ("error", "rejected", "quality")})
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
         
+        if result.get("treatment_pending"):
+            treatment_id = treatment_jobs.submit(result, resolve_language(language))
+            result["treatment_id"] = treatment_id
+            result["treatment_url"] = f"/detect-disease/treatment/{treatment_id}"
+            result["treatment_stream_url"] = f"/detect-disease/treatment/{treatment_id}/stream"
+        
         return {
             "success": True,
             "timestamp": time.time(),
@@ -281,6 +605,12 @@ async def detect_crop_disease(file: UploadFile = File(...)):
         
     except HTTPException:
         raise
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Disease detection is at capacity. Please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -288,6 +618,266 @@ async def detect_crop_disease(file: UploadFile = File(...)):
         )
 
 
+@app.post("/detect-disease/batch", tags=["Disease Detection"])
+async def detect_crop_disease_batch(files: List[UploadFile] = File(...), return_all: bool = False,
+                                    variant: Optional[str] = None, input_size: Optional[int] = None,
+                                    language: Optional[str] = None):
+    """
+    Upload all leaf images of a scouting visit and detect diseases in one call
+    
+    Images are preprocessed in parallel and run through the model as one
+    batch. Each image gets the same fields as /detect-disease (or an error),
+    in upload order; treatment plans are generated once per diagnosis.
+    
+    Max: 100 images, 10MB each, 200MB in total
+    
+    Returns:
+    - results: per-image detection results with their filename
+    - summary: images processed, healthy/diseased counts, crops found and
+      diagnoses with image counts and the worst severity seen
+    """
+    if not DISEASE_DETECTION_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="Disease detection service not available. disease_detector.py not found."
+        )
+    
+    if len(files) > MAX_DETECT_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_DETECT_BATCH_FILES} images per batch"
+        )
+    
+    try:
+        # Read every upload; invalid ones become per-image errors instead of failing the visit
+        results = [None] * len(files)
+        images, positions = [], []
+        total_bytes = 0
+        for i, file in enumerate(files):
+            if not (file.content_type or "").startswith("image/"):
+                results[i] = {"error": "File must be an image (JPEG, PNG, JPG)"}
+                continue
+            try:
+                data = await read_upload(file)
+            except HTTPException as e:
+                results[i] = {"error": e.detail}
+                continue
+            total_bytes += len(data)
+            if total_bytes > MAX_DETECT_BATCH_BYTES:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Batch size must be less than {MAX_DETECT_BATCH_BYTES // (1024 * 1024)}MB"
+                )
+            images.append(data)
+            positions.append(i)
+        
+        model = None
+        if images:
+            batch = await detection_pool.run(
+                "detect_disease_batch", images, return_all=return_all, variant=variant, input_size=input_size,
+                language=language
+            )
+            if "error" in batch:
+                raise HTTPException(status_code=400, detail=batch["error"])
+            for i, result in zip(positions, batch["results"]):
+                results[i] = result
+            model = batch["model"]
+        
+        return {
+            "success": True,
+            "timestamp": time.time(),
+            "results": [{"filename": file.filename, **result} for file, result in zip(files, results)],
+            "summary": summarize_visit(results),
+            "model": model
+        }
+        
+    except HTTPException:
+        raise
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Disease detection is at capacity. Please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Disease detection error: {str(e)}"
+        )
+
+
+async def save_upload(file: UploadFile, path: Path, max_bytes: int) -> int:
+    """Stream an upload to path in chunks, rejecting it as soon as it exceeds max_bytes"""
+    size = 0
+    with open(path, "wb") as out:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                return size
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"File size must be less than {max_bytes // (1024 * 1024)}MB"
+                )
+            await run_in_threadpool(out.write, chunk)
+
+
+@app.post("/detect-disease/video", tags=["Disease Detection"])
+async def detect_crop_disease_video(file: UploadFile = File(...), return_all: bool = False,
+                                    variant: Optional[str] = None, input_size: Optional[int] = None,
+                                    min_interval: float = 0.5, max_interval: float = 5.0,
+                                    diff_threshold: float = 8.0, treatment: bool = False,
+                                    language: Optional[str] = None):
+    """
+    Upload drone or fixed-camera video and stream disease detections
+    
+    Frames are sampled adaptively (at most one per min_interval seconds,
+    near-duplicates skipped, at least one per max_interval) and run through
+    the detector in batches in the worker pool.
+    
+    Max size: MAX_VIDEO_MB (default 2048MB)
+    
+    Returns (application/x-ndjson, one JSON object per line as frames are
+    processed):
+    - {"type": "frame", "frame", "time", ...}: detection fields per sampled frame
+    - {"type": "summary", ...}: video stats and diagnoses deduplicated across
+      frames (frames, first/last seen, segments, worst severity); with
+      treatment=true each diagnosis includes its treatment plan
+    """
+    if not DISEASE_DETECTION_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="Disease detection service not available. disease_detector.py not found."
+        )
+    
+    if not (file.content_type or "").startswith("video/"):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be a video (MP4, MOV, AVI)"
+        )
+    
+    job = uuid.uuid4().hex
+    video_path = UPLOAD_DIR / f"video_{job}{Path(file.filename or '').suffix}"
+    output_path = UPLOAD_DIR / f"video_{job}.jsonl"
+    cancel_path = UPLOAD_DIR / f"video_{job}.cancel"
+    
+    def cleanup():
+        video_path.unlink(missing_ok=True)
+        output_path.unlink(missing_ok=True)
+        cancel_path.unlink(missing_ok=True)
+    
+    def cleanup_after(finished):
+        if not finished.cancelled():
+            finished.exception()  # retrieved, so a failed run is not logged as unhandled
+        cleanup()
+    
+    try:
+        await save_upload(file, video_path, MAX_VIDEO_BYTES)
+        output_path.touch()
+        
+        # The worker appends JSONL records to output_path while this request tails it
+        task = asyncio.create_task(detection_pool.run(
+            "video_detector.detect_video_file", str(video_path), str(output_path), str(cancel_path),
+            return_all=return_all,
+            variant=variant, input_size=input_size, min_interval=min_interval, max_interval=max_interval,
+            diff_threshold=diff_threshold, treatment=treatment, language=language
+        ))
+        await asyncio.sleep(0)
+        if task.done() and isinstance(task.exception(), QueueFullError):
+            raise task.exception()
+    except HTTPException:
+        cleanup()
+        raise
+    except QueueFullError:
+        cleanup()
+        raise HTTPException(
+            status_code=503,
+            detail="Disease detection is at capacity. Please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        cleanup()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Disease detection error: {str(e)}"
+        )
+    
+    async def records():
+        try:
+            with open(output_path, "r", encoding="utf-8") as output:
+                pending = ""
+                while True:
+                    line = output.readline()
+                    if line:
+                        pending += line
+                        if pending.endswith("\n"):
+                            yield pending
+                            pending = ""
+                    elif task.done():
+                        break
+                    else:
+                        await asyncio.sleep(0.1)
+            try:
+                summary = await task
+            except Exception as e:
+                summary = {"type": "summary", "error": f"Disease detection error: {str(e)}"}
+            if summary is not None and "error" in summary:
+                yield json.dumps(summary) + "\n"
+        finally:
+            if task.done():
+                cleanup()
+            else:
+                # Client disconnected: the worker stops after its current frame and frees its
+                # pool slot; the files are removed once it has
+                cancel_path.touch()
+                task.add_done_callback(cleanup_after)
+    
+    return StreamingResponse(records(), media_type="application/x-ndjson")
+
+
+@app.get("/detect-disease/treatment/{treatment_id}", tags=["Disease Detection"])
+async def get_deferred_treatment(treatment_id: str, wait: float = 0):
+    """
+    Treatment of a /detect-disease?defer_treatment=true request
+    
+    status is "pending" until the report is ready, then "done" with
+    quick_summary, treatment_plan and treatment_sections. wait (seconds, up
+    to 30) holds the request until the report is ready.
+    """
+    if not DISEASE_DETECTION_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="Disease detection service not available. disease_detector.py not found."
+        )
+    
+    job = await treatment_jobs.wait(treatment_id, min(max(wait, 0), 30))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired treatment_id")
+    return job
+
+
+@app.get("/detect-disease/treatment/{treatment_id}/stream", tags=["Disease Detection"])
+async def stream_deferred_treatment(treatment_id: str):
+    """
+    Server-Sent Events for a deferred treatment: "summary", "plan", then
+    "done" (or "error")
+    """
+    if not DISEASE_DETECTION_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="Disease detection service not available. disease_detector.py not found."
+        )
+    
+    if treatment_jobs.get(treatment_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired treatment_id")
+    return StreamingResponse(
+        treatment_jobs.stream(treatment_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ============================================================
 # VOICE ASSISTANT ENDPOINTS
 # ============================================================
@@ -558,11 +1148,17 @@ if __name__ == "__main__":
     
     if DRL_AVAILABLE:
         print("  ✓ DRL Recommendations: POST /recommend")
+        print("  ✓ DRL Batch Recommendations: POST /recommend/batch")
+        print("  ✓ DRL Season Simulation: POST /recommend/simulate")
+        print("  ✓ DRL Zone View: PUT /recommend/zones, POST /recommend/zones/weather, GET /recommend/zones/changes")
     else:
         print("  ✗ DRL Recommendations: DISABLED (load_model.py not found)")
     
     if DISEASE_DETECTION_AVAILABLE:
         print("  ✓ Disease Detection: POST /detect-disease")
+        print("  ✓ Disease Detection (batch): POST /detect-disease/batch")
+        print("  ✓ Deferred Treatment: GET /detect-disease/treatment/{id}[/stream]")
+        print("  ✓ Disease Detection (video): POST /detect-disease/video")
     else:
         print("  ✗ Disease Detection: DISABLED (disease_detector.py not found)")
     
@@ -0,0 +1,111 @@
+"""
+bench_nms.py - Detector post-processing on dense YOLO outputs
+
+Compares the original path (threshold, then the class-agnostic Python-loop
+nms over every candidate) with decode_predictions' top-k prefilter plus
+class-aware batched_nms. Also checks that batched_nms reproduces the
+original nms exactly when run class-agnostic without a top-k limit.
+
+Usage (from python-drl/):
+    python benchmarks/bench_nms.py [--iterations 20]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from disease_detector import xywh2xyxy  # noqa: E402
+from postprocess import DEFAULT_TOP_K, batched_nms, decode_predictions  # noqa: E402
+
+NUM_CLASSES = 29
+NUM_ANCHORS = 8400
+CONFIDENCE_THRESHOLD = 0.20
+
+
+def nms(boxes, scores, iou_threshold=0.45):
+    """The original class-agnostic greedy NMS, one Python iteration per kept box"""
+    if len(boxes) == 0:
+        return []
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        w = np.maximum(0.0, xx2 - xx1)
+        h = np.maximum(0.0, yy2 - yy1)
+        inter = w * h
+        iou = inter / (areas[i] + areas[order[1:]] - inter)
+        inds = np.where(iou <= iou_threshold)[0]
+        order = order[inds + 1]
+    return keep
+
+
+def dense_output(candidate_fraction, rng):
+    """Synthetic (4 + classes, anchors) output with clustered boxes"""
+    centers = rng.uniform(64, 576, (24, 2))
+    cluster = rng.integers(0, len(centers), NUM_ANCHORS)
+    xy = centers[cluster] + rng.normal(0, 12, (NUM_ANCHORS, 2))
+    wh = rng.uniform(40, 160, (NUM_ANCHORS, 2))
+    scores = rng.uniform(0, 0.05, (NUM_CLASSES, NUM_ANCHORS))
+    dense = rng.random(NUM_ANCHORS) < candidate_fraction
+    scores[(cluster % NUM_CLASSES)[dense], np.flatnonzero(dense)] = rng.uniform(0.2, 0.95, dense.sum())
+    return np.vstack([xy.T, wh.T, scores]).astype(np.float32)
+
+
+def legacy(output):
+    predictions = output.T
+    max_scores = predictions[:, 4:].max(axis=1)
+    class_ids = predictions[:, 4:].argmax(axis=1)  # computed (and filtered) by the original too
+    mask = max_scores >= CONFIDENCE_THRESHOLD
+    boxes = xywh2xyxy(predictions[mask, :4])
+    class_ids = class_ids[mask]
+    return nms(boxes, max_scores[mask])
+
+
+def vectorized(output, top_k=DEFAULT_TOP_K, class_agnostic=False):
+    boxes, scores, class_ids = decode_predictions(output, CONFIDENCE_THRESHOLD, top_k)
+    return batched_nms(xywh2xyxy(boxes), scores, class_ids, class_agnostic=class_agnostic, max_detections=None)
+
+
+def timed(fn, output, iterations):
+    fn(output)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(output)
+    return (time.perf_counter() - started) * 1000 / iterations
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'candidates':>10} | {'legacy ms':>9} | {'top-k + batched ms':>18} | {'speedup':>7} | agnostic parity")
+    print("-" * 70)
+    for fraction in (0.01, 0.05, 0.2, 0.5, 1.0):
+        output = dense_output(fraction, rng)
+        candidates = int((output[4:].max(axis=0) >= CONFIDENCE_THRESHOLD).sum())
+
+        legacy_ms = timed(legacy, output, args.iterations)
+        new_ms = timed(vectorized, output, args.iterations)
+
+        # Same boxes in the same order as the original when class-agnostic and unlimited
+        _, scores, _ = decode_predictions(output, CONFIDENCE_THRESHOLD, None)
+        legacy_scores = output[4:].max(axis=0)
+        legacy_scores = legacy_scores[legacy_scores >= CONFIDENCE_THRESHOLD]
+        parity = np.array_equal(legacy_scores[legacy(output)], scores[vectorized(output, None, True)])
+
+        print(f"{candidates:>10} | {legacy_ms:9.2f} | {new_ms:18.2f} | {legacy_ms / new_ms:6.1f}x | {parity}")
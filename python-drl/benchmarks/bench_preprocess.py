@@ -0,0 +1,92 @@
+"""
+bench_preprocess.py - Per-image time and allocations of detector preprocessing
+
+Compares the legacy allocating preprocess_array path (kept here as the
+reference implementation) with letterbox_into writing into the reusable
+per-thread input buffer.
+
+Usage (from python-drl/):
+    python benchmarks/bench_preprocess.py [--iterations 200]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from disease_detector import INPUT_SIZE, get_input_buffer, letterbox_into  # noqa: E402
+
+IMAGE_SHAPES = [(3000, 4000), (1080, 1920), (750, 1000), (480, 640)]
+
+
+def letterbox(img, new_shape=(640, 640), color=(114, 114, 114)):
+    shape = img.shape[:2]
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]
+    dw /= 2
+    dh /= 2
+    if shape[::-1] != new_unpad:
+        img = cv2.resize(img, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return img, r, (dw, dh)
+
+
+def preprocess_array(img, input_size=INPUT_SIZE):
+    """Legacy detector preprocessing: a new array at every step"""
+    original_shape = img.shape[:2]
+    img_resized = letterbox(img, new_shape=(input_size, input_size))[0]
+    img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
+    img_normalized = img_rgb.astype(np.float32) / 255.0
+    img_transposed = np.transpose(img_normalized, (2, 0, 1))
+    img_batch = np.expand_dims(img_transposed, axis=0)
+    return img_batch, img, original_shape
+
+
+def run_legacy(img):
+    preprocess_array(img, INPUT_SIZE)
+
+
+def run_fused(img):
+    letterbox_into(img, get_input_buffer(INPUT_SIZE)[0])
+
+
+def measure(fn, img, iterations):
+    fn(img)  # warm up (and allocate the reusable buffers once)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(img)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+
+    # NumPy (and OpenCV's NumPy-backed outputs) report their buffers to tracemalloc
+    tracemalloc.start()
+    fn(img)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed_ms, peak
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'image':>10} | {'path':>7} | {'ms/image':>9} | {'peak allocated':>15}")
+    print("-" * 51)
+    for height, width in IMAGE_SHAPES:
+        img = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        for name, fn in (("legacy", run_legacy), ("fused", run_fused)):
+            elapsed_ms, peak = measure(fn, img, args.iterations)
+            print(f"{f'{width}x{height}':>10} | {name:>7} | {elapsed_ms:9.3f} | {peak / 1024:12.1f} KB")
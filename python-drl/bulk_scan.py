@@ -0,0 +1,291 @@
+"""
+bulk_scan.py - Bulk disease detection over image archives
+
+Scans folders, globs and files in chunks: the next chunk's files are read
+on a thread pool while the current one runs through detect_disease_batch
+(parallel decode/letterbox, batched inference, one treatment plan per
+diagnosis unless --no-treatment). Results are written as each chunk
+finishes, as JSONL or as a Parquet dataset (one part file per chunk,
+needs pyarrow), and every finished path is appended to a checkpoint file,
+so an interrupted scan resumes where it stopped. Paths already in the
+output count as done too, so a crash between writing a chunk and
+checkpointing it doesn't write the chunk twice. Throughput is reported
+at the end.
+
+Usage (from python-drl/):
+    python disease_detector.py ./archive --output results.jsonl --no-treatment
+    python disease_detector.py "./visits/**/*.jpg" --output results.parquet
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from disease_detector import DEFAULT_LANGUAGE, IMAGE_EXTENSIONS, PREPROCESS_WORKERS, detect_disease_batch
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DEFAULT_CHUNK_SIZE = 256
+GLOB_CHARACTERS = set("*?[")
+
+
+def iter_image_paths(inputs):
+    """Image files under the given folders (recursively), globs and files, each once, in sorted order per input"""
+    seen = set()
+    for item in inputs:
+        if GLOB_CHARACTERS.intersection(item):
+            paths = sorted(Path(p) for p in glob.glob(item, recursive=True))
+        elif Path(item).is_dir():
+            paths = sorted(p for p in Path(item).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+        else:
+            paths = [Path(item)]
+        for path in paths:
+            key = str(path)
+            if key not in seen and path.suffix.lower() in IMAGE_EXTENSIONS:
+                seen.add(key)
+                yield key
+
+
+def read_file(path):
+    try:
+        return Path(path).read_bytes()
+    except OSError as e:
+        return e
+
+
+def flat_record(record):
+    """Parquet row: one column per top-level scalar, nested fields flattened or as JSON"""
+    severity = record.get("severity") or {}
+    plant = record.get("plant_severity") or {}
+    return {
+        "path": record["path"],
+        "error": record.get("error"),
+        "rejected": record.get("rejected"),
+        "crop_type": record.get("crop_type"),
+        "disease_name": record.get("disease_name"),
+        "disease_status": record.get("disease_status"),
+        "confidence": record.get("confidence"),
+        "severity_level": severity.get("level"),
+        "severity_percentage": severity.get("percentage"),
+        "plant_severity_level": plant.get("level"),
+        "plant_severity_percentage": plant.get("percentage"),
+        "growth_stage": (record.get("growth_stage") or {}).get("stage"),
+        "bbox": record.get("bbox"),
+        "detections": json.dumps(record["detections"]) if "detections" in record else None,
+        "quick_summary": record.get("quick_summary"),
+        "treatment_plan": record.get("treatment_plan"),
+        "cached": record.get("cached"),
+    }
+
+
+class JsonlWriter:
+    """Appends one JSON object per line"""
+
+    def __init__(self, path):
+        self._path = Path(path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def written_paths(self):
+        """Paths already in the file; a last line cut short by a crash is dropped"""
+        paths, end = set(), 0
+        with self._path.open("rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                paths.add(json.loads(line)["path"])
+                end += len(line)
+        if end < self._path.stat().st_size:
+            os.truncate(self._path, end)
+        return paths
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes each chunk as the next part file of a Parquet dataset directory"""
+
+    def __init__(self, path):
+        if pa is None:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use a .jsonl output instead")
+        self._dir = Path(path)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._part = len(list(self._dir.glob("part-*.parquet")))
+
+    def written_paths(self):
+        paths = set()
+        for part in self._dir.glob("part-*.parquet"):
+            paths.update(pq.read_table(part, columns=["path"]).column("path").to_pylist())
+        return paths
+
+    def write(self, records):
+        if not records:
+            return
+        table = pa.Table.from_pylist([flat_record(record) for record in records])
+        # Written under a hidden name (skipped by dataset readers) and renamed, so a crash never leaves half a part
+        part = self._dir / f"part-{self._part:05d}.parquet"
+        partial = self._dir / f".{part.name}.tmp"
+        pq.write_table(table, partial)
+        os.replace(partial, part)
+        self._part += 1
+
+    def close(self):
+        pass
+
+
+class Checkpoint:
+    """Paths already written to the output, one per line"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+        cut = False
+        if self.path.exists():
+            lines = self.path.read_text(encoding="utf-8").splitlines(keepends=True)
+            self.done = {line.rstrip("\n") for line in lines if line.endswith("\n")}
+            cut = bool(lines) and not lines[-1].endswith("\n")
+        self._file = self.path.open("a", encoding="utf-8")
+        if cut:
+            self._file.write("\n")  # end a path cut short by a crash, so the next one starts on its own line
+
+    def add(self, paths):
+        self._file.writelines(f"{path}\n" for path in paths)
+        self._file.flush()
+        self.done.update(paths)
+
+    def close(self):
+        self._file.close()
+
+
+def bulk_scan(inputs, output, treatment=True, confidence_threshold=0.20, return_all=False, variant=None,
+              input_size=None, batch_size=None, language=None, chunk_size=DEFAULT_CHUNK_SIZE,
+              readers=PREPROCESS_WORKERS, checkpoint=None, resume=True):
+    """
+    Detect diseases on every image under inputs, writing results to output
+    (.parquet: Parquet dataset directory, anything else: JSONL)
+
+    Returns:
+        Counts (images, detected, failed, skipped as already done, rejected
+        by the quality gate per reason), seconds
+        and images_per_second, or {"error": ...} for invalid options
+    """
+    checkpoint_path = Path(checkpoint or f"{output}.checkpoint")
+    if not resume:
+        checkpoint_path.unlink(missing_ok=True)
+        if Path(output).is_dir():
+            # Parquet dataset: drop the old part files, or the new parts would be added next to them
+            for part in Path(output).glob("part-*.parquet"):
+                part.unlink()
+        elif Path(output).is_file():
+            Path(output).unlink()
+    try:
+        writer = ParquetWriter(output) if str(output).endswith(".parquet") else JsonlWriter(output)
+    except (RuntimeError, OSError) as e:
+        return {"error": str(e)}
+    done = Checkpoint(checkpoint_path)
+    if resume:
+        # A chunk written just before a crash may not have reached the checkpoint
+        unrecorded = writer.written_paths() - done.done
+        if unrecorded:
+            done.add(sorted(unrecorded))
+
+    paths = list(iter_image_paths(inputs))
+    todo = [path for path in paths if path not in done.done]
+    stats = {"images": 0, "detected": 0, "failed": 0, "skipped": len(paths) - len(todo), "rejected": {}}
+    print(f"🔄 Scanning {len(todo)} images ({stats['skipped']} already done) -> {output}", file=sys.stderr)
+
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, readers), thread_name_prefix="bulk-read") as pool:
+            # Read the next chunk's files while the current one is being detected
+            pending = [pool.submit(read_file, path) for path in chunks[0]] if chunks else []
+            for index, chunk in enumerate(chunks):
+                contents = [future.result() for future in pending]
+                pending = [pool.submit(read_file, path) for path in chunks[index + 1]] if index + 1 < len(chunks) else []
+
+                records = [None] * len(chunk)
+                images, positions = [], []
+                for i, (path, data) in enumerate(zip(chunk, contents)):
+                    if isinstance(data, Exception):
+                        records[i] = {"path": path, "error": f"Could not read image: {data}"}
+                    else:
+                        images.append(data)
+                        positions.append(i)
+                if images:
+                    batch = detect_disease_batch(images, confidence_threshold, return_all, variant, input_size,
+                                                 batch_size, language, treatment)
+                    if "error" in batch:
+                        return {"error": batch["error"]}
+                    for i, result in zip(positions, batch["results"]):
+                        result.pop("success", None)
+                        records[i] = {"path": chunk[i], **result}
+
+                writer.write(records)
+                done.add(chunk)
+                stats["images"] += len(records)
+                failed = sum("error" in record for record in records)
+                stats["failed"] += failed
+                stats["detected"] += len(records) - failed
+                for record in records:
+                    if "rejected" in record:
+                        stats["rejected"][record["rejected"]] = stats["rejected"].get(record["rejected"], 0) + 1
+                elapsed = time.perf_counter() - start
+                print(f"   {stats['images']}/{len(todo)} images, {stats['images'] / elapsed:.1f} images/sec",
+                      file=sys.stderr)
+    finally:
+        writer.close()
+        done.close()
+
+    seconds = time.perf_counter() - start
+    return {**stats, "seconds": round(seconds, 2),
+            "images_per_second": round(stats["images"] / seconds, 1) if seconds else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="disease_detector.py",
+                                     description="Bulk disease detection over folders, globs and images")
+    parser.add_argument("inputs", nargs="+", help="Folders (scanned recursively), globs or image files")
+    parser.add_argument("--output", required=True, help="results.jsonl, or results.parquet (needs pyarrow)")
+    parser.add_argument("--no-treatment", action="store_true", help="Skip LLM treatment plans")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Confidence threshold")
+    parser.add_argument("--return-all", action="store_true", help="Every detection per image, not only the best")
+    parser.add_argument("--variant", default=None, help="Model variant (e.g. fp32, int8)")
+    parser.add_argument("--input-size", type=int, default=None, help="Model input size (320/480/640)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Images per inference call")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Images per written chunk (and checkpoint step)")
+    parser.add_argument("--readers", type=int, default=PREPROCESS_WORKERS, help="Threads reading files ahead")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, help="Treatment language")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and overwrite the output")
+    args = parser.parse_args(argv)
+
+    report = bulk_scan(args.inputs, args.output, not args.no_treatment, args.threshold, args.return_all,
+                       args.variant, args.input_size, args.batch_size, args.language, max(1, args.chunk_size),
+                       args.readers, args.checkpoint, not args.restart)
+    if "error" in report:
+        print(f"❌ {report['error']}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ {report['images']} images in {report['seconds']}s ({report['images_per_second']} images/sec), "
+          f"{report['failed']} failed ({sum(report['rejected'].values())} by the quality gate), "
+          f"{report['skipped']} skipped", file=sys.stderr)
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
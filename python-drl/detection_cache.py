@@ -0,0 +1,184 @@
+"""
+detection_cache.py - Perceptual-hash cache of disease detection results
+
+Re-uploads and near-identical burst shots hash to the same (or a nearby)
+64-bit dHash of the decoded image, so their earlier result is returned
+without running inference or the LLM again. Entries are matched within a
+Hamming-distance tolerance, expire after a TTL and are evicted least
+recently used first. With an SQLite path configured, results are written
+through to disk: they survive restarts and are shared between detection
+worker processes. On disk, each hash is also stored as 8 one-byte bands;
+two hashes within 7 bits of each other always share a band, so near
+matches are found with indexed lookups.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_DISTANCE = 4
+
+HASH_BANDS = 8  # 8-bit bands; exact band match is guaranteed for distances < HASH_BANDS
+
+
+def dhash(image: np.ndarray) -> int:
+    """64-bit difference hash of a BGR or grayscale image"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def hash_bands(image_hash: int) -> list:
+    return [(image_hash >> (8 * i)) & 0xFF for i in range(HASH_BANDS)]
+
+
+class DetectionCache:
+    """LRU/TTL cache of detection results keyed by perceptual hash and request options"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_distance: int = DEFAULT_MAX_DISTANCE, db_path: Optional[str] = None):
+        if not 0 <= max_distance < HASH_BANDS:
+            raise ValueError(f"max_distance must be between 0 and {HASH_BANDS - 1}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.enabled = max_entries > 0
+
+        self._entries = OrderedDict()  # (options, hash) -> (timestamp, result json), in LRU order
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.db_path = db_path
+        self._db = None
+        if db_path and self.enabled:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            band_columns = ", ".join(f"b{i} INTEGER NOT NULL" for i in range(HASH_BANDS))
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS detection_cache ("
+                f"options TEXT NOT NULL, hash TEXT NOT NULL, {band_columns}, ts REAL NOT NULL, "
+                "result TEXT NOT NULL, PRIMARY KEY (options, hash))"
+            )
+            for i in range(HASH_BANDS):
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_detection_cache_b{i} ON detection_cache (b{i})")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_detection_cache_ts ON detection_cache (ts)")
+            self._db.execute("DELETE FROM detection_cache WHERE ts < ?", (time.time() - ttl_seconds,))
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> "DetectionCache":
+        """Build from DETECTOR_CACHE_SIZE (0 disables), DETECTOR_CACHE_TTL, DETECTOR_CACHE_MAX_DISTANCE and DETECTOR_CACHE_DB"""
+        return cls(
+            max_entries=int(os.getenv("DETECTOR_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv("DETECTOR_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            max_distance=int(os.getenv("DETECTOR_CACHE_MAX_DISTANCE", DEFAULT_MAX_DISTANCE)),
+            db_path=os.getenv("DETECTOR_CACHE_DB") or None,
+        )
+
+    def _lookup_memory(self, image_hash: int, options: str, now: float):
+        """Closest live in-memory entry within max_distance (caller holds the lock)"""
+        key = (options, image_hash)
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] <= self.ttl_seconds:
+            return key, entry, 0
+
+        best = None
+        for candidate, candidate_entry in self._entries.items():
+            if candidate[0] != options or now - candidate_entry[0] > self.ttl_seconds:
+                continue
+            distance = (candidate[1] ^ image_hash).bit_count()
+            if distance <= self.max_distance and (best is None or distance < best[2]):
+                best = (candidate, candidate_entry, distance)
+        return best
+
+    def _lookup_disk(self, image_hash: int, options: str, now: float):
+        """Closest live persisted entry within max_distance (caller holds the lock)"""
+        bands = hash_bands(image_hash)
+        band_filter = " OR ".join(f"b{i} = ?" for i in range(HASH_BANDS))
+        rows = self._db.execute(
+            f"SELECT hash, ts, result FROM detection_cache WHERE options = ? AND ts >= ? AND ({band_filter})",
+            (options, now - self.ttl_seconds, *bands)
+        ).fetchall()
+        best = None
+        for hash_hex, timestamp, result in rows:
+            candidate = int(hash_hex, 16)
+            distance = (candidate ^ image_hash).bit_count()
+            if distance <= self.max_distance and (best is None or distance < best[2]):
+                best = ((options, candidate), (timestamp, result), distance)
+        return best
+
+    def get(self, image_hash: int, options: str) -> Optional[Dict]:
+        """Cached result for a near-identical image with the same options, or None"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            match = self._lookup_memory(image_hash, options, now)
+            if match is None and self._db is not None:
+                match = self._lookup_disk(image_hash, options, now)
+                if match is not None:
+                    self.disk_hits += 1
+                    self._store(*match[:2])
+            if match is None:
+                self.misses += 1
+                return None
+
+            key, (_, result), distance = match
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.near_hits += distance > 0
+        return json.loads(result)
+
+    def _store(self, key, entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, image_hash: int, options: str, result: Dict) -> None:
+        if not self.enabled:
+            return
+        timestamp = time.time()
+        payload = json.dumps(result)
+        with self._lock:
+            self._store((options, image_hash), (timestamp, payload))
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO detection_cache VALUES (?, ?, {', '.join('?' * HASH_BANDS)}, ?, ?)",
+                    (options, f"{image_hash:016x}", *hash_bands(image_hash), timestamp, payload)
+                )
+                self._db.execute("DELETE FROM detection_cache WHERE ts < ?", (timestamp - self.ttl_seconds,))
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "persistent": self._db is not None,
+            }
@@ -0,0 +1,214 @@
+"""
+detection_pool.py - Process pool for CPU-bound disease detection
+
+Each worker process imports disease_detector once and keeps its own ONNX
+session, so decode, inference, NMS and severity run on all cores without
+blocking the event loop or contending on the GIL. The number of requests
+queued or running is bounded; beyond that, submissions are rejected so the
+API can answer 503 instead of piling up latency. Stage timings come back
+with each result and are aggregated in the parent process.
+
+ONNX sessions are only created where inference runs: in process mode the
+API process imports disease_detector but never loads a model. Workers are
+spawned, so each re-imports the launch module as __mp_main__: launch the
+API with "uvicorn app:app" or "python app.py" (app.py skips its DRL and
+detector imports there); a custom launch script must keep heavy imports
+under if __name__ == "__main__".
+
+Environment:
+    DETECTOR_WORKERS      worker processes (default: cores // 2, 1-4;
+                          0 runs detection on threads in this process)
+    DETECTOR_MAX_PENDING  requests queued or running (default 4 per worker)
+"""
+
+import asyncio
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+
+class QueueFullError(RuntimeError):
+    """Raised when max_pending detections are already queued or running"""
+
+
+def _default_workers() -> int:
+    return max(1, min(4, (os.cpu_count() or 1) // 2))
+
+
+def _init_worker(environment: Dict[str, str]) -> None:
+    os.environ.update(environment)
+    import disease_detector
+    disease_detector.load_default_model()  # once per worker, with the environment above
+
+
+def _run_detection(function: str, submitted: float, args: tuple, kwargs: dict):
+    started = time.time()
+    # "name" is a disease_detector function, "module.name" one of another module (e.g. video_detector)
+    module, _, name = function.rpartition(".")
+    result = getattr(importlib.import_module(module or "disease_detector"), name)(*args, **kwargs)
+    if isinstance(result, dict) and "timings_ms" in result:
+        result["timings_ms"]["queue_wait"] = round((started - submitted) * 1000, 2)
+    return result
+
+
+class DetectionPool:
+    """Bounded executor for disease_detector functions, in worker processes or threads"""
+
+    def __init__(self, workers: int = None, max_pending: Optional[int] = None):
+        self.workers = _default_workers() if workers is None else workers
+        self.max_pending = max_pending or max(1, self.workers) * 4
+        self.mode = "process" if self.workers > 0 else "thread"
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.cache_hits = 0
+        self.treatment_cache_hits = 0
+        self.quality_rejections = {}  # reason -> images rejected by the quality gate
+        self._timing_totals = {}  # function -> stage -> (total ms, count)
+
+    @classmethod
+    def from_env(cls) -> "DetectionPool":
+        """Build from DETECTOR_WORKERS and DETECTOR_MAX_PENDING"""
+        workers = os.getenv("DETECTOR_WORKERS")
+        max_pending = os.getenv("DETECTOR_MAX_PENDING")
+        return cls(
+            workers=int(workers) if workers else None,
+            max_pending=int(max_pending) if max_pending else None,
+        )
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.worker_environment(),),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_pending,
+                                                        thread_name_prefix="detection")
+            return self._executor
+
+    def worker_environment(self) -> Optional[Dict[str, str]]:
+        """
+        Environment the worker processes run with (None in thread mode): one
+        ONNX session per worker, with the cores split between workers, unless
+        configured explicitly
+        """
+        if self.mode != "process":
+            return None
+        defaults = {
+            "ORT_SESSION_POOL_SIZE": "1",
+            "ORT_INTRA_OP_THREADS": str(max(1, (os.cpu_count() or 1) // self.workers)),
+            "DETECTOR_PREPROCESS_WORKERS": "1",
+        }
+        return {key: os.environ.get(key, value) for key, value in defaults.items()}
+
+    def start(self) -> None:
+        """Spawn the workers and load their models ahead of the first request"""
+        executor = self._get_executor()
+        if self.mode == "process":
+            for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+                future.result()
+        else:
+            importlib.import_module("disease_detector").load_default_model()
+
+    async def run(self, function: str, *args, **kwargs):
+        """
+        Run a disease_detector function (e.g. "detect_disease_bytes", or
+        "module.function" for another module) off the event loop; raises
+        QueueFullError when max_pending is reached
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{self.pending} detections already pending")
+            self.pending += 1
+
+        try:
+            try:
+                executor = self._get_executor()
+                future = executor.submit(_run_detection, function, time.time(), args, kwargs)
+            except BaseException:
+                self._release()
+                raise
+            # The slot is held until the job itself ends, even if the awaiting request is cancelled first
+            future.add_done_callback(self._release)
+            result = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); replace the pool for later requests
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self.restarts += 1
+            executor.shutdown(wait=False)
+            self._record(function, None)
+            raise
+        except Exception:
+            self._record(function, None)
+            raise
+
+        self._record(function, result)
+        return result
+
+    def _release(self, future=None) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def _record(self, function: str, result) -> None:
+        with self._lock:
+            if isinstance(result, dict) and "rejected" in result:
+                self.quality_rejections[result["rejected"]] = self.quality_rejections.get(result["rejected"], 0) + 1
+            if not isinstance(result, dict) or "error" in result:
+                self.failed += 1
+                return
+            self.completed += 1
+            # Result cache hits happen inside the workers; count them from the flags they return
+            items = result.get("results", [result])
+            self.cache_hits += sum(bool(item.get("cached")) for item in items)
+            self.treatment_cache_hits += sum(bool(item.get("treatment_cached")) for item in items)
+            for item in items:
+                if "rejected" in item:
+                    self.quality_rejections[item["rejected"]] = self.quality_rejections.get(item["rejected"], 0) + 1
+            totals = self._timing_totals.setdefault(function, {})
+            for stage, ms in result.get("timings_ms", {}).items():
+                total, count = totals.get(stage, (0.0, 0))
+                totals[stage] = (total + ms, count + 1)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+                "cache_hits": self.cache_hits,
+                "treatment_cache_hits": self.treatment_cache_hits,
+                "quality_rejections": dict(self.quality_rejections),
+                "mean_timings_ms": {
+                    function: {stage: round(total / count, 2) for stage, (total, count) in totals.items()}
+                    for function, totals in self._timing_totals.items()
+                },
+            }
@@ -1,17 +1,49 @@
 
+import asyncio
 import cv2
 import numpy as np
-import onnxruntime as ort
+import os
 from pathlib import Path
 import json
-from groq import Groq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from groq import AsyncGroq, Groq
+
+from detection_cache import DetectionCache, dhash
+from onnx_session import SessionPool, session_config_from_env
+from quality_gate import QualityGate
+from treatment_cache import TreatmentCache
+from postprocess import DEFAULT_TOP_K, batched_nms, decode_predictions
 
 # Groq API Configuration
 GROQ_API_KEY = ""
 groq_client = Groq(api_key=GROQ_API_KEY)
+# For treatment reports generated on the API's event loop (deferred treatment)
+async_groq_client = AsyncGroq(api_key=GROQ_API_KEY)
 
 
 MODEL_PATH = "./model/best.onnx"
+INPUT_SIZE = 640
+
+# Model variants ("name=path,..."); int8 is written by quantize_detector.py
+DEFAULT_MODEL_VARIANTS = {"fp32": MODEL_PATH, "int8": "./model/best.int8.onnx"}
+SUPPORTED_INPUT_SIZES = (320, 480, 640)
+
+# Treatment plan languages, and the buckets plans are cached on (see treatment_cache.py)
+DEFAULT_LANGUAGE = "Hinglish"
+SUPPORTED_LANGUAGES = ("Hinglish", "English", "Hindi", "Marathi")
+CONFIDENCE_BUCKETS = (20, 50, 75)  # lower bounds, in percent
+SEVERITY_LEVELS = ("Low", "Moderate", "High")
+GROWTH_STAGES = ("Early/Seedling", "Vegetative", "Flowering/Mature")
+AFFECTED_AREA_BANDS = {"None": "0", "Low": "0-15", "Moderate": "15-40", "High": "40-100"}
+
+# JPEG reduced-scale decode flags (libjpeg DCT scaling), largest factor first
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
 
 # Your exact class names
 CLASS_NAMES = {
@@ -78,55 +110,222 @@ DISEASE_INFO = {
     28: {"crop": "Tomato", "disease": "Two Spotted Spider Mites", "status": "diseased"}
 }
 
-# Load ONNX model
-try:
-    session = ort.InferenceSession(MODEL_PATH, providers=['CPUExecutionProvider'])
-    print(f"✅ Model loaded from {MODEL_PATH}")
-    input_name = session.get_inputs()[0].name
-    print(f"✅ Groq LLM initialized for treatment generation")
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
-    session = None
+def parse_model_variants(spec):
+    """Parse "name=path,name=path" into a variant -> model path dict"""
+    variants = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, _, path = item.partition("=")
+            if not path:
+                raise ValueError(f"Invalid model variant '{item}', expected name=path")
+            variants[name.strip()] = path.strip()
+    return variants
+
+
+MODEL_VARIANTS = parse_model_variants(os.getenv("DETECTOR_MODEL_VARIANTS", "")) or dict(DEFAULT_MODEL_VARIANTS)
+DETECTOR_VARIANT = os.getenv("DETECTOR_VARIANT", "fp32")
+DETECTOR_INPUT_SIZE = int(os.getenv("DETECTOR_INPUT_SIZE", INPUT_SIZE))
+
+# Session pools per variant, loaded on first use
+_session_pools = {}
+_session_pools_lock = threading.Lock()
+
 
+def get_session_pool(variant=None):
+    """Session pool for a model variant (default DETECTOR_VARIANT)"""
+    variant = variant or DETECTOR_VARIANT
+    pool = _session_pools.get(variant)
+    if pool is not None:
+        return pool
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}'. Available: {', '.join(MODEL_VARIANTS)}")
+    with _session_pools_lock:
+        if variant not in _session_pools:
+            path = MODEL_VARIANTS[variant]
+            if not Path(path).exists():
+                raise ValueError(f"Model variant '{variant}' not found at {path}")
+            _session_pools[variant] = SessionPool(path)
+        return _session_pools[variant]
 
-def generate_treatment_plan(crop_type, disease_name, disease_status, severity_level, confidence, growth_stage, affected_percentage):
+
+def fixed_input_size(pool):
+    """Square input size baked into the model, or None if height/width are dynamic"""
+    height, width = pool.input_shape[2:4]
+    if isinstance(height, int) and isinstance(width, int):
+        return height if height == width else None
+    return None
+
+
+def resolve_input_size(pool, input_size=None):
+    """Input size to run a pool at; fixed-size models only accept their own size"""
+    fixed = fixed_input_size(pool)
+    if input_size is None:
+        input_size = fixed or DETECTOR_INPUT_SIZE
+    if input_size not in SUPPORTED_INPUT_SIZES and input_size != fixed:
+        raise ValueError(f"Unsupported input size {input_size}. Supported: {', '.join(map(str, SUPPORTED_INPUT_SIZES))}")
+    if fixed is not None and input_size != fixed:
+        raise ValueError(f"Model variant has a fixed {fixed}x{fixed} input; re-export it with dynamic axes for {input_size}")
+    return input_size
+
+
+def detector_status(environment=None):
     """
-    Generate comprehensive treatment plan using Groq LLM
+    Configured model variants, the session configuration inference runs with
+    and the sessions loaded in this process. Pass the worker environment
+    (DetectionPool.worker_environment()) when inference runs in worker
+    processes; their sessions are not loaded here.
+    """
+    in_workers = environment is not None
+    return {
+        "default_variant": DETECTOR_VARIANT,
+        "default_input_size": DETECTOR_INPUT_SIZE,
+        "supported_input_sizes": list(SUPPORTED_INPUT_SIZES),
+        "inference": "worker processes" if in_workers else "this process",
+        "session_config": session_config_from_env({**os.environ, **environment} if in_workers else None),
+        "variants": {
+            name: {
+                "path": path,
+                "available": Path(path).exists(),
+                "session": _session_pools[name].describe() if name in _session_pools else None
+            }
+            for name, path in MODEL_VARIANTS.items()
+        },
+        # Rejection counts are per process; DetectionPool.stats() aggregates them across workers
+        "quality_gate": {key: value for key, value in quality_gate.stats().items()
+                         if key in ("enabled", "thresholds", "analysis_size")}
+    }
+
+
+# Results of recently seen (near-identical) images; per process, shared through DETECTOR_CACHE_DB
+result_cache = DetectionCache.from_env()
+
+# LLM treatment reports by bucketed diagnosis (SQLite, shared by workers)
+treatment_cache = TreatmentCache.from_env()
+
+# Blurry / badly exposed / non-plant uploads are rejected before letterbox and inference
+quality_gate = QualityGate.from_env()
+
+
+def load_default_model():
+    """
+    Load the default ONNX model (pool of tuned sessions, configured via ORT_*
+    env vars) ahead of the first request; called only in the process that
+    runs inference, so the API process of a worker pool holds no sessions
     """
     try:
-        if disease_status == "healthy":
-            prompt = f"""You are an experienced agricultural expert. A farmer's {crop_type} plant is HEALTHY with {int(confidence * 100)}% confidence.
+        pool = get_session_pool()
+        print(f"✅ Model '{DETECTOR_VARIANT}' loaded from {pool.model_path} ({pool.size} sessions x "
+              f"{pool.config['intra_op_threads']} threads)")
+        print(f"✅ Groq LLM initialized for treatment generation")
+        return pool
+    except Exception as e:
+        print(f"❌ Error loading model: {e}")
+        return None
 
-Provide a structured maintenance plan in this EXACT format:
 
-🎯 DIAGNOSIS:
-[Brief congratulatory message]
+def treatment_plan_fallback(disease_name, disease_status):
+    """Plan text when the LLM report has no usable sections"""
+    if disease_status == "healthy":
+        return "✅ Your crop is healthy! Continue good care practices and monitor weekly."
+    else:
+        return f"⚠️ {disease_name} detected. Please consult local agricultural expert for treatment plan."
 
-✅ CURRENT STATUS:
-• Health: Excellent
-• Growth Stage: {growth_stage}
-• Next Steps: Continue monitoring
 
-🌱 MAINTENANCE PLAN:
-1. [First maintenance tip]
-2. [Second maintenance tip]
-3. [Third maintenance tip]
+def quick_summary_fallback(crop_type, disease_name, disease_status):
+    """Summary line when the LLM report has no usable summary"""
+    if disease_status == "healthy":
+        return f"✅ Your {crop_type} is healthy!"
+    else:
+        return f"⚠️ {disease_name} detected - Action needed"
 
-🛡️ PREVENTION TIPS:
-• [First prevention tip]
-• [Second prevention tip]
-• [Third prevention tip]
 
-📅 MONITORING SCHEDULE:
-• Check plants every [frequency]
-• Watch for [specific signs]
+# Sections of the structured treatment report, rendered in this order with these headings
+REPORT_SECTIONS = {
+    "diagnosis": "🎯 DIAGNOSIS",
+    "urgency": "⚠️ URGENCY LEVEL",
+    "chemical": "💊 CHEMICAL TREATMENT",
+    "organic": "🌿 ORGANIC TREATMENT",
+    "schedule": "📋 STEP-BY-STEP ACTION PLAN",
+    "prevention": "🛡️ PREVENTION FOR FUTURE",
+}
+LIST_SECTIONS = ("schedule", "prevention")
+
 
-Keep it simple and encouraging. Use emojis. Max 200 words."""
+def parse_treatment_report(content):
+    """
+    Validate the LLM's JSON reply
 
+    Returns:
+        (summary, sections): the one-line summary and a dict of the
+        REPORT_SECTIONS (lists for LIST_SECTIONS, strings otherwise); either is
+        None when missing or malformed
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        # Tolerate prose or code fences around the object
+        start, end = (content or "").find("{"), (content or "").rfind("}")
+        try:
+            data = json.loads(content[start:end + 1]) if 0 <= start < end else None
+        except ValueError:
+            data = None
+    if not isinstance(data, dict):
+        return None, None
+
+    summary = data.get("summary")
+    summary = summary.strip() if isinstance(summary, str) and summary.strip() else None
+
+    sections = {}
+    for name in REPORT_SECTIONS:
+        value = data.get(name)
+        if name in LIST_SECTIONS:
+            if isinstance(value, str):
+                value = value.splitlines()
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                return summary, None
+            value = [item.strip() for item in value if item.strip()]
         else:
-            prompt = f"""You are an expert agricultural advisor. Provide a COMPLETE TREATMENT PLAN for a farmer.
+            if isinstance(value, dict):
+                value = "\n".join(f"{key}: {item}" for key, item in value.items())
+            if not isinstance(value, str):
+                return summary, None
+            value = value.strip()
+        if not value:
+            return summary, None
+        sections[name] = value
+    return summary, sections
+
+
+def render_treatment_plan(sections):
+    """Plain-text plan with the REPORT_SECTIONS emoji headings"""
+    blocks = []
+    for name, title in REPORT_SECTIONS.items():
+        value = sections[name]
+        if name == "prevention":
+            value = "\n".join(f"{i}. {item}" for i, item in enumerate(value, 1))
+        elif name in LIST_SECTIONS:
+            value = "\n".join(value)
+        blocks.append(f"{title}:\n{value}")
+    return "\n\n".join(blocks)
+
 
-DISEASE DETAILS:
+def treatment_report_request(crop_type, disease_name, disease_status, severity_level, confidence, growth_stage,
+                             affected_percentage, language=DEFAULT_LANGUAGE):
+    """Chat completion arguments for the structured treatment report"""
+    if disease_status == "healthy":
+        details = f"""A farmer's {crop_type} plant is HEALTHY with {int(confidence * 100)}% confidence.
+Growth Stage: {growth_stage}
+
+Write a maintenance plan:
+- "summary": ONE warm sentence with emoji congratulating the farmer
+- "diagnosis": brief congratulatory message
+- "urgency": "NONE - " followed by the next check-up
+- "chemical": why no chemical treatment is needed right now
+- "organic": maintenance practices to keep the crop healthy
+- "schedule": monitoring schedule, one string per step (how often, which signs to watch for)
+- "prevention": 3 prevention tips"""
+    else:
+        details = f"""DISEASE DETAILS:
 - Crop: {crop_type}
 - Disease: {disease_name}
 - Severity: {severity_level}
@@ -134,151 +333,232 @@ DISEASE DETAILS:
 - Confidence: {int(confidence * 100)}%
 - Growth Stage: {growth_stage}
 
-Provide treatment in this EXACT format:
-
-🎯 DIAGNOSIS:
-[1-2 sentences explaining what the disease is in simple terms]
-
-⚠️ URGENCY LEVEL:
-{severity_level.upper()} - [Action timeline]
-
-💊 CHEMICAL TREATMENT:
-Product Name: [Specific fungicide/pesticide name]
-Dosage: [Amount per liter/gallon]
-Application: [How to apply - spray, drench, etc.]
-Frequency: [How often - daily, weekly]
-Duration: [How many days/weeks]
-Safety: [Wear gloves, mask, etc.]
-
-🌿 ORGANIC TREATMENT:
-Home Remedy: [Natural solution name]
-Recipe: [How to prepare it]
-Application: [How to apply]
-Frequency: [How often]
-Duration: [How long to continue]
-
-📋 STEP-BY-STEP ACTION PLAN:
-Day 1: [What to do immediately]
-Day 2-7: [Weekly actions]
-Day 8-14: [Follow-up actions]
-
-🛡️ PREVENTION FOR FUTURE:
-1. [First prevention tip]
-2. [Second prevention tip]
-3. [Third prevention tip]
-
-⏰ WHEN TO APPLY:
-Best Time: [Morning/evening/specific time]
-Weather: [Avoid rain, apply before rain, etc.]
-Temperature: [Ideal temperature range]
-
-⚕️ IMPORTANT NOTES:
-• [Critical safety or effectiveness tip]
-• [When to see improvement]
-• [When to consult expert if no improvement]
-
-Use simple Hinglish words. Be specific with product names and quantities. Max 350 words."""
-
-        # Call Groq API with Llama 3.1 70B for detailed treatment
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are Dr. Singh, a senior agricultural scientist with 30 years of experience. You explain treatments in simple Hindi-English that Indian farmers understand. Always provide specific product names, exact dosages, and clear timelines. Use emojis for sections."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-            temperature=0.6,  # Lower for more consistent treatment plans
-            max_tokens=800,
-            top_p=0.9
-        )
+Write a COMPLETE TREATMENT PLAN:
+- "summary": ONE urgent, actionable sentence with emoji alerting the farmer
+- "diagnosis": 1-2 sentences explaining what the disease is in simple terms
+- "urgency": "{severity_level.upper()} - " followed by the action timeline
+- "chemical": product name, dosage per liter, application, frequency, duration and safety
+- "organic": home remedy, recipe, application, frequency and duration
+- "schedule": step-by-step plan, one string per step ("Day 1: ...", "Day 2-7: ...", "Day 8-14: ...")
+- "prevention": 3 prevention tips for the future"""
+
+    prompt = f"""{details}
+
+Respond with ONLY a JSON object with exactly these keys: "summary", "diagnosis", "urgency",
+"chemical", "organic" (strings), "schedule" and "prevention" (arrays of strings).
+Use simple {language} words. Be specific with product names and quantities. Max 350 words."""
+
+    return dict(
+        messages=[
+            {
+                "role": "system",
+                "content": "You are Dr. Singh, a senior agricultural scientist with 30 years of experience. You explain treatments in simple language that Indian farmers understand. Always provide specific product names, exact dosages, and clear timelines. You reply with a single JSON object only."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        model="meta-llama/llama-4-scout-17b-16e-instruct",
+        temperature=0.6,  # Lower for more consistent treatment plans
+        max_tokens=900,
+        top_p=0.9,
+        response_format={"type": "json_object"}
+    )
 
-        return chat_completion.choices[0].message.content.strip()
 
+def treatment_report_from_reply(content, crop_type, disease_name, disease_status):
+    """
+    Report from the LLM's reply (None after an API error)
+
+    Returns:
+        (report, complete): report holds quick_summary, treatment_plan (text)
+        and treatment_sections; whatever the reply lacks falls back to
+        quick_summary_fallback / treatment_plan_fallback, and complete is then
+        False
+    """
+    summary, sections = parse_treatment_report(content) if content is not None else (None, None)
+    if content is not None and (summary is None or sections is None):
+        print("⚠️ Malformed treatment report from LLM, using fallback text for missing parts")
+
+    report = {
+        "quick_summary": summary or quick_summary_fallback(crop_type, disease_name, disease_status),
+        "treatment_plan": render_treatment_plan(sections) if sections else treatment_plan_fallback(disease_name, disease_status),
+        "treatment_sections": sections
+    }
+    return report, summary is not None and sections is not None
+
+
+def generate_treatment_report(crop_type, disease_name, disease_status, severity_level, confidence, growth_stage,
+                              affected_percentage, language=DEFAULT_LANGUAGE):
+    """Quick summary and sectioned treatment plan from one structured Groq call (see treatment_report_from_reply)"""
+    content = None
+    try:
+        chat_completion = groq_client.chat.completions.create(**treatment_report_request(
+            crop_type, disease_name, disease_status, severity_level, confidence, growth_stage,
+            affected_percentage, language
+        ))
+        content = chat_completion.choices[0].message.content
     except Exception as e:
         print(f"Groq API Error: {e}")
-        # Fallback
-        if disease_status == "healthy":
-            return "✅ Your crop is healthy! Continue good care practices and monitor weekly."
-        else:
-            return f"⚠️ {disease_name} detected. Please consult local agricultural expert for treatment plan."
+    return treatment_report_from_reply(content, crop_type, disease_name, disease_status)
 
 
-def generate_quick_summary(crop_type, disease_name, disease_status, severity_level):
-    """Generate short summary"""
+async def generate_treatment_report_async(crop_type, disease_name, disease_status, severity_level, confidence,
+                                          growth_stage, affected_percentage, language=DEFAULT_LANGUAGE):
+    """generate_treatment_report on the async Groq client"""
+    content = None
     try:
-        if disease_status == "healthy":
-            prompt = f"In ONE sentence with emoji, congratulate farmer whose {crop_type} is healthy. Be warm."
-        else:
-            prompt = f"In ONE urgent sentence with emoji, alert farmer about {disease_name} on {crop_type} ({severity_level} severity). Be actionable."
-
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a helpful farm advisor. ONE SHORT sentence only with emoji."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.1-8b-instant",
-            temperature=0.8,
-            max_tokens=50
-        )
+        chat_completion = await async_groq_client.chat.completions.create(**treatment_report_request(
+            crop_type, disease_name, disease_status, severity_level, confidence, growth_stage,
+            affected_percentage, language
+        ))
+        content = chat_completion.choices[0].message.content
+    except Exception as e:
+        print(f"Groq API Error: {e}")
+    return treatment_report_from_reply(content, crop_type, disease_name, disease_status)
 
-        return chat_completion.choices[0].message.content.strip()
 
-    except Exception as e:
-        if disease_status == "healthy":
-            return f"✅ Your {crop_type} is healthy!"
-        else:
-            return f"⚠️ {disease_name} detected - Action needed"
+def jpeg_dimensions(buffer):
+    """(width, height) from a JPEG's SOF header without decoding, or None"""
+    data = buffer.tobytes() if len(buffer) < 4096 else buffer[:65536].tobytes()
+    if data[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 9 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # standalone markers
+            pos += 2
+            continue
+        length = int.from_bytes(data[pos + 2:pos + 4], "big")
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[pos + 5:pos + 7], "big")
+            width = int.from_bytes(data[pos + 7:pos + 9], "big")
+            return (width, height) if width and height else None
+        pos += 2 + length
+    return None
 
+def decode_image(data, target_size=None):
+    """
+    Decode encoded image bytes (bytes, bytearray or memoryview) in memory
+
+    With target_size, large JPEGs are decoded at 1/2, 1/4 or 1/8 scale, picking
+    the smallest image whose longer side is still >= target_size.
+    Returns the image and the (height, width) of the full-resolution image.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if not buffer.size:
+        raise ValueError("Could not decode image. Please upload a valid JPEG or PNG file.")
+
+    flags = cv2.IMREAD_COLOR
+    dimensions = jpeg_dimensions(buffer) if target_size else None
+    if dimensions:
+        for factor, reduced_flags in REDUCED_DECODE_FLAGS:
+            if max(dimensions) / factor >= target_size:
+                flags = reduced_flags
+                break
 
-# [Keep all the preprocessing, detection, and helper functions from previous code]
-def preprocess_image(image_path, input_size=640):
-    img = cv2.imread(image_path)
+    img = cv2.imdecode(buffer, flags)
     if img is None:
-        raise ValueError(f"Could not read image: {image_path}")
-    original_shape = img.shape[:2]
-    img_resized = letterbox(img, new_shape=(input_size, input_size))[0]
-    img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
-    img_normalized = img_rgb.astype(np.float32) / 255.0
-    img_transposed = np.transpose(img_normalized, (2, 0, 1))
-    img_batch = np.expand_dims(img_transposed, axis=0)
-    return img_batch, img, original_shape
-
-def letterbox(img, new_shape=(640, 640), color=(114, 114, 114)):
-    shape = img.shape[:2]
-    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
-    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
-    dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]
-    dw /= 2
-    dh /= 2
-    if shape[::-1] != new_unpad:
-        img = cv2.resize(img, new_unpad, interpolation=cv2.INTER_LINEAR)
-    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
-    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
-    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
-    return img, r, (dw, dh)
-
-def estimate_severity(image, bbox, disease_status):
-    if disease_status == "healthy":
-        return {"level": "None", "score": 0, "percentage": 0.0}
-    x1, y1, x2, y2 = bbox
-    x1, y1, x2, y2 = max(0, int(x1)), max(0, int(y1)), int(x2), int(y2)
-    if x2 <= x1 or y2 <= y1:
-        return {"level": "Low", "score": 1, "percentage": 10.0}
-    roi = image[y1:y2, x1:x2]
-    if roi.size == 0:
-        return {"level": "Low", "score": 1, "percentage": 10.0}
-    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-    lower_disease = np.array([10, 50, 20])
-    upper_disease = np.array([40, 255, 255])
-    disease_mask = cv2.inRange(hsv, lower_disease, upper_disease)
-    disease_pixels = cv2.countNonZero(disease_mask)
-    total_pixels = roi.shape[0] * roi.shape[1]
-    severity_ratio = disease_pixels / total_pixels if total_pixels > 0 else 0
+        raise ValueError("Could not decode image. Please upload a valid JPEG or PNG file.")
+
+    if flags == cv2.IMREAD_COLOR:
+        return img, img.shape[:2]
+    width, height = dimensions
+    if (img.shape[1] > img.shape[0]) != (width > height):
+        # EXIF orientation rotated the decoded image; the header has pre-rotation dimensions
+        width, height = height, width
+    return img, (height, width)
+
+# Per-thread reusable preprocessing buffers (see letterbox_into)
+_buffers = threading.local()
+
+def get_input_buffer(input_size=INPUT_SIZE, batch_size=1):
+    """This thread's preallocated (batch, 3, size, size) float32 model input"""
+    shape = (batch_size, 3, input_size, input_size)
+    buffer = getattr(_buffers, "input", None)
+    if buffer is None or buffer.shape != shape:
+        buffer = _buffers.input = np.empty(shape, dtype=np.float32)
+    return buffer
+
+def _resize_scratch(height, width):
+    """Contiguous (height, width, 3) uint8 view into this thread's resize buffer"""
+    size = height * width * 3
+    scratch = getattr(_buffers, "resize", None)
+    if scratch is None or scratch.size < size:
+        scratch = _buffers.resize = np.empty(size, dtype=np.uint8)
+    return scratch[:size].reshape(height, width, 3)
+
+def letterbox_into(img, out, color=114):
+    """
+    Letterbox a BGR image straight into a (3, size, size) float32 RGB tensor in [0, 1]
+
+    Same geometry and values as the legacy letterbox / preprocess_array path
+    (kept in benchmarks/bench_preprocess.py), but writes into out (e.g. a
+    slice of get_input_buffer()) instead of allocating at every step.
+    Returns the (x, y) scale and (left, top) padding: input = original * scale + pad
+    """
+    size = out.shape[1]
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    top = int(round((size - new_h) / 2 - 0.1))
+    left = int(round((size - new_w) / 2 - 0.1))
+
+    if (new_h, new_w) != (h, w):
+        resized = _resize_scratch(new_h, new_w)
+        cv2.resize(img, (new_w, new_h), dst=resized, interpolation=cv2.INTER_LINEAR)
+    else:
+        resized = img
+
+    # Padding only around the image region
+    pad_value = np.float32(color) / np.float32(255.0)
+    out[:, :top, :] = pad_value
+    out[:, top + new_h:, :] = pad_value
+    out[:, top:top + new_h, :left] = pad_value
+    out[:, top:top + new_h, left + new_w:] = pad_value
+
+    # BGR -> RGB, HWC -> CHW and / 255 in one pass per channel
+    for channel in range(3):
+        np.divide(resized[:, :, 2 - channel], np.float32(255.0),
+                  out=out[channel, top:top + new_h, left:left + new_w], dtype=np.float32)
+
+    return (new_w / w, new_h / h), (left, top)
+
+# HSV range of discoloured (yellow/brown) leaf tissue
+DISEASE_HSV_LOWER = np.array([10, 50, 20])
+DISEASE_HSV_UPPER = np.array([40, 255, 255])
+
+
+def disease_mask_integral(image):
+    """Integral image (h + 1, w + 1) of the diseased-pixel mask; one HSV conversion per image"""
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    disease_mask = cv2.inRange(hsv, DISEASE_HSV_LOWER, DISEASE_HSV_UPPER)
+    return cv2.integral(disease_mask // 255)
+
+
+def box_pixels(integral, boxes):
+    """
+    (diseased pixels, total pixels) per xyxy box, four integral-image lookups
+    each; coordinates are truncated to whole pixels like an ROI slice
+    """
+    h, w = integral.shape[0] - 1, integral.shape[1] - 1
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1 = np.clip(boxes[:, 0].astype(np.int64), 0, w)
+    y1 = np.clip(boxes[:, 1].astype(np.int64), 0, h)
+    x2 = np.clip(boxes[:, 2].astype(np.int64), 0, w)
+    y2 = np.clip(boxes[:, 3].astype(np.int64), 0, h)
+    x2, y2 = np.maximum(x2, x1), np.maximum(y2, y1)
+    diseased = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+    return diseased, (x2 - x1) * (y2 - y1)
+
+
+def severity_from_ratio(severity_ratio):
     if severity_ratio < 0.15:
         level, score = "Low", 1
     elif severity_ratio < 0.4:
@@ -287,6 +567,56 @@ def estimate_severity(image, bbox, disease_status):
         level, score = "High", 3
     return {"level": level, "score": score, "percentage": round(severity_ratio * 100, 2)}
 
+
+def estimate_severities(image, boxes, statuses, integral=None):
+    """
+    Severity of every detection from one diseased-pixel integral image, so
+    the cost per extra box is constant. Healthy detections are "None".
+    """
+    severities = [{"level": "None", "score": 0, "percentage": 0.0} for _ in statuses]
+    diseased_indices = [i for i, status in enumerate(statuses) if status != "healthy"]
+    if not diseased_indices:
+        return severities
+    if integral is None:
+        integral = disease_mask_integral(image)
+    diseased, total = box_pixels(integral, [boxes[i] for i in diseased_indices])
+    for i, disease_pixels, total_pixels in zip(diseased_indices, diseased.tolist(), total.tolist()):
+        if total_pixels == 0:
+            severities[i] = {"level": "Low", "score": 1, "percentage": 10.0}
+        else:
+            severities[i] = severity_from_ratio(disease_pixels / total_pixels)
+    return severities
+
+
+def plant_severity(boxes, statuses, severities):
+    """
+    Plant-level severity over all detected leaves: the share of leaf area
+    that is diseased (healthy leaves count as 0%), plus leaf counts and the
+    worst leaf
+    """
+    areas = [max(0.0, (x2 - x1) * (y2 - y1)) for x1, y1, x2, y2 in boxes]
+    total_area = sum(areas)
+    diseased_leaves = [i for i, status in enumerate(statuses) if status == "diseased"]
+    worst = max((severities[i] for i in diseased_leaves), key=lambda s: (s["score"], s["percentage"]),
+                default=severities[0] if severities else {"level": "None", "score": 0, "percentage": 0.0})
+    if not diseased_leaves:
+        severity = {"level": "None", "score": 0, "percentage": 0.0}
+    else:
+        diseased_area = sum(areas[i] * severities[i]["percentage"] / 100 for i in diseased_leaves)
+        severity = severity_from_ratio(diseased_area / total_area if total_area > 0 else 0.0)
+    return {
+        **severity,
+        "leaves": len(statuses),
+        "diseased_leaves": len(diseased_leaves),
+        "worst_leaf": worst
+    }
+
+def scale_box(box, from_shape, to_shape):
+    """Map an xyxy box between image sizes given as (height, width)"""
+    sx = to_shape[1] / from_shape[1]
+    sy = to_shape[0] / from_shape[0]
+    return [box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy]
+
 def estimate_growth_stage(bbox_area_ratio):
     if bbox_area_ratio < 0.2:
         return {"stage": "Early/Seedling", "code": 1}
@@ -303,119 +633,380 @@ def xywh2xyxy(x):
     y[..., 3] = x[..., 1] + x[..., 3] / 2
     return y
 
-def nms(boxes, scores, iou_threshold=0.45):
-    if len(boxes) == 0:
-        return []
-    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
-    areas = (x2 - x1) * (y2 - y1)
-    order = scores.argsort()[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        xx1 = np.maximum(x1[i], x1[order[1:]])
-        yy1 = np.maximum(y1[i], y1[order[1:]])
-        xx2 = np.minimum(x2[i], x2[order[1:]])
-        yy2 = np.minimum(y2[i], y2[order[1:]])
-        w = np.maximum(0.0, xx2 - xx1)
-        h = np.maximum(0.0, yy2 - yy1)
-        inter = w * h
-        iou = inter / (areas[i] + areas[order[1:]] - inter)
-        inds = np.where(iou <= iou_threshold)[0]
-        order = order[inds + 1]
-    return keep
-
-
-def detect_disease(image_path, confidence_threshold=0.20):
-    """Main detection function with comprehensive treatment"""
-    if session is None:
-        return {"error": "Model not loaded"}
+def detect_disease(image_path, confidence_threshold=0.20, return_all=False, variant=None, input_size=None,
+                   language=None):
+    """Main detection function for an image file (see detect_disease_bytes)"""
+    try:
+        data = Path(image_path).read_bytes()
+    except OSError as e:
+        return {"error": f"Detection failed: Could not read image: {image_path} ({e})"}
+    return detect_disease_bytes(data, confidence_threshold, return_all, variant, input_size, language)
+
+
+def describe_detection(box, score, class_id):
+    """Public fields of one detection (box already in output coordinates)"""
+    info = DISEASE_INFO.get(int(class_id), {"crop": "Unknown", "disease": "Unknown", "status": "unknown"})
+    return {
+        "class_id": int(class_id),
+        "crop_type": info["crop"],
+        "disease_name": info["disease"],
+        "disease_status": info["status"],
+        "confidence": round(float(score), 3),
+        "bbox": [float(v) for v in box]
+    }
+
+
+class StageTimer:
+    """Accumulates wall time per pipeline stage, in milliseconds"""
+
+    def __init__(self):
+        self.start = self._last = time.perf_counter()
+        self.stages = {}
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def timings(self):
+        timings = {stage: round(ms, 2) for stage, ms in self.stages.items()}
+        timings["total"] = round((time.perf_counter() - self.start) * 1000, 2)
+        return timings
+
+
+def resolve_model(variant=None, input_size=None):
+    """Session pool and input size for a request; raises ValueError for invalid choices"""
+    pool = get_session_pool(variant)
+    return pool, resolve_input_size(pool, input_size)
+
+
+def prepare_image(data, input_size, out):
+    """
+    Decode (at reduced scale for oversized JPEGs) and letterbox one image
+    into out; images failing the quality gate return an {"error": ...,
+    "rejected": reason, "quality": metrics and original width/height} dict
+    instead (out is zeroed)
+    """
+    decoded_img, original_shape = decode_image(data, target_size=input_size)
+    rejection = quality_gate.check(decoded_img)
+    if rejection is not None:
+        out.fill(0.0)
+        quality = {**rejection["metrics"], "width": original_shape[1], "height": original_shape[0]}
+        return {"error": rejection["message"], "rejected": rejection["reason"], "quality": quality}
+    scale, pad = letterbox_into(decoded_img, out)
+    return {"image": decoded_img, "original_shape": original_shape, "scale": scale, "pad": pad}
+
+
+def prepare_array(img, input_size, out):
+    """Letterbox an already decoded BGR image (e.g. a video frame) into out"""
+    scale, pad = letterbox_into(img, out)
+    return {"image": img, "original_shape": img.shape[:2], "scale": scale, "pad": pad}
+
+
+def build_result(candidates, prepared, return_all=False):
+    """
+    Detection result for one image from its decoded candidates, without the
+    treatment plan; an {"error": ...} dict when nothing usable was detected
+    """
+    boxes, max_scores, class_ids = candidates
+    
+    if len(max_scores) == 0:
+        return {"error": "No crop detected. Please upload a clear image of a plant leaf."}
+    
+    # Convert boxes (undo the letterbox, to decoded image coordinates)
+    decoded_img, original_shape = prepared["image"], prepared["original_shape"]
+    decoded_shape = decoded_img.shape[:2]
+    scale, pad = prepared["scale"], prepared["pad"]
+    boxes_xyxy = xywh2xyxy(boxes)
+    h, w = decoded_shape
+    boxes_xyxy[:, [0, 2]] = np.clip((boxes_xyxy[:, [0, 2]] - pad[0]) / scale[0], 0, w)
+    boxes_xyxy[:, [1, 3]] = np.clip((boxes_xyxy[:, [1, 3]] - pad[1]) / scale[1], 0, h)
+    
+    # Class-aware NMS
+    keep_indices = batched_nms(boxes_xyxy, max_scores, class_ids)
+    
+    if len(keep_indices) == 0:
+        return {"error": "No valid detections found."}
+    
+    # Best detection
+    best_idx = keep_indices[0]
+    best_box = boxes_xyxy[best_idx]
+    best_score = max_scores[best_idx]
+    best_class = class_ids[best_idx]
+    
+    # Get disease info
+    if best_class not in DISEASE_INFO:
+        return {"error": f"Unknown class detected: {best_class}"}
+    
+    info = DISEASE_INFO[best_class]
+    
+    # Metrics
+    bbox_coords = best_box.tolist()
+    bbox_area = (bbox_coords[2] - bbox_coords[0]) * (bbox_coords[3] - bbox_coords[1])
+    bbox_area_ratio = bbox_area / (h * w)
+    
+    # Severity of every surviving detection from one integral image (on the decoded image)
+    kept_boxes = boxes_xyxy[keep_indices].tolist()
+    kept_statuses = [DISEASE_INFO.get(int(class_ids[i]), {"status": "unknown"})["status"] for i in keep_indices]
+    severities = estimate_severities(decoded_img, kept_boxes, kept_statuses)
+    severity = severities[0]
+    growth_stage = estimate_growth_stage(bbox_area_ratio)
+    
+    result = {
+        "success": True,
+        "crop_type": info["crop"],
+        "disease_name": info["disease"],
+        "disease_status": info["status"],
+        "confidence": round(float(best_score), 3),
+        "severity": severity,
+        "growth_stage": growth_stage,
+        "bbox": scale_box(bbox_coords, decoded_shape, original_shape),
+        "plant_severity": plant_severity(kept_boxes, kept_statuses, severities)
+    }
+    
+    if return_all:
+        result["detections"] = [
+            {**describe_detection(scale_box(boxes_xyxy[i], decoded_shape, original_shape), max_scores[i], class_ids[i]),
+             "severity": leaf_severity}
+            for i, leaf_severity in zip(keep_indices, severities)
+        ]
+    
+    return result
+
+
+def resolve_language(language=None):
+    """Treatment plan language for a request; raises ValueError for unsupported ones"""
+    language = language or DEFAULT_LANGUAGE
+    if language not in SUPPORTED_LANGUAGES:
+        raise ValueError(f"Unsupported language '{language}'. Supported: {', '.join(SUPPORTED_LANGUAGES)}")
+    return language
+
+
+def cache_options(confidence_threshold, return_all, variant, input_size, language):
+    """Request options a cached result must match besides the image"""
+    return f"{variant or DETECTOR_VARIANT}|{input_size}|{confidence_threshold}|{int(bool(return_all))}|{language}"
+
+
+def cacheable(result):
+    """Completed result without per-request fields, as stored in the result cache"""
+    return {key: value for key, value in result.items() if key not in ("timings_ms", "cached")}
+
+
+def confidence_bucket(confidence):
+    """Lower bound (percent) of the confidence bucket a plan is cached on"""
+    percent = confidence * 100
+    return max((bound for bound in CONFIDENCE_BUCKETS if percent >= bound), default=CONFIDENCE_BUCKETS[0])
+
+
+def treatment_report_args(crop_type, disease_name, disease_status, severity_level, confidence, growth_stage,
+                          language=DEFAULT_LANGUAGE):
+    """
+    Cache key and generate_treatment_report arguments for a diagnosis. The
+    prompt uses the bucketed confidence and the severity level's affected-area
+    band, so a report is valid for the whole bucket.
+    """
+    if disease_status == "healthy":
+        severity_level = "None"
+    bucket = confidence_bucket(confidence)
+    key = json.dumps([crop_type, disease_name, disease_status, severity_level, growth_stage, bucket, language])
+    return key, (crop_type, disease_name, disease_status, severity_level, bucket / 100, growth_stage,
+                 AFFECTED_AREA_BANDS[severity_level], language)
+
+
+def cached_report(key):
+    cached = treatment_cache.get("report", key)
+    return json.loads(cached) if cached is not None else None
+
+
+# One LLM request at a time per cache key, so concurrent identical diagnoses share it
+_report_locks = {}
+_report_locks_guard = threading.Lock()
+_async_report_locks = {}
+
+
+def cached_treatment(crop_type, disease_name, disease_status, severity_level, confidence, growth_stage,
+                     language=DEFAULT_LANGUAGE):
+    """
+    Treatment report (summary + sectioned plan) for a diagnosis, from the
+    treatment cache or one LLM call. Incomplete (fallback) reports are never
+    cached.
+
+    Returns:
+        (report, source) with source "cache", "llm" or "fallback"
+    """
+    key, args = treatment_report_args(crop_type, disease_name, disease_status, severity_level, confidence,
+                                      growth_stage, language)
+    report = cached_report(key)
+    if report is not None:
+        return report, "cache"
+    with _report_locks_guard:
+        lock = _report_locks.setdefault(key, threading.Lock())
+    with lock:
+        report = cached_report(key)
+        if report is not None:
+            return report, "cache"
+        print("🤖 Generating comprehensive treatment plan with AI...")
+        report, complete = generate_treatment_report(*args)
+        if not complete:
+            return report, "fallback"
+        treatment_cache.put("report", key, json.dumps(report), language)
+        return report, "llm"
+
+
+async def cached_treatment_async(crop_type, disease_name, disease_status, severity_level, confidence, growth_stage,
+                                 language=DEFAULT_LANGUAGE):
+    """
+    cached_treatment on the event loop: the LLM call on the async Groq client,
+    treatment cache (SQLite) reads and writes on a thread
+    """
+    key, args = treatment_report_args(crop_type, disease_name, disease_status, severity_level, confidence,
+                                      growth_stage, language)
+    report = await asyncio.to_thread(cached_report, key)
+    if report is not None:
+        return report, "cache"
+    lock = _async_report_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        report = await asyncio.to_thread(cached_report, key)
+        if report is not None:
+            return report, "cache"
+        print("🤖 Generating comprehensive treatment plan with AI (async)...")
+        report, complete = await generate_treatment_report_async(*args)
+        if not complete:
+            return report, "fallback"
+        await asyncio.to_thread(treatment_cache.put, "report", key, json.dumps(report), language)
+        return report, "llm"
+
+
+def treatment_fields(report, source):
+    """Result fields for a treatment report and where it came from"""
+    return {
+        **report,
+        "ai_generated": source != "fallback",
+        "treatment_cached": source == "cache"
+    }
+
+
+def diagnosis_args(result, language):
+    return (result["crop_type"], result["disease_name"], result["disease_status"],
+            result["severity"]["level"], result["confidence"], result["growth_stage"]["stage"], language)
+
+
+def generate_treatment(result, language=DEFAULT_LANGUAGE):
+    """AI-powered treatment plan and quick summary for a detection result"""
+    return treatment_fields(*cached_treatment(*diagnosis_args(result, language)))
+
+
+async def generate_treatment_async(result, language=DEFAULT_LANGUAGE):
+    """generate_treatment without blocking the event loop on the LLM"""
+    return treatment_fields(*await cached_treatment_async(*diagnosis_args(result, language)))
+
+
+def treatment_key(result, language=DEFAULT_LANGUAGE):
+    """Treatment cache key of a detection result; images sharing it get the same report"""
+    return treatment_report_args(*diagnosis_args(result, language))[0]
+
+
+def lookup_treatment(result, language=DEFAULT_LANGUAGE):
+    """generate_treatment fields if the report is already cached, else None (never calls the LLM)"""
+    report = cached_report(treatment_key(result, language))
+    return treatment_fields(report, "cache") if report is not None else None
+
+
+def prewarm_treatment_cache(languages=(DEFAULT_LANGUAGE,), workers=4):
+    """
+    Fill the treatment cache for every class x severity x growth stage x
+    confidence bucket (x language), skipping combinations already cached
+    """
+    combinations = []
+    for info in DISEASE_INFO.values():
+        severities = ("None",) if info["status"] == "healthy" else SEVERITY_LEVELS
+        for language in languages:
+            resolve_language(language)
+            for severity_level in severities:
+                for growth_stage in GROWTH_STAGES:
+                    for bucket in CONFIDENCE_BUCKETS:
+                        combinations.append((info["crop"], info["disease"], info["status"], severity_level,
+                                             bucket / 100, growth_stage, language))
+    
+    start = time.perf_counter()
+    print(f"🔄 Pre-warming {len(combinations)} treatment plans with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sources = [source for _, source in executor.map(lambda combination: cached_treatment(*combination), combinations)]
+    
+    counts = {}
+    for source in sources:
+        counts[source] = counts.get(source, 0) + 1
+    return {"combinations": len(combinations), "seconds": round(time.perf_counter() - start, 1), "reports": counts}
+
+
+def detect_disease_bytes(data, confidence_threshold=0.20, return_all=False, variant=None, input_size=None,
+                         language=None, defer_treatment=False):
+    """
+    Main detection function with comprehensive treatment, on encoded image bytes
+
+    With return_all, every detection surviving class-aware NMS is also
+    returned under "detections" (best first). variant and input_size select
+    the model variant and input resolution (defaults: DETECTOR_VARIANT and
+    DETECTOR_INPUT_SIZE, or the model's fixed size); language the treatment
+    plan language (default DEFAULT_LANGUAGE).
+
+    With defer_treatment, the result is returned without waiting for the LLM:
+    a cached treatment report is still included, otherwise the result is
+    marked treatment_pending and the caller generates it (e.g. with
+    generate_treatment_async).
+    """
+    try:
+        pool, input_size = resolve_model(variant, input_size)
+        language = resolve_language(language)
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Model not loaded: {e}"}
     
     try:
-        # Preprocess
-        input_data, original_img, original_shape = preprocess_image(image_path)
-        
-        # Inference
-        outputs = session.run(None, {input_name: input_data})
-        predictions = outputs[0][0].T
-        
-        # Parse predictions
-        boxes = predictions[:, :4]
-        scores = predictions[:, 4:]
-        max_scores = np.max(scores, axis=1)
-        class_ids = np.argmax(scores, axis=1)
-        
-        # Filter by confidence
-        mask = max_scores >= confidence_threshold
-        
-        if not mask.any():
-            return {"error": "No crop detected. Please upload a clear image of a plant leaf."}
-        
-        boxes = boxes[mask]
-        max_scores = max_scores[mask]
-        class_ids = class_ids[mask]
-        
-        # Convert boxes
-        boxes_xyxy = xywh2xyxy(boxes)
-        h, w = original_shape
-        boxes_xyxy[:, [0, 2]] *= w / 640
-        boxes_xyxy[:, [1, 3]] *= h / 640
+        timer = StageTimer()
         
-        # NMS
-        keep_indices = nms(boxes_xyxy, max_scores)
+        # Decode & preprocess in memory
+        input_data = get_input_buffer(input_size)
+        prepared = prepare_image(data, input_size, input_data[0])
+        timer.lap("preprocess")
+        if "error" in prepared:
+            prepared["timings_ms"] = timer.timings()
+            return prepared
         
-        if len(keep_indices) == 0:
-            return {"error": "No valid detections found."}
+        # Same or near-identical image seen recently: reuse its result (no inference, no LLM)
+        image_hash = dhash(prepared["image"])
+        options = cache_options(confidence_threshold, return_all, variant, input_size, language)
+        cached = result_cache.get(image_hash, options)
+        if cached is not None:
+            timer.lap("cache")
+            cached["cached"] = True
+            cached["timings_ms"] = timer.timings()
+            return cached
         
-        # Best detection
-        best_idx = keep_indices[0]
-        best_box = boxes_xyxy[best_idx]
-        best_score = max_scores[best_idx]
-        best_class = class_ids[best_idx]
+        # Inference; outputs live in the session's bound buffers, so decode before releasing it
+        with pool.acquire() as pooled:
+            outputs = pooled.run(input_data)
+            candidates = decode_predictions(outputs[0][0], confidence_threshold, DEFAULT_TOP_K)
+        timer.lap("inference")
         
-        # Get disease info
-        if best_class not in DISEASE_INFO:
-            return {"error": f"Unknown class detected: {best_class}"}
+        result = build_result(candidates, prepared, return_all)
+        timer.lap("postprocess")
+        if "error" in result:
+            return result
         
-        info = DISEASE_INFO[best_class]
-        crop_type = info["crop"]
-        disease_name = info["disease"]
-        disease_status = info["status"]
-        
-        # Metrics
-        bbox_coords = best_box.tolist()
-        bbox_area = (bbox_coords[2] - bbox_coords[0]) * (bbox_coords[3] - bbox_coords[1])
-        bbox_area_ratio = bbox_area / (h * w)
-        
-        # Severity & Growth stage
-        severity = estimate_severity(original_img, bbox_coords, disease_status)
-        growth_stage = estimate_growth_stage(bbox_area_ratio)
-        
-        # Generate AI-powered treatment plan
-        print("🤖 Generating comprehensive treatment plan with AI...")
-        treatment_plan = generate_treatment_plan(
-            crop_type, disease_name, disease_status, 
-            severity['level'], best_score, growth_stage['stage'],
-            severity['percentage']
-        )
-        
-        quick_summary = generate_quick_summary(
-            crop_type, disease_name, disease_status, severity['level']
-        )
-        
-        return {
-            "success": True,
-            "crop_type": crop_type,
-            "disease_name": disease_name,
-            "disease_status": disease_status,
-            "confidence": round(float(best_score), 3),
-            "severity": severity,
-            "growth_stage": growth_stage,
-            "quick_summary": quick_summary,
-            "treatment_plan": treatment_plan,
-            "ai_generated": True,
-            "bbox": bbox_coords
-        }
+        treatment = lookup_treatment(result, language) if defer_treatment else generate_treatment(result, language)
+        timer.lap("treatment")
+        result["model"] = {"variant": variant or DETECTOR_VARIANT, "input_size": input_size}
+        if treatment is None:
+            # Not cached: the result cache only holds complete results
+            result["treatment_pending"] = True
+        else:
+            result.update(treatment)
+            result_cache.put(image_hash, options, result)
+        result["cached"] = False
+        result["timings_ms"] = timer.timings()
+        return result
         
     except Exception as e:
         import traceback
@@ -424,10 +1015,192 @@ def detect_disease(image_path, confidence_threshold=0.20):
         return {"error": f"Detection failed: {str(e)}"}
 
 
+# Image files picked up when scanning folders
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+# Images per batched inference call, and threads decoding/letterboxing them
+DETECTOR_BATCH_SIZE = int(os.getenv("DETECTOR_BATCH_SIZE", 8))
+PREPROCESS_WORKERS = int(os.getenv("DETECTOR_PREPROCESS_WORKERS", min(8, os.cpu_count() or 1)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS, thread_name_prefix="detector")
+        return _executor
+
+
+def supports_batching(pool):
+    """Whether the model was exported with a dynamic batch dimension"""
+    return not isinstance(pool.input_shape[0], int)
+
+
+def infer_prepared(pool, input_data, prepared, confidence_threshold, batched):
+    """
+    Decoded candidates for each prepared item of a stacked input (None for
+    items without an "image", e.g. errors or cache hits): one inference when
+    the model takes batches, else image by image on one checked-out session
+    """
+    with pool.acquire() as pooled:
+        if batched and any("image" in item for item in prepared):
+            output = pooled.run(input_data)[0]
+            return [
+                decode_predictions(output[i], confidence_threshold, DEFAULT_TOP_K) if "image" in item else None
+                for i, item in enumerate(prepared)
+            ]
+        return [
+            decode_predictions(pooled.run(input_data[i:i + 1])[0][0], confidence_threshold, DEFAULT_TOP_K)
+            if "image" in item else None
+            for i, item in enumerate(prepared)
+        ]
+
+
+def summarize_visit(results):
+    """Per-visit aggregate of the crops and diagnoses found across images"""
+    detected = [r for r in results if "error" not in r]
+    crops = {}
+    diagnoses = {}
+    for r in detected:
+        crops[r["crop_type"]] = crops.get(r["crop_type"], 0) + 1
+        key = (r["crop_type"], r["disease_name"])
+        diagnosis = diagnoses.setdefault(key, {
+            "crop_type": r["crop_type"],
+            "disease_name": r["disease_name"],
+            "disease_status": r["disease_status"],
+            "images": 0,
+            "max_confidence": 0.0,
+            "max_severity": r["severity"]
+        })
+        diagnosis["images"] += 1
+        diagnosis["max_confidence"] = max(diagnosis["max_confidence"], r["confidence"])
+        if r["severity"]["score"] > diagnosis["max_severity"]["score"]:
+            diagnosis["max_severity"] = r["severity"]
+    
+    rejected = {}
+    for r in results:
+        if "rejected" in r:
+            rejected[r["rejected"]] = rejected.get(r["rejected"], 0) + 1
+    
+    diseased = sum(r["disease_status"] == "diseased" for r in detected)
+    return {
+        "images": len(results),
+        "detected": len(detected),
+        "failed": len(results) - len(detected),
+        "rejected": rejected,
+        "healthy": sum(r["disease_status"] == "healthy" for r in detected),
+        "diseased": diseased,
+        "diseased_ratio": round(diseased / len(detected), 3) if detected else 0.0,
+        "crops": crops,
+        "diagnoses": sorted(diagnoses.values(), key=lambda d: (-d["images"], -d["max_severity"]["score"]))
+    }
+
+
+def detect_disease_batch(images, confidence_threshold=0.20, return_all=False, variant=None,
+                         input_size=None, batch_size=None, language=None, treatment=True):
+    """
+    Detect diseases on several encoded images (e.g. all photos of one visit)
+
+    Images are decoded and letterboxed in parallel into one stacked tensor
+    per chunk of batch_size and run as a single inference; models exported
+    with a fixed batch of 1 run image by image on one checked-out session.
+    Treatment plans are generated once per distinct diagnosis; with
+    treatment=False they are skipped (results not served from the result
+    cache have no treatment fields and are not cached).
+
+    Returns:
+        {"results": per-image results in input order (each may be an
+        {"error": ...}), "summary": summarize_visit aggregate, "model": ...}
+    """
+    try:
+        pool, input_size = resolve_model(variant, input_size)
+        language = resolve_language(language)
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Model not loaded: {e}"}
+    
+    timer = StageTimer()
+    executor = _get_executor()
+    batch_size = max(1, batch_size or DETECTOR_BATCH_SIZE)
+    batched = supports_batching(pool)
+    options = cache_options(confidence_threshold, return_all, variant, input_size, language)
+    model = {"variant": variant or DETECTOR_VARIANT, "input_size": input_size}
+    results = []
+    hashes = []
+    
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        input_data = get_input_buffer(input_size, len(chunk))
+        
+        # Parallel decode & letterbox straight into the stacked input tensor
+        futures = [executor.submit(prepare_image, data, input_size, input_data[i]) for i, data in enumerate(chunk)]
+        prepared = []
+        for i, future in enumerate(futures):
+            try:
+                prepared.append(future.result())
+            except Exception as e:
+                input_data[i].fill(0.0)
+                prepared.append({"error": f"Detection failed: {e}"})
+        timer.lap("preprocess")
+        
+        # Images seen recently skip postprocessing and treatment
+        chunk_hashes = [None if "error" in item else dhash(item["image"]) for item in prepared]
+        hits = [None if image_hash is None else result_cache.get(image_hash, options) for image_hash in chunk_hashes]
+        for i, hit in enumerate(hits):
+            if hit is not None:
+                hit["cached"] = True
+                prepared[i] = hit
+        hashes.extend(chunk_hashes)
+        timer.lap("cache")
+        
+        candidates = infer_prepared(pool, input_data, prepared, confidence_threshold, batched)
+        timer.lap("inference")
+        
+        results.extend(
+            build_result(found, item, return_all) if "image" in item else item
+            for item, found in zip(prepared, candidates)
+        )
+        timer.lap("postprocess")
+    
+    # One plan per treatment cache key, so every image gets the report detect_disease_bytes would return
+    groups = {}
+    for i, result in enumerate(results):
+        if "error" not in result and "cached" not in result:
+            groups.setdefault(treatment_key(result, language), []).append(i)
+    if treatment:
+        reports = executor.map(lambda group: generate_treatment(results[group[0]], language), groups.values())
+    else:
+        reports = [None] * len(groups)
+    for group, report in zip(groups.values(), reports):
+        for i in group:
+            results[i]["model"] = model
+            if report is not None:
+                results[i].update(report)
+                result_cache.put(hashes[i], options, results[i])
+            results[i]["cached"] = False
+    timer.lap("treatment")
+    
+    return {
+        "results": results,
+        "summary": summarize_visit(results),
+        "model": {**model, "batched_inference": batched},
+        "timings_ms": timer.timings()
+    }
+
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) > 1:
+    if len(sys.argv) == 2 and Path(sys.argv[1]).is_file():
         result = detect_disease(sys.argv[1])
         print(json.dumps(result, indent=2))
+    elif len(sys.argv) > 1:
+        # Folders, globs or several images: bulk scan (see bulk_scan.py), sharing this module's loaded model
+        sys.modules.setdefault("disease_detector", sys.modules["__main__"])
+        from bulk_scan import main
+        main(sys.argv[1:])
     else:
         print("Usage: python disease_detector.py <image_path>")
+        print("       python disease_detector.py <folder|glob|image>... --output results.jsonl [--no-treatment]")
@@ -1,12 +1,21 @@
 
 import numpy as np
-from stable_baselines3 import PPO
 import os
-from typing import Dict
+from typing import Dict, List, Optional, Sequence
+
+from action_history import ActionHistoryStore
+from numpy_policy import NumpyPolicy, NUMPY_MODEL_PATH
+from policy_table import PolicyTable, POLICY_TABLE_PATH
+from recommendation_cache import RecommendationCache
 
 # Model path
 MODEL_PATH = "./model/improved_ppo_agriculture.zip"
 
+# Inference backend: "sb3" (stable_baselines3 + torch), "numpy" (weights exported by
+# numpy_policy.py) or "table" (grid lookup built by policy_table.py)
+DRL_BACKENDS = ("sb3", "numpy", "table")
+DRL_BACKEND = os.getenv("DRL_BACKEND", "sb3").lower()
+
 # Action space mappings (must match training environment)
 IRRIGATION_OPTIONS = [0, 5, 10, 15, 20]  # mm
 FERTILIZER_OPTIONS = [0, 1, 2, 3]  # kg/acre
@@ -18,12 +27,48 @@ OPTIMAL_P_RANGE = (30, 100)
 OPTIMAL_K_RANGE = (40, 120)
 OPTIMAL_PH_RANGE = (6.0, 7.5)
 
-# Load the trained model
-print("🔄 Loading DRL model...")
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
+# Order of the input fields in the state vector (prev actions are appended)
+STATE_FIELDS = ("moisture", "nitrogen", "phosphorus", "potassium", "ph",
+                "growth", "temp", "humidity", "rain_prob")
+STATE_SIZE = 11
+
+# Quantized-state cache in front of the policy (DRL_CACHE_SIZE=0 disables it)
+recommendation_cache = RecommendationCache.from_env(STATE_FIELDS)
+
+# Previously issued actions per zone, fed back into the state's last two slots
+action_history = ActionHistoryStore.from_env()
+
+# Loaded policies, one per backend
+_policies = {}
+
+
+def load_policy(backend: Optional[str] = None):
+    """
+    Load (once) and return the policy for a backend
+    Both backends expose predict(observation, deterministic=True)
+    """
+    backend = (backend or DRL_BACKEND).lower()
+    if backend not in DRL_BACKENDS:
+        raise ValueError(f"Unknown DRL backend '{backend}'. Choose from {DRL_BACKENDS}")
+
+    if backend not in _policies:
+        if backend == "sb3":
+            from stable_baselines3 import PPO
+
+            if not os.path.exists(MODEL_PATH):
+                raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
+            _policies[backend] = PPO.load(MODEL_PATH)
+        elif backend == "numpy":
+            _policies[backend] = NumpyPolicy.load(NUMPY_MODEL_PATH)
+        else:
+            _policies[backend] = PolicyTable.load(POLICY_TABLE_PATH)
 
-model = PPO.load(MODEL_PATH)
+    return _policies[backend]
+
+
+# Load the trained model
+print(f"🔄 Loading DRL model ({DRL_BACKEND} backend)...")
+model = load_policy(DRL_BACKEND)
 print("✅ Model loaded successfully!")
 
 
@@ -56,9 +101,78 @@ def calculate_health_score(moisture: float, nitrogen: float, phosphorus: float,
     return float(max(0, min(100, health)))
 
 
+def calculate_health_scores(moisture: np.ndarray, nitrogen: np.ndarray, phosphorus: np.ndarray,
+                            potassium: np.ndarray, ph: np.ndarray) -> np.ndarray:
+    """
+    Vectorized calculate_health_score over arrays of soil readings
+    Returns: Array of health scores (0-100)
+    """
+    health = np.full(np.shape(moisture), 100.0)
+
+    health -= np.where(moisture < OPTIMAL_MOISTURE_RANGE[0], (OPTIMAL_MOISTURE_RANGE[0] - moisture) * 0.8, 0.0)
+    health -= np.where(moisture > OPTIMAL_MOISTURE_RANGE[1], (moisture - OPTIMAL_MOISTURE_RANGE[1]) * 0.4, 0.0)
+
+    health -= np.where(nitrogen < OPTIMAL_N_RANGE[0], (OPTIMAL_N_RANGE[0] - nitrogen) * 0.3, 0.0)
+    health -= np.where(phosphorus < OPTIMAL_P_RANGE[0], (OPTIMAL_P_RANGE[0] - phosphorus) * 0.2, 0.0)
+    health -= np.where(potassium < OPTIMAL_K_RANGE[0], (OPTIMAL_K_RANGE[0] - potassium) * 0.2, 0.0)
+
+    health -= np.where((ph < OPTIMAL_PH_RANGE[0]) | (ph > OPTIMAL_PH_RANGE[1]), 15.0, 0.0)
+
+    return np.clip(health, 0, 100)
+
+
+def predict_actions(values: np.ndarray, backend: Optional[str] = None,
+                    previous: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Run the policy on an (n, 9) array of readings (STATE_FIELDS order)
+
+    Rows are looked up in recommendation_cache first; only the misses are
+    stacked into one observation matrix for the model. previous is an
+    optional (n, 2) array of the last (irrigation_mm, fertilizer_kg) per row.
+
+    Returns:
+        (n, 2) array of (irrigation, fertilizer) action indices
+    """
+    backend = (backend or DRL_BACKEND).lower()
+    values = np.asarray(values, dtype=np.float64).reshape(-1, len(STATE_FIELDS))
+    actions = np.zeros((len(values), 2), dtype=np.int64)
+    if previous is None:
+        previous = np.zeros((len(values), 2), dtype=np.float64)
+
+    if recommendation_cache.enabled:
+        values = recommendation_cache.quantize(values)
+        keys = recommendation_cache.keys(np.hstack([values, previous]), extra=backend)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = recommendation_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                actions[i] = cached
+    else:
+        missing = list(range(len(values)))
+
+    if missing:
+        # State is 11 values: the 9 readings + previous irrigation and fertilizer
+        states = np.zeros((len(missing), STATE_SIZE), dtype=np.float32)
+        states[:, :len(STATE_FIELDS)] = values[missing]
+        states[:, len(STATE_FIELDS):] = previous[missing]
+
+        predicted, _states = load_policy(backend).predict(states, deterministic=True)
+        predicted = np.asarray(predicted, dtype=np.int64).reshape(len(missing), 2)
+        actions[missing] = predicted
+
+        if recommendation_cache.enabled:
+            for i, action in zip(missing, predicted.tolist()):
+                recommendation_cache.put(keys[i], tuple(action))
+
+    return actions
+
+
 def get_recommendation(moisture: float, nitrogen: float, phosphorus: float,
                       potassium: float, ph: float, growth: float,
-                      temp: float, humidity: float, rain_prob: float) -> Dict:
+                      temp: float, humidity: float, rain_prob: float,
+                      backend: Optional[str] = None, zone_id: Optional[str] = None) -> Dict:
     """
     Get irrigation and fertilizer recommendation from DRL model
     
@@ -72,31 +186,24 @@ def get_recommendation(moisture: float, nitrogen: float, phosphorus: float,
         temp: Temperature in Celsius (-10 to 50)
         humidity: Humidity percentage (0-100)
         rain_prob: Rain probability (0.0-1.0)
+        backend: Inference backend ("sb3", "numpy" or "table"), defaults to DRL_BACKEND
+        zone_id: Optional zone id; its last issued action fills the previous
+            irrigation/fertilizer state slots and this action is recorded
     
     Returns:
         Dictionary with irrigation_mm, fertilizer_kg, and health score
     """
-    # Build state array (11 values: moisture, N, P, K, pH, growth, temp, humidity, rain_prob, prev_irrigation, prev_fertilizer)
-    state = np.array([
-        moisture,
-        nitrogen,
-        phosphorus,
-        potassium,
-        ph,
-        growth,
-        temp,
-        humidity,
-        rain_prob,
-        0.0,  # previous irrigation (not available for first call)
-        0.0   # previous fertilizer (not available for first call)
-    ], dtype=np.float32)
-    
-    # Get prediction from model
-    action, _states = model.predict(state, deterministic=True)
+    # Get prediction from model (or the recommendation cache)
+    action = predict_actions(
+        [[moisture, nitrogen, phosphorus, potassium, ph, growth, temp, humidity, rain_prob]],
+        backend,
+        previous=action_history.last_actions([zone_id])
+    )[0]
     
     # Convert action indices to actual values
     irrigation_mm = int(IRRIGATION_OPTIONS[int(action[0])])
     fertilizer_kg = int(FERTILIZER_OPTIONS[int(action[1])])
+    action_history.record([zone_id], [irrigation_mm], [fertilizer_kg])
     
     # Calculate health score
     health_score = calculate_health_score(moisture, nitrogen, phosphorus, potassium, ph)
@@ -111,6 +218,45 @@ def get_recommendation(moisture: float, nitrogen: float, phosphorus: float,
     return recommendation
 
 
+def get_recommendations_batch(rows: Sequence[Dict], backend: Optional[str] = None,
+                              record_history: bool = True) -> List[Dict]:
+    """
+    Get recommendations for many zones with a single policy forward pass
+
+    Args:
+        rows: Sequence of dicts with the same keys as get_recommendation's arguments
+            (zone_id is optional per row)
+        backend: Inference backend ("sb3", "numpy" or "table"), defaults to DRL_BACKEND
+        record_history: Record the actions as issued for their zones; disable for
+            previews/recomputes that shouldn't move a zone's previous action
+
+    Returns:
+        List of dictionaries with irrigation_mm, fertilizer_kg, and health score,
+        in the same order as rows
+    """
+    if len(rows) == 0:
+        return []
+
+    values = np.array([[row[name] for name in STATE_FIELDS] for row in rows], dtype=np.float64)
+    zone_ids = [row.get("zone_id") for row in rows]
+    actions = predict_actions(values, backend, previous=action_history.last_actions(zone_ids))
+
+    irrigation_mm = np.asarray(IRRIGATION_OPTIONS)[actions[:, 0]]
+    fertilizer_kg = np.asarray(FERTILIZER_OPTIONS)[actions[:, 1]]
+    if record_history:
+        action_history.record(zone_ids, irrigation_mm.tolist(), fertilizer_kg.tolist())
+    health_scores = calculate_health_scores(*values[:, :5].T)
+
+    return [
+        {
+            "irrigation_mm": int(irrigation),
+            "fertilizer_kg": int(fertilizer),
+            "health": round(float(health), 2)
+        }
+        for irrigation, fertilizer, health in zip(irrigation_mm, fertilizer_kg, health_scores)
+    ]
+
+
 # Test function (optional)
 if __name__ == "__main__":
     print("\n🧪 Testing recommendation function...\n")
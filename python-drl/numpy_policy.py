@@ -0,0 +1,124 @@
+"""
+numpy_policy.py - Torch-free inference for the PPO agriculture policy
+
+The trained policy is a small MLP (11 -> 64 -> 64 -> 9 logits, tanh).
+`python numpy_policy.py` exports its weights from the SB3 zip into a
+compact .npz; NumpyPolicy evaluates the deterministic action with plain
+NumPy matmuls so workers don't need stable_baselines3/torch at all.
+"""
+
+import numpy as np
+import os
+from typing import Optional, Tuple
+
+# Model paths
+SB3_MODEL_PATH = "./model/improved_ppo_agriculture.zip"
+NUMPY_MODEL_PATH = "./model/ppo_policy.npz"
+
+
+class NumpyPolicy:
+    """Deterministic PPO policy evaluated with NumPy (mirrors PPO.predict)"""
+
+    def __init__(self, weights: dict):
+        # Weights are stored as (in_features, out_features) so obs @ w works directly
+        self.w0 = np.ascontiguousarray(weights["w0"], dtype=np.float32)
+        self.b0 = np.ascontiguousarray(weights["b0"], dtype=np.float32)
+        self.w1 = np.ascontiguousarray(weights["w1"], dtype=np.float32)
+        self.b1 = np.ascontiguousarray(weights["b1"], dtype=np.float32)
+        self.wa = np.ascontiguousarray(weights["wa"], dtype=np.float32)
+        self.ba = np.ascontiguousarray(weights["ba"], dtype=np.float32)
+        self.action_dims = [int(n) for n in weights["action_dims"]]
+        self._splits = np.cumsum(self.action_dims)[:-1]
+
+    @classmethod
+    def load(cls, path: str = NUMPY_MODEL_PATH) -> "NumpyPolicy":
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"NumPy policy not found at {path}. Run `python numpy_policy.py` to export it.")
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def logits(self, obs: np.ndarray) -> np.ndarray:
+        """Action logits for an (n, 11) observation matrix"""
+        hidden = np.tanh(obs @ self.w0 + self.b0)
+        hidden = np.tanh(hidden @ self.w1 + self.b1)
+        return hidden @ self.wa + self.ba
+
+    def predict(self, observation: np.ndarray, deterministic: bool = True) -> Tuple[np.ndarray, None]:
+        """
+        Same contract as PPO.predict for a MultiDiscrete action space:
+        a single (11,) state returns shape (2,), an (n, 11) matrix returns (n, 2)
+        """
+        if not deterministic:
+            raise ValueError("NumpyPolicy only supports deterministic=True")
+
+        obs = np.asarray(observation, dtype=np.float32)
+        single = obs.ndim == 1
+        obs = obs.reshape(-1, self.w0.shape[0])
+
+        logits = self.logits(obs)
+        actions = np.stack(
+            [part.argmax(axis=1) for part in np.split(logits, self._splits, axis=1)],
+            axis=1
+        )
+
+        return (actions[0] if single else actions), None
+
+
+def export_policy(sb3_path: str = SB3_MODEL_PATH, npz_path: str = NUMPY_MODEL_PATH) -> str:
+    """Extract the policy network weights from an SB3 PPO zip into a .npz"""
+    from stable_baselines3 import PPO
+
+    model = PPO.load(sb3_path, device="cpu")
+    params = {name: tensor.detach().cpu().numpy() for name, tensor in model.policy.state_dict().items()}
+
+    np.savez_compressed(
+        npz_path,
+        w0=params["mlp_extractor.policy_net.0.weight"].T,
+        b0=params["mlp_extractor.policy_net.0.bias"],
+        w1=params["mlp_extractor.policy_net.2.weight"].T,
+        b1=params["mlp_extractor.policy_net.2.bias"],
+        wa=params["action_net.weight"].T,
+        ba=params["action_net.bias"],
+        action_dims=np.asarray(model.action_space.nvec, dtype=np.int64),
+    )
+    return npz_path
+
+
+def verify_parity(samples: int = 10000, sb3_path: str = SB3_MODEL_PATH,
+                  npz_path: str = NUMPY_MODEL_PATH, seed: Optional[int] = 0) -> dict:
+    """Compare NumpyPolicy against PPO.predict on random states from the observation space"""
+    from stable_baselines3 import PPO
+
+    model = PPO.load(sb3_path, device="cpu")
+    policy = NumpyPolicy.load(npz_path)
+
+    rng = np.random.default_rng(seed)
+    low, high = model.observation_space.low, model.observation_space.high
+    states = rng.uniform(low, high, size=(samples, len(low))).astype(np.float32)
+
+    expected, _ = model.predict(states, deterministic=True)
+    actual, _ = policy.predict(states, deterministic=True)
+    mismatches = int(np.any(expected != actual, axis=1).sum())
+
+    return {"samples": samples, "mismatches": mismatches, "match_rate": 1.0 - mismatches / samples}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the PPO policy to a NumPy .npz and check parity")
+    parser.add_argument("--sb3-model", default=SB3_MODEL_PATH)
+    parser.add_argument("--output", default=NUMPY_MODEL_PATH)
+    parser.add_argument("--verify", type=int, default=10000, help="Random states for the parity check (0 to skip)")
+    args = parser.parse_args()
+
+    print(f"🔄 Exporting policy from {args.sb3_model}...")
+    export_policy(args.sb3_model, args.output)
+    print(f"✅ Saved NumPy policy to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+    if args.verify > 0:
+        report = verify_parity(args.verify, args.sb3_model, args.output)
+        print(f"🧪 Parity vs SB3: {report['samples'] - report['mismatches']}/{report['samples']} "
+              f"identical actions ({report['match_rate'] * 100:.3f}%)")
+        if report["mismatches"]:
+            raise SystemExit(1)
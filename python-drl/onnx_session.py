@@ -0,0 +1,174 @@
+"""
+onnx_session.py - Tuned ONNX Runtime sessions for the disease detector
+
+Session options come from environment variables, so they can be tuned per
+node type. A SessionPool holds several sessions sized to the host's cores;
+concurrent requests each check out their own session instead of contending
+on one. Outputs are written through IO binding into buffers preallocated per
+input shape, for the few most recently used shapes.
+
+Environment:
+    ORT_SESSION_POOL_SIZE   sessions in the pool (default: cores // 2, 1-4)
+    ORT_INTRA_OP_THREADS    threads per session (default: cores // pool size)
+    ORT_INTER_OP_THREADS    threads for parallel execution mode (default 1)
+    ORT_EXECUTION_MODE      sequential | parallel (default sequential)
+    ORT_GRAPH_OPTIMIZATION  disabled | basic | extended | all (default all)
+    ORT_ENABLE_MEM_ARENA    1 | 0 (default 1)
+    ORT_ENABLE_MEM_PATTERN  1 | 0 (default 1)
+"""
+
+import os
+import queue
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+# Input shapes (batch size x input size) whose output buffers each session keeps
+MAX_BUFFERED_SHAPES = 4
+
+OUTPUT_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+}
+
+
+def _env_flag(name: str, default: bool, env=os.environ) -> bool:
+    value = env.get(name)
+    return default if value is None else value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def session_config_from_env(environ: Optional[Dict[str, str]] = None) -> Dict:
+    """Session pool configuration from ORT_* environment variables (of environ, default os.environ)"""
+    env = os.environ if environ is None else environ
+    cores = os.cpu_count() or 1
+    pool_size = int(env.get("ORT_SESSION_POOL_SIZE", max(1, min(4, cores // 2))))
+    config = {
+        "pool_size": max(1, pool_size),
+        "intra_op_threads": int(env.get("ORT_INTRA_OP_THREADS", max(1, cores // max(1, pool_size)))),
+        "inter_op_threads": int(env.get("ORT_INTER_OP_THREADS", 1)),
+        "execution_mode": env.get("ORT_EXECUTION_MODE", "sequential").lower(),
+        "graph_optimization": env.get("ORT_GRAPH_OPTIMIZATION", "all").lower(),
+        "enable_mem_arena": _env_flag("ORT_ENABLE_MEM_ARENA", True, env),
+        "enable_mem_pattern": _env_flag("ORT_ENABLE_MEM_PATTERN", True, env),
+        "providers": ["CPUExecutionProvider"],
+    }
+    if config["graph_optimization"] not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"ORT_GRAPH_OPTIMIZATION must be one of {list(GRAPH_OPTIMIZATION_LEVELS)}")
+    if config["execution_mode"] not in EXECUTION_MODES:
+        raise ValueError(f"ORT_EXECUTION_MODE must be one of {list(EXECUTION_MODES)}")
+    return config
+
+
+def build_session_options(config: Dict) -> ort.SessionOptions:
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = config["intra_op_threads"]
+    options.inter_op_num_threads = config["inter_op_threads"]
+    options.execution_mode = EXECUTION_MODES[config["execution_mode"]]
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[config["graph_optimization"]]
+    options.enable_cpu_mem_arena = config["enable_mem_arena"]
+    options.enable_mem_pattern = config["enable_mem_pattern"]
+    return options
+
+
+class PooledSession:
+    """One InferenceSession with IO binding into preallocated output buffers"""
+
+    def __init__(self, model_path: str, options: ort.SessionOptions, providers: List[str]):
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_shape = self.session.get_inputs()[0].shape
+        self.outputs = self.session.get_outputs()
+        self._binding = self.session.io_binding()
+        self._buffers = OrderedDict()  # input shape -> output arrays, least recently used first
+
+    def run(self, input_data: np.ndarray) -> List[np.ndarray]:
+        """
+        Run on a contiguous float32 input. The returned arrays are reused by the
+        next run on this session, so read them before releasing it to the pool.
+        """
+        input_data = np.ascontiguousarray(input_data, dtype=np.float32)
+        binding = self._binding
+        binding.clear_binding_inputs()
+        binding.clear_binding_outputs()
+        binding.bind_cpu_input(self.input_name, input_data)
+
+        buffers = self._buffers.get(input_data.shape)
+        if buffers is not None:
+            self._buffers.move_to_end(input_data.shape)
+            for output, buffer in zip(self.outputs, buffers):
+                binding.bind_output(output.name, "cpu", 0, buffer.dtype, buffer.shape, buffer.ctypes.data)
+            self.session.run_with_iobinding(binding)
+            return buffers
+
+        # First run for this input shape: let ORT allocate, then keep same-shaped buffers for next time
+        for output in self.outputs:
+            binding.bind_output(output.name, "cpu")
+        self.session.run_with_iobinding(binding)
+        results = binding.copy_outputs_to_cpu()
+        self._buffers[input_data.shape] = [
+            np.empty(result.shape, dtype=OUTPUT_DTYPES.get(output.type, result.dtype))
+            for output, result in zip(self.outputs, results)
+        ]
+        if len(self._buffers) > MAX_BUFFERED_SHAPES:
+            self._buffers.popitem(last=False)
+        return results
+
+
+class SessionPool:
+    """Fixed pool of sessions checked out one request at a time"""
+
+    def __init__(self, model_path: str, config: Optional[Dict] = None):
+        self.model_path = model_path
+        self.config = config or session_config_from_env()
+        options = build_session_options(self.config)
+        self._sessions = [
+            PooledSession(model_path, options, self.config["providers"]) for _ in range(self.config["pool_size"])
+        ]
+        self._idle = queue.Queue()
+        for pooled in self._sessions:
+            self._idle.put(pooled)
+
+    @property
+    def size(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def input_name(self) -> str:
+        return self._sessions[0].input_name
+
+    @property
+    def input_shape(self) -> list:
+        return self._sessions[0].input_shape
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Check out a session for the duration of the with-block"""
+        pooled = self._idle.get(timeout=timeout)
+        try:
+            yield pooled
+        finally:
+            self._idle.put(pooled)
+
+    def describe(self) -> Dict:
+        return {
+            "model_path": self.model_path,
+            "idle_sessions": self._idle.qsize(),
+            "io_binding": True,
+            **self.config,
+        }
@@ -0,0 +1,199 @@
+"""
+policy_table.py - Precomputed lookup table for the PPO agriculture policy
+
+The action space is only 5 x 4 discrete choices, so the policy can be
+swept once over a grid of the bounded state ranges and stored as one byte
+per cell. PolicyTable answers predict() by nearest-grid-point lookup from a
+memory-mapped .npy, which needs nothing but NumPy at serving time.
+
+Usage:
+    python policy_table.py --points moisture=21,nitrogen=13 --report 100000
+    python policy_table.py --report-only --report 100000
+"""
+
+import json
+import numpy as np
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from numpy_policy import NumpyPolicy
+
+POLICY_TABLE_PATH = "./model/policy_table.npy"
+
+# State axes in observation order: (name, low, high, default grid points).
+# Bounds match the training observation space. Previous actions only take
+# the discrete option values, so their axes hold exactly the action grids
+# and zone_id requests (per-zone history) get the same actions as the live
+# policy. The defaults (~126M cells, ~126 MB memory-mapped) disagree with the
+# live policy on ~7% of uniformly random states; pH, growth and rain
+# probability barely move the policy, so resolution is spent elsewhere.
+STATE_AXES = (
+    ("moisture", 0.0, 100.0, 16),
+    ("nitrogen", 0.0, 200.0, 16),
+    ("phosphorus", 0.0, 200.0, 7),
+    ("potassium", 0.0, 200.0, 7),
+    ("ph", 4.0, 9.0, 2),
+    ("growth", 0.0, 1.0, 2),
+    ("temp", -10.0, 50.0, 9),
+    ("humidity", 0.0, 100.0, 7),
+    ("rain_prob", 0.0, 1.0, 2),
+    ("prev_irrigation", 0.0, 20.0, 5),
+    ("prev_fertilizer", 0.0, 3.0, 4),
+)
+HISTORY_AXES = ("prev_irrigation", "prev_fertilizer")
+
+SWEEP_CHUNK_SIZE = 1 << 18
+
+
+def metadata_path(table_path: str) -> str:
+    return os.path.splitext(table_path)[0] + ".json"
+
+
+def parse_points(spec: str) -> Dict[str, int]:
+    """Parse "moisture=21,nitrogen=13" into {"moisture": 21, "nitrogen": 13}"""
+    names = [axis[0] for axis in STATE_AXES]
+    points = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        if name.strip() not in names:
+            raise ValueError(f"Unknown state axis '{name.strip()}'")
+        points[name.strip()] = int(value)
+    return points
+
+
+class PolicyTable:
+    """Nearest-grid-point policy lookup (mirrors PPO.predict)"""
+
+    def __init__(self, table: np.ndarray, axes: list, action_dims: list):
+        self.table = table
+        self.flat_table = table.reshape(-1) if table is not None else None
+        self.axes = axes
+        self.action_dims = [int(n) for n in action_dims]
+        self.low = np.array([axis["low"] for axis in axes], dtype=np.float64)
+        self.high = np.array([axis["high"] for axis in axes], dtype=np.float64)
+        self.points = np.array([axis["points"] for axis in axes], dtype=np.int64)
+        self.shape = tuple(self.points.tolist())
+        # Tables built with a single point per previous-action axis can't follow zone history
+        self._flat_history = [i for i, axis in enumerate(axes) if axis["name"] in HISTORY_AXES and axis["points"] == 1]
+        self._warned_history = False
+
+    @classmethod
+    def load(cls, path: str = POLICY_TABLE_PATH) -> "PolicyTable":
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Policy table not found at {path}. Run `python policy_table.py` to build it.")
+        with open(metadata_path(path)) as f:
+            meta = json.load(f)
+        return cls(np.load(path, mmap_mode="r"), meta["axes"], meta["action_dims"])
+
+    def grid_values(self, indices: np.ndarray) -> np.ndarray:
+        """State values at (n, axes) integer grid indices"""
+        span = np.where(self.points > 1, (self.high - self.low) / np.maximum(self.points - 1, 1), 0.0)
+        return self.low + indices * span
+
+    def grid_indices(self, obs: np.ndarray) -> np.ndarray:
+        """Nearest grid index per axis for an (n, axes) observation matrix"""
+        scale = np.where(self.points > 1, (self.points - 1) / (self.high - self.low), 0.0)
+        indices = np.rint((obs - self.low) * scale).astype(np.int64)
+        return np.clip(indices, 0, self.points - 1)
+
+    def predict(self, observation: np.ndarray, deterministic: bool = True) -> Tuple[np.ndarray, None]:
+        obs = np.asarray(observation, dtype=np.float64)
+        single = obs.ndim == 1
+        obs = obs.reshape(-1, len(self.axes))
+        if (self._flat_history and not self._warned_history
+                and np.any(obs[:, self._flat_history] != self.low[self._flat_history])):
+            self._warned_history = True
+            print("⚠️ Policy table has no previous-action axes, so zone history is ignored; rebuild it with "
+                  "`python policy_table.py --points prev_irrigation=5,prev_fertilizer=4`")
+
+        flat = np.ravel_multi_index(tuple(self.grid_indices(obs).T), self.shape)
+        combined = np.asarray(self.flat_table[flat], dtype=np.int64)
+        actions = np.stack(np.divmod(combined, self.action_dims[1]), axis=1)
+
+        return (actions[0] if single else actions), None
+
+
+def build_table(path: str = POLICY_TABLE_PATH, points: Optional[Dict[str, int]] = None,
+                policy: Optional[NumpyPolicy] = None, chunk_size: int = SWEEP_CHUNK_SIZE) -> PolicyTable:
+    """Sweep the policy over the grid and write the table (.npy) plus its axes (.json)"""
+    points = points or {}
+    policy = policy or NumpyPolicy.load()
+
+    axes = [
+        {"name": name, "low": low, "high": high, "points": int(points.get(name, default))}
+        for name, low, high, default in STATE_AXES
+    ]
+    if policy.action_dims[0] * policy.action_dims[1] > 256:
+        raise ValueError("Action space does not fit in one byte per cell")
+
+    table = PolicyTable(None, axes, policy.action_dims)
+    cells = int(np.prod(table.points))
+    data = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=table.shape)
+    flat_view = data.reshape(-1)
+
+    for start in range(0, cells, chunk_size):
+        stop = min(start + chunk_size, cells)
+        indices = np.stack(np.unravel_index(np.arange(start, stop), table.shape), axis=1)
+        actions, _ = policy.predict(table.grid_values(indices).astype(np.float32))
+        flat_view[start:stop] = actions[:, 0] * policy.action_dims[1] + actions[:, 1]
+
+    data.flush()
+    del data
+
+    with open(metadata_path(path), "w") as f:
+        json.dump({"axes": axes, "action_dims": policy.action_dims, "cells": cells}, f, indent=2)
+
+    return PolicyTable.load(path)
+
+
+def disagreement_report(table: PolicyTable, reference, samples: int = 100000,
+                        seed: Optional[int] = 0) -> Dict:
+    """
+    Compare the table against a live policy on random states within the axis bounds
+    (axes with a single grid point are held at that value, as the API does)
+    """
+    rng = np.random.default_rng(seed)
+    states = rng.uniform(table.low, table.high, size=(samples, len(table.axes)))
+    single = table.points == 1
+    states[:, single] = table.low[single]
+
+    expected, _ = reference.predict(states.astype(np.float32), deterministic=True)
+    actual, _ = table.predict(states)
+    expected = np.asarray(expected).reshape(samples, 2)
+
+    return {
+        "samples": samples,
+        "cells": int(np.prod(table.points)),
+        "table_bytes": int(np.prod(table.points)) * table.table.itemsize,
+        "irrigation_disagreement": float(np.mean(expected[:, 0] != actual[:, 0])),
+        "fertilizer_disagreement": float(np.mean(expected[:, 1] != actual[:, 1])),
+        "action_disagreement": float(np.mean(np.any(expected != actual, axis=1))),
+        "points": {axis["name"]: axis["points"] for axis in table.axes},
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a policy lookup table and report its disagreement rate")
+    parser.add_argument("--output", default=POLICY_TABLE_PATH)
+    parser.add_argument("--points", default="", help="Grid points per axis, e.g. moisture=21,nitrogen=13")
+    parser.add_argument("--report", type=int, default=100000, help="Random states for the report (0 to skip)")
+    parser.add_argument("--report-only", action="store_true", help="Only report on an existing table")
+    args = parser.parse_args()
+
+    policy = NumpyPolicy.load()
+
+    if args.report_only:
+        table = PolicyTable.load(args.output)
+    else:
+        started = time.time()
+        table = build_table(args.output, parse_points(args.points), policy)
+        print(f"✅ Built {args.output}: {table.shape} "
+              f"({int(np.prod(table.points))} cells) in {time.time() - started:.1f}s")
+
+    if args.report > 0:
+        report = disagreement_report(table, policy, args.report)
+        print("📊 Disagreement vs live policy:")
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,94 @@
+"""
+postprocess.py - YOLO output decoding and NMS for the disease detector
+
+decode_predictions thresholds the raw (4 + classes, anchors) output and
+keeps only the top-k candidates; batched_nms runs greedy NMS for all classes
+at once by offsetting each class's boxes into its own coordinate range, with
+the pairwise IoUs computed as one matrix.
+"""
+
+import numpy as np
+
+# Candidates kept (by score) before NMS, and detections kept after it
+DEFAULT_TOP_K = 300
+DEFAULT_MAX_DETECTIONS = 100
+DEFAULT_IOU_THRESHOLD = 0.45
+
+# Above this many candidates, IoUs are computed row by row instead of as an (n, n) matrix
+MATRIX_NMS_LIMIT = 2048
+
+
+def decode_predictions(output, confidence_threshold=0.20, top_k=DEFAULT_TOP_K):
+    """
+    Split one image's raw output of shape (4 + classes, anchors) into candidates
+
+    Returns:
+        (n, 4) xywh boxes, (n,) scores and (n,) class ids for the candidates
+        scoring >= confidence_threshold, at most top_k of them, best first
+    """
+    class_scores = output[4:]
+    class_ids = class_scores.argmax(axis=0)
+    scores = np.take_along_axis(class_scores, class_ids[None, :], axis=0)[0]
+
+    candidates = np.flatnonzero(scores >= confidence_threshold)
+    if top_k is not None and len(candidates) > top_k:
+        candidates = candidates[np.argpartition(scores[candidates], -top_k)[-top_k:]]
+    candidates = candidates[np.argsort(scores[candidates], kind="stable")[::-1]]
+
+    return output[:4, candidates].T, scores[candidates], class_ids[candidates]
+
+
+def box_iou(box, boxes):
+    """IoU of one xyxy box against (n, 4) xyxy boxes"""
+    w = np.maximum(0.0, np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]))
+    h = np.maximum(0.0, np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]))
+    inter = w * h
+    union = (box[2] - box[0]) * (box[3] - box[1]) + (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) - inter
+    return inter / union
+
+
+def box_iou_matrix(boxes):
+    """(n, n) pairwise IoU of xyxy boxes"""
+    x1, y1, x2, y2 = (boxes[:, i] for i in range(4))
+    w = np.maximum(0.0, np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]))
+    h = np.maximum(0.0, np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]))
+    inter = w * h
+    areas = (x2 - x1) * (y2 - y1)
+    return inter / (areas[:, None] + areas[None, :] - inter)
+
+
+def batched_nms(boxes, scores, class_ids=None, iou_threshold=DEFAULT_IOU_THRESHOLD,
+                class_agnostic=False, max_detections=DEFAULT_MAX_DETECTIONS):
+    """
+    Greedy NMS over xyxy boxes; boxes of different classes never suppress
+    each other unless class_agnostic is set
+
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if not class_agnostic and class_ids is not None:
+        # Shift each class into its own disjoint region so one NMS pass handles all classes
+        offset = boxes.max() - boxes.min() + 1.0
+        boxes = boxes + (np.asarray(class_ids, dtype=np.float64) * offset)[:, None]
+
+    order = np.argsort(scores, kind="stable")[::-1]
+    boxes = boxes[order]
+    n = len(boxes)
+    suppressed = np.zeros(n, dtype=bool)
+    iou = box_iou_matrix(boxes) if n <= MATRIX_NMS_LIMIT else None
+
+    keep = []
+    for i in range(n):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        if max_detections is not None and len(keep) >= max_detections:
+            break
+        overlaps = iou[i, i + 1:] if iou is not None else box_iou(boxes[i], boxes[i + 1:])
+        suppressed[i + 1:] |= overlaps > iou_threshold
+
+    return order[keep]
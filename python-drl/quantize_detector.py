@@ -0,0 +1,174 @@
+"""
+quantize_detector.py - INT8 static quantization of the disease detector
+
+Calibrates activation ranges on a folder of representative field images
+(preprocessed exactly like at inference) and writes a QDQ INT8 model that
+disease_detector.py serves as the "int8" variant.
+
+Usage (from python-drl/):
+    python quantize_detector.py --calibration ./calibration_images
+    python quantize_detector.py --calibration ./calibration_images --compare 50
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from disease_detector import DEFAULT_MODEL_VARIANTS, IMAGE_EXTENSIONS, MODEL_PATH, decode_image, letterbox_into
+from postprocess import decode_predictions
+
+CALIBRATION_METHODS = {
+    "minmax": CalibrationMethod.MinMax,
+    "entropy": CalibrationMethod.Entropy,
+    "percentile": CalibrationMethod.Percentile,
+}
+
+
+def list_images(folder, limit=None):
+    paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return paths[:limit] if limit else paths
+
+
+def load_input(path, input_size):
+    """One image as a (1, 3, size, size) model input"""
+    img, _ = decode_image(Path(path).read_bytes(), target_size=input_size)
+    tensor = np.empty((1, 3, input_size, input_size), dtype=np.float32)
+    letterbox_into(img, tensor[0])
+    return tensor
+
+
+def model_input(model_path):
+    session = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+    return session.get_inputs()[0]
+
+
+def output_nodes(model_path):
+    """
+    Names of the nodes producing the graph outputs. YOLO heads concatenate
+    pixel-space boxes with [0, 1] class scores, so quantizing that concat with
+    one scale would crush the scores; it stays in float.
+    """
+    graph = onnx.load(str(model_path)).graph
+    outputs = {output.name for output in graph.output}
+    return [node.name for node in graph.node if outputs.intersection(node.output)]
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """Feeds calibration images one at a time to the quantizer"""
+
+    def __init__(self, paths, input_name, input_size):
+        self.input_name = input_name
+        self.input_size = input_size
+        self._paths = iter(paths)
+
+    def get_next(self):
+        path = next(self._paths, None)
+        if path is None:
+            return None
+        return {self.input_name: load_input(path, self.input_size)}
+
+
+def quantize_detector(model_path, calibration_dir, output_path, input_size=None,
+                      max_images=200, method="minmax", per_channel=True):
+    """
+    Write a static INT8 (QDQ) copy of the detector
+
+    Args:
+        model_path: FP32 ONNX model
+        calibration_dir: Folder (searched recursively) of representative images
+        output_path: Where to write the INT8 model
+        input_size: Calibration resolution; defaults to the model's fixed size or 640
+        max_images: Calibration images used (sorted by path)
+        method: minmax, entropy or percentile
+        per_channel: Per-channel weight scales (better accuracy for conv weights)
+    """
+    paths = list_images(calibration_dir, max_images)
+    if not paths:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+
+    spec = model_input(model_path)
+    height = spec.shape[2]
+    input_size = input_size or (height if isinstance(height, int) else 640)
+
+    # Shape inference + graph cleanup recommended before static quantization
+    preprocessed = Path(output_path).with_suffix(".preprocessed.onnx")
+    quant_pre_process(str(model_path), str(preprocessed), skip_symbolic_shape=True)
+
+    try:
+        excluded = output_nodes(preprocessed)
+        print(f"🔄 Calibrating on {len(paths)} images at {input_size}x{input_size} ({method})...")
+        quantize_static(
+            str(preprocessed),
+            str(output_path),
+            ImageCalibrationReader(paths, spec.name, input_size),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=CALIBRATION_METHODS[method],
+            nodes_to_exclude=excluded,
+        )
+    finally:
+        preprocessed.unlink(missing_ok=True)
+
+    fp32_mb = Path(model_path).stat().st_size / 1e6
+    int8_mb = Path(output_path).stat().st_size / 1e6
+    print(f"✅ INT8 model saved to {output_path} ({fp32_mb:.1f} MB -> {int8_mb:.1f} MB)")
+    return input_size
+
+
+def compare_models(fp32_path, int8_path, paths, input_size):
+    """Top-1 class agreement and per-image latency of the INT8 model against FP32"""
+    sessions = {
+        name: ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+        for name, path in (("fp32", fp32_path), ("int8", int8_path))
+    }
+    timings = {name: 0.0 for name in sessions}
+    agree = 0
+    for path in paths:
+        tensor = load_input(path, input_size)
+        top = {}
+        for name, session in sessions.items():
+            start = time.perf_counter()
+            output = session.run(None, {session.get_inputs()[0].name: tensor})[0][0]
+            timings[name] += time.perf_counter() - start
+            _, scores, class_ids = decode_predictions(output, 0.0, 1)
+            top[name] = int(class_ids[0]) if len(class_ids) else None
+        agree += top["fp32"] == top["int8"]
+
+    n = len(paths)
+    print(f"📊 Top-1 agreement: {agree}/{n} ({agree / n:.1%})")
+    for name, total in timings.items():
+        print(f"   {name}: {total / n * 1000:.1f} ms/image")
+    print(f"   speedup: {timings['fp32'] / timings['int8']:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize the disease detector to INT8")
+    parser.add_argument("--calibration", required=True, help="Folder of representative images")
+    parser.add_argument("--model", default=MODEL_PATH, help="FP32 model to quantize")
+    parser.add_argument("--output", default=DEFAULT_MODEL_VARIANTS["int8"], help="INT8 model path")
+    parser.add_argument("--input-size", type=int, default=None, help="Calibration input size")
+    parser.add_argument("--max-images", type=int, default=200)
+    parser.add_argument("--method", choices=sorted(CALIBRATION_METHODS), default="minmax")
+    parser.add_argument("--per-tensor", action="store_true", help="Per-tensor instead of per-channel weights")
+    parser.add_argument("--compare", type=int, default=0, metavar="N",
+                        help="Compare FP32 and INT8 on N calibration images afterwards")
+    args = parser.parse_args()
+
+    size = quantize_detector(args.model, args.calibration, args.output, args.input_size,
+                             args.max_images, args.method, not args.per_tensor)
+    if args.compare:
+        compare_models(args.model, args.output, list_images(args.calibration, args.compare), size)
@@ -0,0 +1,133 @@
+"""
+recommendation_batcher.py - Micro-batching worker for DRL recommendations
+
+Requests enqueue their readings and await a future; a background thread
+collects up to max_batch_size rows (or waits at most max_wait_ms after the
+first one), runs one batched predict, and resolves every future. The
+blocking model call never runs on the event loop, and under load many
+requests share one forward pass.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, Dict, List, Sequence
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+class MicroBatcher:
+    """Collects single rows into batches for a batch predict function"""
+
+    def __init__(self, predict_batch: Callable[[Sequence[Dict]], List[Dict]],
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.requests = 0
+        self.largest_batch = 0
+        self.batch_size_histogram = {}  # power-of-two bucket upper bound -> batches
+
+    @classmethod
+    def from_env(cls, predict_batch: Callable[[Sequence[Dict]], List[Dict]]) -> "MicroBatcher":
+        """Build from DRL_MAX_BATCH_SIZE and DRL_MAX_WAIT_MS"""
+        return cls(
+            predict_batch,
+            max_batch_size=int(os.getenv("DRL_MAX_BATCH_SIZE", DEFAULT_MAX_BATCH_SIZE)),
+            max_wait_ms=float(os.getenv("DRL_MAX_WAIT_MS", DEFAULT_MAX_WAIT_MS)),
+        )
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="drl-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: Dict) -> Future:
+        """Enqueue one row; the future resolves to its recommendation"""
+        self.start()
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    async def recommend(self, row: Dict) -> Dict:
+        return await asyncio.wrap_future(self.submit(row))
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Drain whatever is already queued even when the wait is over
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            # Requests cancelled while queued (client disconnect, timeout) are dropped
+            batch = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            rows = [row for row, _ in batch]
+            try:
+                results = self.predict_batch(rows)
+            except Exception as e:
+                for _, future in batch:
+                    self._resolve(future, exception=e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    self._resolve(future, result=result)
+            self._record(len(batch))
+
+    @staticmethod
+    def _resolve(future: Future, result=None, exception=None) -> None:
+        """Set a future's outcome; one already resolved future must not stop the worker"""
+        if future.done():
+            return
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _record(self, size: int) -> None:
+        bucket = 1 << (size - 1).bit_length()
+        with self._lock:
+            self.batches += 1
+            self.requests += size
+            self.largest_batch = max(self.largest_batch, size)
+            self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "queued": self._queue.qsize(),
+                "batches": self.batches,
+                "requests": self.requests,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "batch_size_histogram": {
+                    f"<={bucket}": count for bucket, count in sorted(self.batch_size_histogram.items())
+                },
+            }
@@ -0,0 +1,133 @@
+"""
+recommendation_cache.py - LRU + TTL memoization for DRL recommendations
+
+Sensor readings are quantized (e.g. moisture to 0.5%, pH to 0.05) and the
+quantized state is used both as the cache key and as the model input, so a
+cached action is exactly what the model would return for that bucket.
+"""
+
+import numpy as np
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+# Default quantization step per SoilDataInput field (0 = use the exact value)
+DEFAULT_QUANTIZATION = {
+    "moisture": 0.5,
+    "nitrogen": 1.0,
+    "phosphorus": 1.0,
+    "potassium": 1.0,
+    "ph": 0.05,
+    "growth": 0.01,
+    "temp": 0.5,
+    "humidity": 1.0,
+    "rain_prob": 0.01,
+}
+
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_TTL_SECONDS = 900.0
+
+
+def parse_quantization(spec: str) -> Dict[str, float]:
+    """Parse "moisture=0.5,ph=0.05" into {"moisture": 0.5, "ph": 0.05}"""
+    steps = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        if name.strip() not in DEFAULT_QUANTIZATION:
+            raise ValueError(f"Unknown quantization field '{name.strip()}'")
+        steps[name.strip()] = float(value)
+    return steps
+
+
+class RecommendationCache:
+    """Thread-safe LRU cache with per-entry expiry, keyed on quantized states"""
+
+    def __init__(self, fields: Sequence[str], max_size: int = DEFAULT_MAX_SIZE,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 quantization: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        steps = {**DEFAULT_QUANTIZATION, **(quantization or {})}
+        self.fields = tuple(fields)
+        self.steps = np.array([steps.get(name, 0.0) for name in self.fields], dtype=np.float64)
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls, fields: Sequence[str]) -> "RecommendationCache":
+        """Build from DRL_CACHE_SIZE, DRL_CACHE_TTL and DRL_CACHE_QUANTIZATION"""
+        return cls(
+            fields,
+            max_size=int(os.getenv("DRL_CACHE_SIZE", DEFAULT_MAX_SIZE)),
+            ttl_seconds=float(os.getenv("DRL_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            quantization=parse_quantization(os.getenv("DRL_CACHE_QUANTIZATION", "")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def quantize(self, values: np.ndarray) -> np.ndarray:
+        """Snap an (n, len(fields)) array of readings onto the quantization grid"""
+        values = np.asarray(values, dtype=np.float64)
+        steps = np.where(self.steps > 0, self.steps, 1.0)
+        return np.where(self.steps > 0, np.round(values / steps) * steps, values)
+
+    def keys(self, quantized: np.ndarray, extra: Hashable = None) -> List[tuple]:
+        """Cache keys for already-quantized rows; extra distinguishes e.g. backends"""
+        return [(extra, *row) for row in np.round(quantized, 6).tolist()]
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "quantization": dict(zip(self.fields, self.steps.tolist())),
+            }
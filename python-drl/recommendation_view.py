@@ -0,0 +1,135 @@
+"""
+recommendation_view.py - Materialized DRL recommendations per zone
+
+Keeps the latest readings and recommendation for every registered zone.
+Soil updates and per-location weather deltas recompute only the affected
+zones, in one batched model call. Every recommendation that actually
+changes gets a new version, so clients poll changes_since(cursor) and fetch
+only those zones.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+from load_model import STATE_FIELDS, get_recommendations_batch
+
+WEATHER_FIELDS = ("temp", "humidity", "rain_prob")
+RESULT_FIELDS = ("irrigation_mm", "fertilizer_kg", "health")
+
+
+def _recommend_without_history(rows: Sequence[Dict]) -> List[Dict]:
+    # Recomputes re-evaluate the current recommendation; they are not newly issued actions
+    return get_recommendations_batch(rows, record_history=False)
+
+
+class RecommendationView:
+    """Latest state and recommendation per zone, with a changed-since cursor"""
+
+    def __init__(self, recommend_batch: Callable[[Sequence[Dict]], List[Dict]] = _recommend_without_history):
+        self.recommend_batch = recommend_batch
+        self._zones = {}       # zone_id -> {"location", "state", "result", "version", "updated_at"}
+        self._locations = {}   # location -> set of zone ids
+        self._changes = OrderedDict()  # zone_id -> version, oldest change first
+        self._version = 0
+        self._lock = threading.Lock()
+        self.recomputed = 0
+
+    def _recompute(self, zone_ids: Sequence[str]) -> int:
+        """Recompute zones in one batch (caller holds the lock); returns how many changed"""
+        if not zone_ids:
+            return 0
+        rows = [{**self._zones[zone_id]["state"], "zone_id": zone_id} for zone_id in zone_ids]
+        results = self.recommend_batch(rows)
+        self.recomputed += len(zone_ids)
+
+        changed = 0
+        now = time.time()
+        for zone_id, result in zip(zone_ids, results):
+            zone = self._zones[zone_id]
+            result = {name: result[name] for name in RESULT_FIELDS}
+            if result != zone["result"]:
+                self._version += 1
+                zone.update(result=result, version=self._version, updated_at=now)
+                self._changes[zone_id] = self._version
+                self._changes.move_to_end(zone_id)
+                changed += 1
+        return changed
+
+    def upsert_zones(self, rows: Sequence[Dict]) -> Dict:
+        """Register or update zones (zone_id, location and the STATE_FIELDS readings)"""
+        with self._lock:
+            zone_ids = []
+            for row in rows:
+                zone_id = row["zone_id"]
+                zone = self._zones.get(zone_id)
+                if zone is None:
+                    zone = self._zones[zone_id] = {"result": None, "version": 0, "updated_at": None}
+                elif zone["location"] != row["location"]:
+                    self._locations[zone["location"]].discard(zone_id)
+                zone["location"] = row["location"]
+                zone["state"] = {name: row[name] for name in STATE_FIELDS}
+                self._locations.setdefault(row["location"], set()).add(zone_id)
+                if zone_id not in zone_ids:
+                    zone_ids.append(zone_id)
+
+            changed = self._recompute(zone_ids)
+            return {"updated": len(zone_ids), "changed": changed, "cursor": self._version}
+
+    def apply_weather(self, location: str, **weather: Optional[float]) -> Dict:
+        """Apply a weather delta (any of temp, humidity, rain_prob) to every zone at a location"""
+        update = {name: value for name, value in weather.items() if name in WEATHER_FIELDS and value is not None}
+        with self._lock:
+            zone_ids = []
+            previous = {}  # zone_id -> weather before this update
+            for zone_id in self._locations.get(location, ()):
+                state = self._zones[zone_id]["state"]
+                if any(state[name] != value for name, value in update.items()):
+                    previous[zone_id] = {name: state[name] for name in update}
+                    state.update(update)
+                    zone_ids.append(zone_id)
+
+            try:
+                changed = self._recompute(zone_ids)
+            except Exception:
+                # Keep state and recommendation consistent, so a retry with the same weather recomputes
+                for zone_id, values in previous.items():
+                    self._zones[zone_id]["state"].update(values)
+                raise
+            return {"affected": len(zone_ids), "changed": changed, "cursor": self._version}
+
+    def changes_since(self, cursor: int = 0, limit: Optional[int] = None) -> Dict:
+        """Zones whose recommendation changed after cursor, oldest change first"""
+        with self._lock:
+            changed = []
+            for zone_id, version in reversed(self._changes.items()):
+                if version <= cursor:
+                    break
+                changed.append(zone_id)
+            changed.reverse()
+            if limit is not None:
+                changed = changed[:limit]
+
+            zones = [
+                {
+                    "zone_id": zone_id,
+                    "location": self._zones[zone_id]["location"],
+                    "version": self._zones[zone_id]["version"],
+                    "updated_at": self._zones[zone_id]["updated_at"],
+                    **self._zones[zone_id]["result"]
+                }
+                for zone_id in changed
+            ]
+            # With a limit, resume from the last returned change rather than the head
+            next_cursor = zones[-1]["version"] if zones and limit is not None else max(cursor, self._version)
+            return {"cursor": next_cursor, "zones": zones}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "zones": len(self._zones),
+                "locations": len(self._locations),
+                "cursor": self._version,
+                "recomputed": self.recomputed,
+            }
@@ -0,0 +1,125 @@
+"""
+season_simulator.py - Vectorized what-if season rollouts for the DRL policy
+
+Re-implements the step dynamics of ImprovedAgricultureEnv (uploads/DRL.ipynb)
+over an (n_fields,) batch with NumPy, replacing the environment's random
+weather with a supplied daily trajectory. Each simulated day is one batched
+policy call for every field, with the previous day's actions fed back into
+the state like during training.
+"""
+
+import numpy as np
+from typing import Dict, Optional
+
+from load_model import (
+    FERTILIZER_OPTIONS,
+    IRRIGATION_OPTIONS,
+    OPTIMAL_K_RANGE,
+    OPTIMAL_MOISTURE_RANGE,
+    OPTIMAL_N_RANGE,
+    OPTIMAL_P_RANGE,
+    OPTIMAL_PH_RANGE,
+    STATE_FIELDS,
+    STATE_SIZE,
+    calculate_health_scores,
+    load_policy,
+)
+
+# Episode length the policy was trained with; growth advances 1/30 per day
+TRAINING_SEASON_DAYS = 30
+
+# Environment noise ranges (expected values are used unless stochastic=True)
+EVAPORATION_RANGE = (3.0, 6.0)
+RAIN_AMOUNT_RANGE = (5.0, 15.0)
+
+
+def _in_range(values: np.ndarray, bounds: tuple) -> np.ndarray:
+    return (values >= bounds[0]) & (values <= bounds[1])
+
+
+def simulate_seasons(initial: np.ndarray, temp: np.ndarray, humidity: np.ndarray,
+                     rain_prob: np.ndarray, rain_mm: Optional[np.ndarray] = None,
+                     stochastic: bool = False, seed: Optional[int] = None,
+                     backend: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Roll the policy forward over a season for many fields at once
+
+    Args:
+        initial: (n, 9) starting readings in STATE_FIELDS order; the weather
+            columns are ignored in favour of the trajectory
+        temp, humidity, rain_prob: (n, days) daily weather per field
+        rain_mm: Optional (n, days) observed/forecast rainfall; when missing,
+            rain is its expectation (rain_prob * 10mm) or sampled if stochastic
+        stochastic: Sample evaporation and rain like the training environment
+        seed: Random seed for stochastic rollouts
+        backend: DRL inference backend, defaults to DRL_BACKEND
+
+    Returns:
+        Dictionary of (n, days) arrays: irrigation_mm, fertilizer_kg, health,
+        moisture, growth (all measured after each day's step)
+    """
+    initial = np.asarray(initial, dtype=np.float64).reshape(-1, len(STATE_FIELDS))
+    temp = np.asarray(temp, dtype=np.float64)
+    humidity = np.asarray(humidity, dtype=np.float64)
+    rain_prob = np.asarray(rain_prob, dtype=np.float64)
+    n_fields, days = temp.shape
+
+    policy = load_policy(backend)
+    rng = np.random.default_rng(seed)
+    irrigation_options = np.asarray(IRRIGATION_OPTIONS, dtype=np.float64)
+    fertilizer_options = np.asarray(FERTILIZER_OPTIONS, dtype=np.float64)
+
+    moisture, n, p, k, ph, growth = (initial[:, i].copy() for i in range(6))
+    prev_irrigation = np.zeros(n_fields)
+    prev_fertilizer = np.zeros(n_fields)
+
+    trajectory = {name: np.zeros((n_fields, days)) for name in
+                  ("irrigation_mm", "fertilizer_kg", "health", "moisture", "growth")}
+    states = np.zeros((n_fields, STATE_SIZE), dtype=np.float32)
+
+    for day in range(days):
+        # 1. Policy acts on today's state
+        states[:] = np.stack([moisture, n, p, k, ph, growth, temp[:, day], humidity[:, day],
+                              rain_prob[:, day], prev_irrigation, prev_fertilizer], axis=1)
+        actions, _ = policy.predict(states, deterministic=True)
+        actions = np.asarray(actions, dtype=np.int64).reshape(n_fields, 2)
+        irrigation = irrigation_options[actions[:, 0]]
+        fertilizer = fertilizer_options[actions[:, 1]]
+
+        # 2. Rainfall and evaporation
+        if rain_mm is not None:
+            rain = np.asarray(rain_mm, dtype=np.float64)[:, day]
+        elif stochastic:
+            rain = np.where(rng.random(n_fields) < rain_prob[:, day], rng.uniform(*RAIN_AMOUNT_RANGE, n_fields), 0.0)
+        else:
+            rain = rain_prob[:, day] * np.mean(RAIN_AMOUNT_RANGE)
+
+        if stochastic:
+            evaporation = rng.uniform(*EVAPORATION_RANGE, n_fields)
+        else:
+            evaporation = np.full(n_fields, np.mean(EVAPORATION_RANGE))
+        evaporation += (temp[:, day] - 25) * 0.3
+
+        # 3. Soil dynamics (same coefficients as the training environment)
+        moisture = np.clip(moisture + irrigation * 0.7 + rain - evaporation, 0, 100)
+
+        uptake = 0.5 + growth * 0.8
+        n = np.clip(n + fertilizer * 15 - uptake * 4, 0, 200)
+        p = np.clip(p + fertilizer * 8 - uptake * 2, 0, 200)
+        k = np.clip(k + fertilizer * 10 - uptake * 2.5, 0, 200)
+        ph = np.clip(ph + (fertilizer - 1.5) * 0.05, 4.0, 9.0)
+
+        healthy = (_in_range(moisture, OPTIMAL_MOISTURE_RANGE) & _in_range(n, OPTIMAL_N_RANGE) &
+                   _in_range(p, OPTIMAL_P_RANGE) & _in_range(k, OPTIMAL_K_RANGE) &
+                   _in_range(ph, OPTIMAL_PH_RANGE))
+        growth = np.minimum(growth + np.where(healthy, 1.5, 0.7) / TRAINING_SEASON_DAYS, 1.0)
+
+        prev_irrigation, prev_fertilizer = irrigation, fertilizer
+
+        trajectory["irrigation_mm"][:, day] = irrigation
+        trajectory["fertilizer_kg"][:, day] = fertilizer
+        trajectory["health"][:, day] = calculate_health_scores(moisture, n, p, k, ph)
+        trajectory["moisture"][:, day] = moisture
+        trajectory["growth"][:, day] = growth
+
+    return trajectory
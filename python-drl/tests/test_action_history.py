@@ -0,0 +1,57 @@
+import sqlite3
+
+import numpy as np
+
+from action_history import ActionHistoryStore
+
+
+def actions(store, zone_id):
+    return [(entry["irrigation_mm"], entry["fertilizer_kg"]) for entry in store.history(zone_id)]
+
+
+def test_ring_buffer_wraps_around():
+    store = ActionHistoryStore(capacity=3, max_zones=4)
+    for i in range(5):
+        store.record(["a"], [i * 5], [i % 4], timestamp=float(i))
+
+    assert actions(store, "a") == [(10, 2), (15, 3), (20, 0)]
+    assert [entry["timestamp"] for entry in store.history("a")] == [2.0, 3.0, 4.0]
+    np.testing.assert_array_equal(store.last_actions(["a", "unknown", None]), [[20, 0], [0, 0], [0, 0]])
+
+
+def test_least_recently_used_zone_is_evicted():
+    store = ActionHistoryStore(capacity=2, max_zones=2)
+    store.record(["a", "b"], [5, 10], [1, 2])
+    store.last_actions(["a"])  # a is now more recent than b
+    store.record(["c"], [15], [3])
+
+    assert store.stats()["evictions"] == 1
+    assert actions(store, "b") == []
+    assert actions(store, "a") == [(5, 1)]
+    assert actions(store, "c") == [(15, 3)]
+
+
+def test_evicted_and_restarted_zones_reload_from_sqlite(tmp_path):
+    db_path = str(tmp_path / "history.db")
+    store = ActionHistoryStore(capacity=2, max_zones=1, db_path=db_path)
+    store.record(["a"], [5], [1], timestamp=1.0)
+    store.record(["a"], [10], [2], timestamp=2.0)
+    store.record(["b"], [15], [3], timestamp=3.0)  # evicts a
+
+    assert actions(store, "a") == [(5, 1), (10, 2)]
+
+    reopened = ActionHistoryStore(capacity=2, max_zones=4, db_path=db_path)
+    np.testing.assert_array_equal(reopened.last_actions(["a", "b"]), [[10, 2], [15, 3]])
+    reopened.record(["a"], [20], [0], timestamp=4.0)
+    assert actions(reopened, "a") == [(10, 2), (20, 0)]
+
+
+def test_sqlite_keeps_only_the_last_capacity_rows_per_zone(tmp_path):
+    db_path = str(tmp_path / "history.db")
+    store = ActionHistoryStore(capacity=3, max_zones=4, db_path=db_path)
+    for i in range(10):
+        store.record(["a", "b"], [i, i + 1], [0, 1], timestamp=float(i))
+
+    with sqlite3.connect(db_path) as db:
+        rows = db.execute("SELECT zone_id, irrigation_mm FROM action_history ORDER BY zone_id, ts").fetchall()
+    assert rows == [("a", 7), ("a", 8), ("a", 9), ("b", 8), ("b", 9), ("b", 10)]
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+import bulk_scan
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    folder = tmp_path / "archive"
+    folder.mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (folder / name).write_bytes(b"image")
+
+    def detect_disease_batch(images, *args, **kwargs):
+        return {"results": [{"success": True, "crop_type": "Tomato", "disease_name": "Healthy"} for _ in images]}
+
+    monkeypatch.setattr(bulk_scan, "detect_disease_batch", detect_disease_batch)
+    return folder
+
+
+def scan_twice(archive, output):
+    first = bulk_scan.bulk_scan([str(archive)], str(output), treatment=False, chunk_size=2)
+    second = bulk_scan.bulk_scan([str(archive)], str(output), treatment=False, chunk_size=2, resume=False)
+    return first, second
+
+
+def test_restart_overwrites_jsonl_output(archive, tmp_path):
+    output = tmp_path / "results.jsonl"
+    first, second = scan_twice(archive, output)
+
+    assert first["images"] == second["images"] == 3
+    assert second["skipped"] == 0
+    paths = [json.loads(line)["path"] for line in output.read_text().splitlines()]
+    assert sorted(paths) == sorted(str(path) for path in archive.iterdir())
+
+
+def test_restart_overwrites_parquet_dataset(archive, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    output = tmp_path / "results.parquet"
+    first, second = scan_twice(archive, output)
+
+    assert first["images"] == second["images"] == 3
+    assert len(list(output.glob("part-*.parquet"))) == 2
+    assert pq.read_table(output).num_rows == 3
+
+
+def test_resume_skips_finished_images(archive, tmp_path):
+    output = tmp_path / "results.jsonl"
+    bulk_scan.bulk_scan([str(archive)], str(output), treatment=False, chunk_size=2)
+    report = bulk_scan.bulk_scan([str(archive)], str(output), treatment=False, chunk_size=2)
+
+    assert report["images"] == 0 and report["skipped"] == 3
+    assert len(output.read_text().splitlines()) == 3
+
+
+def test_only_image_suffixes_are_scanned(archive, tmp_path):
+    (archive / "notes.txt").write_text("not an image")
+    (archive / "photo.PNG").write_bytes(b"image")
+
+    paths = list(bulk_scan.iter_image_paths([str(archive / "notes.txt"), str(archive / "*"), str(archive)]))
+
+    assert paths == sorted(str(archive / name) for name in ("a.jpg", "b.jpg", "c.jpg", "photo.PNG"))
+
+
+def test_resume_after_crash_before_checkpoint(archive, tmp_path):
+    output = tmp_path / "results.jsonl"
+    bulk_scan.bulk_scan([str(archive)], str(output), treatment=False, chunk_size=2)
+    # Crash after the last chunk was written but before it was checkpointed, halfway through a line
+    checkpoint = tmp_path / "results.jsonl.checkpoint"
+    checkpoint.write_text("".join(checkpoint.read_text().splitlines(keepends=True)[:2]) + str(archive)[:5])
+    with output.open("a") as f:
+        f.write('{"path": "' + str(archive))
+
+    report = bulk_scan.bulk_scan([str(archive)], str(output), treatment=False, chunk_size=2)
+
+    assert report["images"] == 0 and report["skipped"] == 3
+    paths = [json.loads(line)["path"] for line in output.read_text().splitlines()]
+    assert sorted(paths) == sorted(str(path) for path in archive.iterdir())
+    assert str(archive / "c.jpg") in checkpoint.read_text().splitlines()
+
+
+def test_resume_parquet_after_crash_before_checkpoint(archive, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    output = tmp_path / "results.parquet"
+    bulk_scan.bulk_scan([str(archive)], str(output), treatment=False, chunk_size=2)
+    checkpoint = tmp_path / "results.parquet.checkpoint"
+    checkpoint.write_text("".join(checkpoint.read_text().splitlines(keepends=True)[:2]))
+
+    (archive / "d.jpg").write_bytes(b"image")
+    report = bulk_scan.bulk_scan([str(archive)], str(output), treatment=False, chunk_size=2)
+
+    assert report["images"] == 1 and report["skipped"] == 3
+    assert sorted(pq.read_table(output).column("path").to_pylist()) == sorted(str(p) for p in archive.iterdir())
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+
+from detection_cache import DetectionCache, dhash
+
+OPTIONS = "threshold=0.2"
+RESULT = {"crop_type": "Tomato", "disease_name": "Early Blight", "confidence": 0.91}
+
+
+def leaf_image(seed, size=320):
+    """Smooth synthetic photo: upscaled low-resolution noise"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (12, 12, 3), dtype=np.uint8)
+    return cv2.resize(small, (size, size), interpolation=cv2.INTER_CUBIC)
+
+
+def reencoded(image, quality=70):
+    _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+
+@pytest.mark.parametrize("variant", [
+    lambda image: reencoded(image),
+    lambda image: cv2.resize(image, (300, 300), interpolation=cv2.INTER_AREA),
+    lambda image: reencoded(cv2.resize(image, (352, 352), interpolation=cv2.INTER_LINEAR), quality=85),
+])
+def test_near_duplicate_hits(variant):
+    cache = DetectionCache()
+    original = leaf_image(0)
+    cache.put(dhash(original), OPTIONS, RESULT)
+
+    assert cache.get(dhash(variant(original)), OPTIONS) == RESULT
+    assert cache.stats()["hits"] == 1
+
+
+def test_different_image_or_options_miss():
+    cache = DetectionCache()
+    cache.put(dhash(leaf_image(0)), OPTIONS, RESULT)
+
+    assert cache.get(dhash(leaf_image(1)), OPTIONS) is None
+    assert cache.get(dhash(leaf_image(0)), "threshold=0.5") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_hits_survive_reopening_the_database(tmp_path):
+    db_path = str(tmp_path / "detections.db")
+    DetectionCache(db_path=db_path).put(dhash(leaf_image(0)), OPTIONS, RESULT)
+
+    reopened = DetectionCache(db_path=db_path)
+    assert reopened.get(dhash(reencoded(leaf_image(0))), OPTIONS) == RESULT
+    assert reopened.get(dhash(leaf_image(1)), OPTIONS) is None
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = DetectionCache(ttl_seconds=-1, db_path=str(tmp_path / "detections.db"))
+    cache.put(dhash(leaf_image(0)), OPTIONS, RESULT)
+    assert cache.get(dhash(leaf_image(0)), OPTIONS) is None
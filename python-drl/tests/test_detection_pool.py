@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+import pytest
+
+from detection_pool import DetectionPool, QueueFullError
+
+
+def test_cancelled_request_keeps_its_slot_until_the_job_ends():
+    async def main():
+        pool = DetectionPool(workers=0, max_pending=1)
+        try:
+            task = asyncio.create_task(pool.run("time.sleep", 0.3))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            # The sleep is still running in the pool, so the slot is still taken
+            assert pool.stats()["pending"] == 1
+            with pytest.raises(QueueFullError):
+                await pool.run("time.sleep", 0)
+
+            deadline = time.monotonic() + 5
+            while pool.stats()["pending"] and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            assert pool.stats()["pending"] == 0
+            assert await pool.run("time.time") > 0
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
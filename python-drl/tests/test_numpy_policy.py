@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from numpy_policy import NumpyPolicy
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / "model"
+
+
+def test_numpy_policy_matches_sb3_predict():
+    ppo = pytest.importorskip("stable_baselines3").PPO
+    model = ppo.load(str(MODEL_DIR / "improved_ppo_agriculture.zip"), device="cpu")
+    policy = NumpyPolicy.load(str(MODEL_DIR / "ppo_policy.npz"))
+
+    rng = np.random.default_rng(0)
+    low, high = model.observation_space.low, model.observation_space.high
+    states = rng.uniform(low, high, size=(2000, len(low))).astype(np.float32)
+
+    expected, _ = model.predict(states, deterministic=True)
+    actual, _ = policy.predict(states, deterministic=True)
+    np.testing.assert_array_equal(actual, expected)
+
+    # Single states keep PPO.predict's shape
+    expected_one, _ = model.predict(states[0], deterministic=True)
+    actual_one, _ = policy.predict(states[0], deterministic=True)
+    np.testing.assert_array_equal(actual_one, expected_one)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+from onnx import TensorProto, helper
+
+import onnx_session
+from onnx_session import PooledSession, build_session_options, session_config_from_env
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    """Add-one model with a dynamic batch dimension"""
+    graph = helper.make_graph(
+        [helper.make_node("Add", ["images", "one"], ["output"])],
+        "add_one",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["batch", 3])],
+        [helper.make_tensor("one", TensorProto.FLOAT, [1], [1.0])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    path = tmp_path / "add_one.onnx"
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def test_buffers_are_bounded_to_recent_shapes(model_path, monkeypatch):
+    monkeypatch.setattr(onnx_session, "MAX_BUFFERED_SHAPES", 2)
+    session = PooledSession(model_path, build_session_options(session_config_from_env({})), ["CPUExecutionProvider"])
+
+    for batch in (1, 2, 1, 3):
+        inputs = np.full((batch, 3), batch, dtype=np.float32)
+        np.testing.assert_array_equal(session.run(inputs)[0], inputs + 1)
+
+    # Batch 2 was least recently used when batch 3 arrived
+    assert list(session._buffers) == [(1, 3), (3, 3)]
+
+    # Evicted shapes still run, through ORT-allocated outputs
+    inputs = np.zeros((2, 3), dtype=np.float32)
+    np.testing.assert_array_equal(session.run(inputs)[0], inputs + 1)
+    assert list(session._buffers) == [(3, 3), (2, 3)]
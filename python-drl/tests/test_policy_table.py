@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import numpy as np
+
+from numpy_policy import NumpyPolicy
+from policy_table import STATE_AXES, build_table
+
+NPZ_PATH = Path(__file__).resolve().parent.parent / "model" / "ppo_policy.npz"
+SMALL_GRID = {"moisture": 3, "nitrogen": 3, "phosphorus": 2, "potassium": 2, "temp": 2, "humidity": 2}
+
+
+def test_default_history_axes_follow_previous_actions(tmp_path):
+    policy = NumpyPolicy.load(str(NPZ_PATH))
+    table = build_table(str(tmp_path / "table.npy"), SMALL_GRID, policy)
+    assert table.points[-2:].tolist() == [5, 4]
+
+    # Grid states with every previous action: the table answers exactly like the policy
+    rng = np.random.default_rng(0)
+    indices = np.stack([rng.integers(0, n, 500) for n in table.points], axis=1)
+    states = table.grid_values(indices)
+    expected, _ = policy.predict(states.astype(np.float32))
+    actual, _ = table.predict(states)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_table_without_history_axes_warns_once(tmp_path, capsys):
+    points = {**SMALL_GRID, "prev_irrigation": 1, "prev_fertilizer": 1}
+    table = build_table(str(tmp_path / "table.npy"), points, NumpyPolicy.load(str(NPZ_PATH)))
+    state = np.array([low for _, low, _, _ in STATE_AXES])
+
+    table.predict(state)
+    assert "zone history is ignored" not in capsys.readouterr().out
+
+    state[-2:] = (10.0, 2.0)
+    table.predict(state)
+    table.predict(state)
+    assert capsys.readouterr().out.count("zone history is ignored") == 1
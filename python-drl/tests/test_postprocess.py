@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import postprocess
+from postprocess import batched_nms, decode_predictions
+
+BOXES = np.array([
+    [10, 10, 110, 110],    # class 0, best
+    [12, 12, 112, 112],    # class 0 duplicate of the first -> suppressed
+    [11, 11, 111, 111],    # class 1 on the same spot -> kept
+    [300, 300, 400, 400],  # class 0 elsewhere -> kept
+], dtype=np.float64)
+SCORES = np.array([0.9, 0.8, 0.7, 0.6])
+CLASS_IDS = np.array([0, 0, 1, 0])
+
+
+@pytest.fixture(params=["matrix", "row by row"])
+def nms_path(request, monkeypatch):
+    if request.param == "row by row":
+        monkeypatch.setattr(postprocess, "MATRIX_NMS_LIMIT", 0)
+    return request.param
+
+
+def test_overlapping_boxes_of_different_classes_both_survive(nms_path):
+    assert batched_nms(BOXES, SCORES, CLASS_IDS).tolist() == [0, 2, 3]
+
+
+def test_class_agnostic_suppresses_across_classes(nms_path):
+    assert batched_nms(BOXES, SCORES, CLASS_IDS, class_agnostic=True).tolist() == [0, 3]
+
+
+def test_max_detections_keeps_the_best(nms_path):
+    assert batched_nms(BOXES, SCORES, CLASS_IDS, max_detections=2).tolist() == [0, 2]
+
+
+def test_empty_input():
+    assert batched_nms(np.empty((0, 4)), np.empty(0), np.empty(0)).tolist() == []
+
+
+def test_decode_predictions_thresholds_and_keeps_top_k():
+    scores = np.array([
+        [0.10, 0.90, 0.30, 0.05, 0.60],  # class 0
+        [0.50, 0.20, 0.40, 0.15, 0.10],  # class 1
+    ])
+    boxes = np.arange(20, dtype=np.float64).reshape(4, 5)
+    output = np.vstack([boxes, scores])
+
+    xywh, best, class_ids = decode_predictions(output, confidence_threshold=0.2, top_k=None)
+    assert best.tolist() == [0.9, 0.6, 0.5, 0.4]
+    assert class_ids.tolist() == [0, 0, 1, 1]
+    np.testing.assert_array_equal(xywh, boxes[:, [1, 4, 0, 2]].T)
+
+    _, best, class_ids = decode_predictions(output, confidence_threshold=0.2, top_k=2)
+    assert best.tolist() == [0.9, 0.6]
+    assert class_ids.tolist() == [0, 0]
@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+import pytest
+
+from quality_gate import REJECTION_MESSAGES, QualityGate
+
+
+def leaf(size=600):
+    """Sharp, well exposed green foliage: leaf-green base with fine texture"""
+    rng = np.random.default_rng(0)
+    image = np.empty((size, size, 3), dtype=np.float64)
+    image[:] = (40, 140, 60)  # BGR
+    image += rng.normal(0, 25, (size, size, 1))
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def blurry():
+    return cv2.GaussianBlur(leaf(), (0, 0), 12)
+
+
+def too_dark():
+    return (leaf() * 0.12).astype(np.uint8)
+
+
+def overexposed():
+    return (255 - (255 - leaf().astype(np.float64)) * 0.1).astype(np.uint8)
+
+
+def no_vegetation():
+    image = leaf()
+    return np.ascontiguousarray(image[:, :, [1, 1, 1]])  # same texture, grey
+
+
+@pytest.mark.parametrize("make_image,reason", [
+    (blurry, "blurry"),
+    (too_dark, "too_dark"),
+    (overexposed, "overexposed"),
+    (no_vegetation, "no_vegetation"),
+])
+def test_rejects_with_reason_and_metrics(make_image, reason):
+    gate = QualityGate()
+    rejection = gate.check(make_image())
+
+    assert rejection["reason"] == reason
+    assert rejection["message"] == REJECTION_MESSAGES[reason]
+    assert set(rejection["metrics"]) == {"sharpness", "brightness", "vegetation"}
+    assert gate.stats()["rejections"][reason] == 1
+
+
+def test_good_leaf_passes():
+    gate = QualityGate()
+    assert gate.check(leaf()) is None
+    assert gate.stats()["checked"] == 1 and gate.stats()["rejected"] == 0
+
+
+def only(threshold, value):
+    """Gate with every check but one disabled"""
+    thresholds = {"min_sharpness": 0, "min_brightness": 0, "max_brightness": 0, "min_vegetation": 0}
+    return QualityGate(**{**thresholds, threshold: value})
+
+
+@pytest.mark.parametrize("make_image,metric,threshold", [
+    (blurry, "sharpness", "min_sharpness"),
+    (too_dark, "brightness", "min_brightness"),
+    (no_vegetation, "vegetation", "min_vegetation"),
+])
+def test_minimum_thresholds(make_image, metric, threshold):
+    image = make_image()
+    value = QualityGate().measure(image)[metric]
+
+    assert only(threshold, value + 0.01).check(image) is not None
+    assert only(threshold, value).check(image) is None
+    assert only(threshold, 0).check(image) is None
+
+
+def test_maximum_brightness_threshold():
+    image = overexposed()
+    value = QualityGate().measure(image)["brightness"]
+
+    assert only("max_brightness", value - 0.01).check(image)["reason"] == "overexposed"
+    assert only("max_brightness", value).check(image) is None
+    assert only("max_brightness", 0).check(image) is None
+
+
+def test_exposure_is_checked_before_sharpness():
+    dark_and_blurry = (blurry() * 0.12).astype(np.uint8)
+    assert QualityGate().check(dark_and_blurry)["reason"] == "too_dark"
+
+
+def test_disabled_gate_accepts_everything():
+    gate = QualityGate(enabled=False)
+    assert gate.check(too_dark()) is None
+    assert gate.stats()["checked"] == 0
@@ -0,0 +1,39 @@
+import threading
+
+from recommendation_batcher import MicroBatcher
+
+
+def test_cancelled_future_does_not_stop_the_worker():
+    release = threading.Event()
+    batches = []
+
+    def predict_batch(rows):
+        release.wait(5)
+        batches.append(list(rows))
+        return [{"action": row["x"]} for row in rows]
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=50)
+    # The first request holds the worker in predict while the next ones queue up
+    first = batcher.submit({"x": 0})
+    queued = [batcher.submit({"x": i}) for i in range(1, 4)]
+    assert queued[1].cancel()
+    release.set()
+
+    assert first.result(timeout=5) == {"action": 0}
+    assert queued[0].result(timeout=5) == {"action": 1}
+    assert queued[2].result(timeout=5) == {"action": 3}
+    assert [row["x"] for batch in batches for row in batch] == [0, 1, 3]
+
+    # The worker is still alive for later requests
+    assert batcher.submit({"x": 9}).result(timeout=5) == {"action": 9}
+    assert batcher.stats()["requests"] == 4
+
+
+def test_predict_error_resolves_every_future():
+    def predict_batch(rows):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_ms=20)
+    futures = [batcher.submit({"x": i}) for i in range(3)]
+    for future in futures:
+        assert isinstance(future.exception(timeout=5), RuntimeError)
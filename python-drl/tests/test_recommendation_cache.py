@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from recommendation_cache import RecommendationCache, parse_quantization
+
+FIELDS = ("moisture", "nitrogen", "ph")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(**kwargs):
+    clock = FakeClock()
+    return RecommendationCache(FIELDS, clock=clock, **kwargs), clock
+
+
+def test_entries_expire_after_ttl():
+    cache, clock = make_cache(ttl_seconds=60)
+    cache.put("key", (1, 2))
+
+    clock.now += 60
+    assert cache.get("key") == (1, 2)
+    clock.now += 0.001
+    assert cache.get("key") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_put_refreshes_expiry():
+    cache, clock = make_cache(ttl_seconds=60)
+    cache.put("key", (1, 2))
+    clock.now += 50
+    cache.put("key", (3, 0))
+    clock.now += 50
+    assert cache.get("key") == (3, 0)
+
+
+def test_least_recently_used_entry_is_evicted_at_max_size():
+    cache, _ = make_cache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # b is now least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache, _ = make_cache(max_size=0)
+    cache.put("a", 1)
+    assert not cache.enabled and cache.get("a") is None
+
+
+def test_readings_in_the_same_bucket_share_a_key():
+    cache, _ = make_cache()
+    keys = cache.keys(cache.quantize([[40.1, 100.4, 6.51], [39.9, 99.6, 6.49], [40.4, 100.0, 6.5]]), extra="numpy")
+    assert keys[0] == keys[1] == ("numpy", 40.0, 100.0, 6.5)
+    assert keys[2] != keys[0]
+
+    cache.put(keys[0], (2, 1))
+    assert cache.get(keys[1]) == (2, 1)
+    assert cache.get(cache.keys(cache.quantize([[40.1, 100.4, 6.51]]), extra="sb3")[0]) is None
+
+
+def test_quantization_overrides_and_exact_fields():
+    cache = RecommendationCache(FIELDS + ("depth",), quantization={"moisture": 5.0})
+    np.testing.assert_allclose(cache.quantize([[42.6, 100.4, 6.52, 1.234]]), [[45.0, 100.0, 6.5, 1.234]])
+
+
+def test_parse_quantization():
+    assert parse_quantization("moisture=0.5, ph=0.1,") == {"moisture": 0.5, "ph": 0.1}
+    with pytest.raises(ValueError):
+        parse_quantization("depth=1")
@@ -0,0 +1,38 @@
+import pytest
+
+from load_model import STATE_FIELDS
+from recommendation_view import RecommendationView
+
+
+class FlakyModel:
+    """Recommends irrigation from the temperature; fails while failing is set"""
+
+    def __init__(self):
+        self.failing = False
+
+    def __call__(self, rows):
+        if self.failing:
+            raise RuntimeError("model unavailable")
+        return [{"irrigation_mm": row["temp"], "fertilizer_kg": 0.0, "health": 1.0} for row in rows]
+
+
+def zone(zone_id, temp):
+    return {"zone_id": zone_id, "location": "farm", **{name: 0.0 for name in STATE_FIELDS}, "temp": temp}
+
+
+def test_failed_weather_recompute_is_retried():
+    model = FlakyModel()
+    view = RecommendationView(model)
+    view.upsert_zones([zone("a", 20.0), zone("b", 20.0)])
+    cursor = view.stats()["cursor"]
+
+    model.failing = True
+    with pytest.raises(RuntimeError):
+        view.apply_weather("farm", temp=30.0)
+    assert view.changes_since(cursor)["zones"] == []
+
+    model.failing = False
+    assert view.apply_weather("farm", temp=30.0)["affected"] == 2
+    zones = view.changes_since(cursor)["zones"]
+    assert sorted(z["zone_id"] for z in zones) == ["a", "b"]
+    assert all(z["irrigation_mm"] == 30.0 for z in zones)
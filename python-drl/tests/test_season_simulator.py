@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+import season_simulator
+from load_model import (
+    FERTILIZER_OPTIONS,
+    IRRIGATION_OPTIONS,
+    OPTIMAL_K_RANGE,
+    OPTIMAL_MOISTURE_RANGE,
+    OPTIMAL_N_RANGE,
+    OPTIMAL_P_RANGE,
+    OPTIMAL_PH_RANGE,
+    calculate_health_score,
+)
+
+DAYS = 20
+
+
+class RulePolicy:
+    """Irrigates dry soil, fertilizes poor soil and alternates on the previous irrigation"""
+
+    def predict(self, observation, deterministic=True):
+        obs = np.asarray(observation).reshape(-1, 11)
+        irrigation = np.where(obs[:, 0] < 45, np.where(obs[:, 9] > 0, 2, 4), 0)
+        fertilizer = np.where(obs[:, 1] < 80, 3, np.where(obs[:, 5] > 0.5, 1, 0))
+        return np.stack([irrigation, fertilizer], axis=1), None
+
+
+def clip(value, low, high):
+    return min(max(value, low), high)
+
+
+def within(value, bounds):
+    return bounds[0] <= value <= bounds[1]
+
+
+def scalar_season(policy, reading, temp, humidity, rain_prob):
+    """One field, one day at a time, with plain floats"""
+    moisture, n, p, k, ph, growth = (float(value) for value in reading[:6])
+    prev_irrigation = prev_fertilizer = 0.0
+    days = []
+    for day in range(len(temp)):
+        state = np.array([[moisture, n, p, k, ph, growth, temp[day], humidity[day], rain_prob[day],
+                           prev_irrigation, prev_fertilizer]], dtype=np.float32)
+        action = np.asarray(policy.predict(state, deterministic=True)[0]).reshape(2)
+        irrigation = float(IRRIGATION_OPTIONS[int(action[0])])
+        fertilizer = float(FERTILIZER_OPTIONS[int(action[1])])
+
+        rain = rain_prob[day] * 10.0
+        evaporation = 4.5 + (temp[day] - 25) * 0.3
+        moisture = clip(moisture + irrigation * 0.7 + rain - evaporation, 0, 100)
+
+        uptake = 0.5 + growth * 0.8
+        n = clip(n + fertilizer * 15 - uptake * 4, 0, 200)
+        p = clip(p + fertilizer * 8 - uptake * 2, 0, 200)
+        k = clip(k + fertilizer * 10 - uptake * 2.5, 0, 200)
+        ph = clip(ph + (fertilizer - 1.5) * 0.05, 4.0, 9.0)
+
+        healthy = (within(moisture, OPTIMAL_MOISTURE_RANGE) and within(n, OPTIMAL_N_RANGE) and
+                   within(p, OPTIMAL_P_RANGE) and within(k, OPTIMAL_K_RANGE) and within(ph, OPTIMAL_PH_RANGE))
+        growth = min(growth + (1.5 if healthy else 0.7) / 30, 1.0)
+        prev_irrigation, prev_fertilizer = irrigation, fertilizer
+
+        days.append({"irrigation_mm": irrigation, "fertilizer_kg": fertilizer,
+                     "health": calculate_health_score(moisture, n, p, k, ph),
+                     "moisture": moisture, "growth": growth})
+    return {name: np.array([day[name] for day in days]) for name in days[0]}
+
+
+def weather(n_fields, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(15, 40, (n_fields, DAYS)), rng.uniform(20, 90, (n_fields, DAYS)),
+            rng.uniform(0, 1, (n_fields, DAYS)))
+
+
+@pytest.mark.parametrize("policy", [pytest.param(RulePolicy(), id="rule"), pytest.param("numpy", id="numpy")])
+def test_each_field_matches_a_scalar_loop(policy, monkeypatch):
+    if policy == "numpy":
+        from load_model import load_policy
+
+        try:
+            policy = load_policy("numpy")
+        except FileNotFoundError:
+            pytest.skip("numpy policy weights not exported")
+    monkeypatch.setattr(season_simulator, "load_policy", lambda backend=None: policy)
+
+    initial = np.array([
+        [30.0, 40.0, 25.0, 30.0, 6.5, 0.1, 0.0, 0.0, 0.0],
+        [60.0, 120.0, 60.0, 80.0, 7.0, 0.4, 0.0, 0.0, 0.0],
+        [85.0, 190.0, 150.0, 20.0, 5.2, 0.9, 0.0, 0.0, 0.0],
+    ])
+    temp, humidity, rain_prob = weather(len(initial))
+
+    batched = season_simulator.simulate_seasons(initial, temp, humidity, rain_prob)
+
+    for field in range(len(initial)):
+        expected = scalar_season(policy, initial[field], temp[field], humidity[field], rain_prob[field])
+        for name, values in expected.items():
+            np.testing.assert_allclose(batched[name][field], values, rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_observed_rain_replaces_the_expectation(monkeypatch):
+    monkeypatch.setattr(season_simulator, "load_policy", lambda backend=None: RulePolicy())
+    initial = np.full((1, 9), 50.0)
+    temp, humidity, rain_prob = weather(1)
+
+    dry = season_simulator.simulate_seasons(initial, temp, humidity, rain_prob, rain_mm=np.zeros((1, DAYS)))
+    wet = season_simulator.simulate_seasons(initial, temp, humidity, rain_prob, rain_mm=np.full((1, DAYS), 15.0))
+
+    assert wet["moisture"][0, 0] - dry["moisture"][0, 0] == pytest.approx(15.0)
@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+
+from disease_detector import DISEASE_HSV_LOWER, DISEASE_HSV_UPPER, box_pixels, disease_mask_integral, estimate_severities
+
+
+def roi_count(mask, box):
+    """Reference: diseased pixels of the clipped, truncated ROI slice"""
+    h, w = mask.shape
+    x1, y1, x2, y2 = (int(v) for v in box)
+    x1, x2 = np.clip([x1, x2], 0, w)
+    y1, y2 = np.clip([y1, y2], 0, h)
+    roi = mask[y1:max(y1, y2), x1:max(x1, x2)]
+    return (cv2.countNonZero(roi) if roi.size else 0), roi.size
+
+
+def test_box_pixels_match_roi_count():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    mask = cv2.inRange(cv2.cvtColor(image, cv2.COLOR_BGR2HSV), DISEASE_HSV_LOWER, DISEASE_HSV_UPPER)
+    integral = disease_mask_integral(image)
+
+    random_boxes = np.sort(rng.uniform(-50, 370, (300, 2, 2)), axis=1).reshape(-1, 4)  # [x1, y1, x2, y2]
+    edge_boxes = np.array([
+        [0, 0, 320, 240],         # whole image
+        [-20, -20, 30.7, 40.2],   # clipped at the top-left corner, fractional edges
+        [300, 200, 400, 300],     # clipped at the bottom-right corner
+        [319, 239, 320, 240],     # last pixel
+        [100, 100, 100, 150],     # zero width
+        [400, 10, 500, 20],       # entirely outside
+        [50, 60, 40, 70],         # inverted
+    ])
+    boxes = np.vstack([random_boxes, edge_boxes])
+
+    diseased, total = box_pixels(integral, boxes)
+    expected = np.array([roi_count(mask, box) for box in boxes])
+    np.testing.assert_array_equal(diseased, expected[:, 0])
+    np.testing.assert_array_equal(total, expected[:, 1])
+
+
+def test_estimate_severities_levels():
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    image[:, :100] = (0, 200, 0)      # green: healthy tissue
+    image[:, 100:] = (0, 180, 220)    # yellow: diseased tissue
+    boxes = [[0, 0, 100, 100], [100, 0, 200, 100], [50, 0, 150, 100], [0, 0, 100, 100]]
+    statuses = ["diseased", "diseased", "diseased", "healthy"]
+
+    severities = estimate_severities(image, boxes, statuses)
+    assert [s["level"] for s in severities] == ["Low", "High", "High", "None"]
+    assert [s["percentage"] for s in severities] == [0.0, 100.0, 50.0, 0.0]
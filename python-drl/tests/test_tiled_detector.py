@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from tiled_detector import merge_seams, tile_grid, tile_origins, to_bgr8
+
+
+@pytest.mark.parametrize("bands", [None, 1, 2])
+def test_to_bgr8_gray_uses_first_band(bands):
+    gray = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    if bands is None:
+        pixels = gray
+    else:
+        pixels = np.stack([gray] + [np.full_like(gray, 255)] * (bands - 1), axis=-1)
+
+    bgr = to_bgr8(pixels)
+
+    assert bgr.shape == (3, 4, 3) and bgr.dtype == np.uint8
+    for channel in range(3):
+        np.testing.assert_array_equal(bgr[:, :, channel], gray)
+
+
+@pytest.mark.parametrize("bands", [3, 4])
+def test_to_bgr8_rgb_is_reordered(bands):
+    pixels = np.zeros((2, 2, bands), dtype=np.uint8)
+    pixels[..., 0], pixels[..., 1], pixels[..., 2] = 10, 20, 30
+    np.testing.assert_array_equal(to_bgr8(pixels)[0, 0], [30, 20, 10])
+
+
+def test_to_bgr8_scales_uint16_and_clips_float():
+    np.testing.assert_array_equal(to_bgr8(np.full((1, 1), 65535, dtype=np.uint16))[0, 0], [255] * 3)
+    np.testing.assert_array_equal(to_bgr8(np.full((1, 1, 3), 300.0))[0, 0], [255] * 3)
+
+
+@pytest.mark.parametrize("length,tile_size,overlap,expected", [
+    (500, 640, 0.2, [0]),
+    (640, 640, 0.2, [0]),
+    (1000, 640, 0.2, [0, 360]),
+    (1500, 640, 0.2, [0, 512, 860]),
+    (1280, 640, 0.0, [0, 640]),
+])
+def test_tile_origins(length, tile_size, overlap, expected):
+    assert tile_origins(length, tile_size, overlap) == expected
+
+
+@pytest.mark.parametrize("length", [641, 1000, 1500, 4097])
+def test_tile_origins_cover_the_axis(length):
+    origins = tile_origins(length, 640, 0.2)
+    assert origins[0] == 0 and origins[-1] + 640 == length
+    assert all(b - a <= 640 for a, b in zip(origins, origins[1:]))
+
+
+def test_tile_grid_is_row_major():
+    assert tile_grid(1000, 500, 640) == [(0, 0), (360, 0)]
+
+
+def test_merge_seams_drops_box_cut_by_tile_edge():
+    # A leaf seen whole in one tile and cut in half at the neighbouring tile's edge
+    boxes = np.array([[100, 100, 200, 200], [150, 100, 200, 200]], dtype=np.float32)
+    kept = merge_seams(boxes, np.array([0.9, 0.8]), np.array([0, 0]))
+    assert kept.tolist() == [0]
+
+
+def test_merge_seams_keeps_other_classes_and_distant_boxes():
+    boxes = np.array([
+        [100, 100, 200, 200],
+        [150, 100, 200, 200],  # same place, different class
+        [900, 900, 1000, 1000],  # same class, far away
+    ], dtype=np.float32)
+    kept = merge_seams(boxes, np.array([0.9, 0.8, 0.7]), np.array([0, 1, 0]))
+    assert kept.tolist() == [0, 1, 2]
+
+
+def test_merge_seams_threshold_and_order():
+    boxes = np.array([[0, 0, 100, 100], [60, 0, 160, 100]], dtype=np.float32)  # 40% of the smaller box
+    scores = np.array([0.5, 0.9])
+    assert merge_seams(boxes, scores, np.zeros(2), threshold=0.5).tolist() == [1, 0]
+    assert merge_seams(boxes, scores, np.zeros(2), threshold=0.3).tolist() == [1]
+
+
+def test_merge_seams_empty():
+    assert merge_seams(np.empty((0, 4)), np.empty(0), np.empty(0)).tolist() == []
@@ -0,0 +1,343 @@
+"""
+tiled_detector.py - Disease detection on orthomosaics and other very large images
+
+The image is never loaded or shrunk as a whole: overlapping tile_size
+windows are read one batch at a time (rasterio windowed reads for GeoTIFFs,
+a tifffile memory map for uncompressed TIFFs, whole-image cv2 decoding only
+as a last resort), run through the detector at native resolution, and their
+boxes mapped back to global pixel coordinates. Leaf severity is measured on
+each tile while its pixels are in memory. Duplicates across tile seams are
+merged with a greedy NMS that only compares boxes in neighbouring grid
+cells, so memory stays bounded by batch_size tiles plus the detections.
+
+rasterio and tifffile are optional; install them for bounded-memory reads
+of GeoTIFF / BigTIFF orthomosaics.
+
+Usage (from python-drl/):
+    python tiled_detector.py orthomosaic.tif --output detections.json
+"""
+
+import json
+import time
+
+import cv2
+import numpy as np
+
+from disease_detector import (
+    DETECTOR_BATCH_SIZE,
+    DETECTOR_VARIANT,
+    DISEASE_INFO,
+    StageTimer,
+    describe_detection,
+    estimate_severities,
+    get_input_buffer,
+    infer_prepared,
+    letterbox_into,
+    resolve_model,
+    supports_batching,
+    xywh2xyxy,
+)
+from postprocess import batched_nms
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:
+    rasterio = None
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
+
+DEFAULT_OVERLAP = 0.2          # fraction of the tile shared with each neighbour
+DEFAULT_SEAM_THRESHOLD = 0.5   # intersection over the smaller box above which seam duplicates merge
+PAD_VALUE = 114
+
+
+def to_bgr8(pixels):
+    """(h, w), (h, w, 1-4) gray(+alpha) / RGB(A) window of any integer/float dtype -> (h, w, 3) uint8 BGR"""
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, None]
+    if pixels.dtype == np.uint16:
+        pixels = (pixels // 257).astype(np.uint8)
+    elif pixels.dtype != np.uint8:
+        pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    if pixels.shape[2] < 3:
+        return cv2.cvtColor(np.ascontiguousarray(pixels[:, :, 0]), cv2.COLOR_GRAY2BGR)
+    return cv2.cvtColor(np.ascontiguousarray(pixels[:, :, :3]), cv2.COLOR_RGB2BGR)
+
+
+class RasterioReader:
+    """Windowed reads through GDAL (GeoTIFF, BigTIFF, JPEG2000, ...); keeps the geotransform"""
+
+    backend = "rasterio"
+
+    def __init__(self, path):
+        self._dataset = rasterio.open(path)
+        self.width, self.height = self._dataset.width, self._dataset.height
+        self.transform = self._dataset.transform
+        self._bands = list(range(1, min(3, self._dataset.count) + 1))
+
+    def read(self, x, y, w, h):
+        pixels = self._dataset.read(self._bands, window=Window(x, y, w, h))
+        return to_bgr8(np.moveaxis(pixels, 0, -1))
+
+    def close(self):
+        self._dataset.close()
+
+
+class TiffMemmapReader:
+    """Memory-mapped uncompressed (contiguous) TIFF; only the touched pages are read"""
+
+    backend = "tifffile"
+    transform = None
+
+    def __init__(self, path):
+        self._pixels = tifffile.memmap(path, mode="r")
+        if self._pixels.ndim == 3 and self._pixels.shape[0] in (3, 4) and self._pixels.shape[2] not in (3, 4):
+            self._pixels = np.moveaxis(self._pixels, 0, -1)  # planar (bands, h, w)
+        self.height, self.width = self._pixels.shape[:2]
+
+    def read(self, x, y, w, h):
+        return to_bgr8(np.asarray(self._pixels[y:y + h, x:x + w]))
+
+    def close(self):
+        self._pixels = None
+
+
+class ArrayReader:
+    """Whole image decoded with cv2 (memory grows with the image); also wraps in-memory arrays"""
+
+    backend = "cv2"
+    transform = None
+
+    def __init__(self, image):
+        if isinstance(image, np.ndarray):
+            self._image = image
+        else:
+            self._image = cv2.imread(str(image), cv2.IMREAD_COLOR)
+            if self._image is None:
+                raise ValueError(f"Could not read image: {image}")
+        self.height, self.width = self._image.shape[:2]
+
+    def read(self, x, y, w, h):
+        return self._image[y:y + h, x:x + w]
+
+    def close(self):
+        self._image = None
+
+
+def open_raster(path):
+    """Best available bounded-memory reader for a large image"""
+    if rasterio is not None:
+        try:
+            return RasterioReader(path)
+        except Exception:
+            pass
+    if tifffile is not None and str(path).lower().endswith((".tif", ".tiff")):
+        try:
+            return TiffMemmapReader(path)
+        except Exception:
+            pass  # compressed or tiled TIFF: not memory-mappable
+    print(f"⚠️ Reading {path} fully into memory (install rasterio or tifffile for windowed reads)")
+    return ArrayReader(path)
+
+
+def tile_origins(length, tile_size, overlap):
+    """Tile start offsets along one axis; the last tile is aligned to the far edge"""
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size)
+    return origins
+
+
+def tile_grid(width, height, tile_size, overlap=DEFAULT_OVERLAP):
+    return [(x, y) for y in tile_origins(height, tile_size, overlap) for x in tile_origins(width, tile_size, overlap)]
+
+
+def merge_seams(boxes, scores, class_ids, threshold=DEFAULT_SEAM_THRESHOLD):
+    """
+    Greedy NMS across tile seams, same class only, with intersection over
+    the smaller box (a leaf cut by a tile edge lies inside its full box from
+    the neighbouring tile). Boxes are bucketed into grid cells as large as
+    the largest box, so each box is only compared with the kept boxes of the
+    neighbouring cells.
+
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    cell_size = max(1.0, float(np.max(boxes[:, 2:] - boxes[:, :2])))
+    areas = np.maximum(0.0, boxes[:, 2] - boxes[:, 0]) * np.maximum(0.0, boxes[:, 3] - boxes[:, 1])
+    cells_x = (boxes[:, 0] // cell_size).astype(np.int64)
+    cells_y = (boxes[:, 1] // cell_size).astype(np.int64)
+
+    kept = []
+    cells = {}  # (class, cell x, cell y) -> kept indices whose top-left corner is in that cell
+    for i in np.argsort(scores, kind="stable")[::-1]:
+        cls, cx, cy = int(class_ids[i]), int(cells_x[i]), int(cells_y[i])
+        neighbours = [j for nx in (cx - 1, cx, cx + 1) for ny in (cy - 1, cy, cy + 1)
+                      for j in cells.get((cls, nx, ny), ())]
+        if neighbours:
+            others = boxes[neighbours]
+            w = np.minimum(boxes[i, 2], others[:, 2]) - np.maximum(boxes[i, 0], others[:, 0])
+            h = np.minimum(boxes[i, 3], others[:, 3]) - np.maximum(boxes[i, 1], others[:, 1])
+            inter = np.maximum(0.0, w) * np.maximum(0.0, h)
+            smaller = np.minimum(areas[i], areas[neighbours])
+            if np.any((smaller > 0) & (inter > threshold * smaller)):
+                continue
+        kept.append(i)
+        cells.setdefault((cls, cx, cy), []).append(i)
+    return np.asarray(kept, dtype=np.int64)
+
+
+def detect_tiled(image, confidence_threshold=0.20, variant=None, tile_size=None, overlap=DEFAULT_OVERLAP,
+                 batch_size=None, seam_threshold=DEFAULT_SEAM_THRESHOLD, max_detections=None):
+    """
+    Detect diseases over a large image in overlapping tiles
+
+    Args:
+        image: Path (or a BGR array, for callers that already hold it)
+        tile_size: Tile edge in pixels; the model's input size (default 640),
+            so tiles run at native resolution
+        overlap: Fraction of each tile shared with its neighbours
+        seam_threshold: Intersection over the smaller box at which same-class
+            boxes from neighbouring tiles are merged
+        max_detections: Keep only the most confident detections
+
+    Returns:
+        {"image": {width, height, backend}, "tiles", "detections": per-leaf
+        crop, disease, confidence, severity and global bbox (plus geo_bbox
+        with rasterio), "summary": count/best confidence/worst severity per
+        diagnosis, "model", "timings_ms"}, or {"error": ...}
+    """
+    try:
+        pool, input_size = resolve_model(variant, tile_size)
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Model not loaded: {e}"}
+
+    try:
+        reader = ArrayReader(image) if isinstance(image, np.ndarray) else open_raster(image)
+    except Exception as e:
+        return {"error": f"Could not read image: {e}"}
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    batch_size = max(1, batch_size or DETECTOR_BATCH_SIZE)
+    batched = supports_batching(pool)
+    origins = tile_grid(reader.width, reader.height, input_size, overlap)
+    tile = np.full((input_size, input_size, 3), PAD_VALUE, dtype=np.uint8)
+    found_boxes, found_scores, found_classes, found_severities = [], [], [], []
+
+    try:
+        for first in range(0, len(origins), batch_size):
+            chunk = origins[first:first + batch_size]
+            input_data = get_input_buffer(input_size, len(chunk))
+            prepared, tiles = [], []
+            for i, (x, y) in enumerate(chunk):
+                w, h = min(input_size, reader.width - x), min(input_size, reader.height - y)
+                # Edge tiles are padded, never upscaled, so every tile keeps native resolution
+                tile[:] = PAD_VALUE
+                tile[:h, :w] = reader.read(x, y, w, h)
+                letterbox_into(tile, input_data[i])
+                prepared.append({"image": None})
+                tiles.append((x, y, w, h, tile[:h, :w].copy()))
+            timer.lap("read")
+
+            candidates = infer_prepared(pool, input_data, prepared, confidence_threshold, batched)
+            timer.lap("inference")
+
+            for (x, y, w, h, pixels), (boxes, scores, class_ids) in zip(tiles, candidates):
+                if len(scores) == 0:
+                    continue
+                boxes = xywh2xyxy(boxes)
+                boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, w)
+                boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, h)
+                keep = batched_nms(boxes, scores, class_ids)
+                statuses = [DISEASE_INFO.get(int(class_ids[k]), {"status": "unknown"})["status"] for k in keep]
+                found_severities.extend(estimate_severities(pixels, boxes[keep].tolist(), statuses))
+                found_boxes.append(boxes[keep] + np.array([x, y, x, y], dtype=boxes.dtype))
+                found_scores.append(scores[keep])
+                found_classes.append(class_ids[keep])
+            timer.lap("postprocess")
+    finally:
+        reader.close()
+
+    if found_boxes:
+        boxes = np.concatenate(found_boxes).astype(np.float64)
+        scores = np.concatenate(found_scores)
+        class_ids = np.concatenate(found_classes)
+        keep = merge_seams(boxes, scores, class_ids, seam_threshold)
+    else:
+        boxes, scores, class_ids, keep = np.empty((0, 4)), np.empty(0), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if max_detections:
+        keep = keep[:max_detections]
+    timer.lap("merge")
+
+    detections, summary = [], {}
+    for i in keep:
+        detection = {**describe_detection(boxes[i], scores[i], class_ids[i]), "severity": found_severities[i]}
+        if reader.transform is not None:
+            gx1, gy1 = reader.transform * (boxes[i][0], boxes[i][1])
+            gx2, gy2 = reader.transform * (boxes[i][2], boxes[i][3])
+            detection["geo_bbox"] = [min(gx1, gx2), min(gy1, gy2), max(gx1, gx2), max(gy1, gy2)]
+        detections.append(detection)
+
+        diagnosis = summary.setdefault((detection["crop_type"], detection["disease_name"]), {
+            "crop_type": detection["crop_type"],
+            "disease_name": detection["disease_name"],
+            "disease_status": detection["disease_status"],
+            "detections": 0,
+            "max_confidence": 0.0,
+            "max_severity": detection["severity"]
+        })
+        diagnosis["detections"] += 1
+        diagnosis["max_confidence"] = max(diagnosis["max_confidence"], detection["confidence"])
+        if detection["severity"]["score"] > diagnosis["max_severity"]["score"]:
+            diagnosis["max_severity"] = detection["severity"]
+
+    return {
+        "image": {"width": reader.width, "height": reader.height, "backend": reader.backend},
+        "tiles": len(origins),
+        "detections": detections,
+        "summary": sorted(summary.values(), key=lambda d: (-d["detections"], -d["max_severity"]["score"])),
+        "model": {"variant": variant or DETECTOR_VARIANT, "input_size": input_size, "batched_inference": batched,
+                  "overlap": overlap},
+        "tiles_per_second": round(len(origins) / (time.perf_counter() - start), 1),
+        "timings_ms": timer.timings()
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tiled disease detection on a large image or orthomosaic")
+    parser.add_argument("image", help="Image or (Geo)TIFF orthomosaic")
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Confidence threshold")
+    parser.add_argument("--variant", default=None, help="Model variant (e.g. fp32, int8)")
+    parser.add_argument("--tile-size", type=int, default=None, help="Tile size (model input size, default 640)")
+    parser.add_argument("--overlap", type=float, default=DEFAULT_OVERLAP, help="Tile overlap fraction")
+    parser.add_argument("--batch-size", type=int, default=None, help="Tiles per inference call")
+    parser.add_argument("--seam-threshold", type=float, default=DEFAULT_SEAM_THRESHOLD,
+                        help="Overlap (over the smaller box) merging duplicates across tile seams")
+    parser.add_argument("--max-detections", type=int, default=None)
+    args = parser.parse_args()
+
+    result = detect_tiled(args.image, args.threshold, args.variant, args.tile_size, args.overlap,
+                          args.batch_size, args.seam_threshold, args.max_detections)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(result, output, indent=2)
+        if "error" in result:
+            print(f"❌ {result['error']}")
+        else:
+            print(f"✅ {len(result['detections'])} detections in {result['tiles']} tiles -> {args.output}")
+    else:
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,126 @@
+"""
+treatment_cache.py - Persistent cache of LLM treatment reports
+
+Treatment prompts only depend on the diagnosis (crop, disease, status),
+severity level, growth stage, a confidence bucket and the language, so a
+small discrete set of reports (quick summary plus sectioned plan, from one
+structured LLM call) covers almost every detection. Reports are kept in
+memory and in SQLite, where they survive restarts and are shared between
+detection worker processes. Only real LLM output is stored, never fallback
+text.
+
+Usage (from python-drl/):
+    python treatment_cache.py --prewarm [--languages Hinglish English] [--workers 4]
+    python treatment_cache.py --stats
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_DB_PATH = "./cache/treatment_cache.db"  # git-ignored
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+
+class TreatmentCache:
+    """LLM output by (kind, key), in memory with optional SQLite write-through"""
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_DB_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}  # (kind, key) -> (created, content)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+        self.db_path = db_path
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS treatment_cache ("
+                "kind TEXT NOT NULL, key TEXT NOT NULL, language TEXT NOT NULL, content TEXT NOT NULL, "
+                "created REAL NOT NULL, PRIMARY KEY (kind, key))"
+            )
+            self._db.execute("DELETE FROM treatment_cache WHERE created < ?", (time.time() - ttl_seconds,))
+            self._db.commit()
+            for kind, key, created, content in self._db.execute(
+                    "SELECT kind, key, created, content FROM treatment_cache"):
+                self._entries[(kind, key)] = (created, content)
+
+    @classmethod
+    def from_env(cls) -> "TreatmentCache":
+        """Build from TREATMENT_CACHE_DB (empty keeps reports in memory only) and TREATMENT_CACHE_TTL"""
+        return cls(
+            db_path=os.getenv("TREATMENT_CACHE_DB", DEFAULT_DB_PATH) or None,
+            ttl_seconds=float(os.getenv("TREATMENT_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        )
+
+    def get(self, kind: str, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is None and self._db is not None:
+                # Another worker process may have stored it since startup
+                row = self._db.execute(
+                    "SELECT created, content FROM treatment_cache WHERE kind = ? AND key = ?", (kind, key)
+                ).fetchone()
+                if row is not None:
+                    entry = self._entries[(kind, key)] = tuple(row)
+            if entry is None or now - entry[0] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, kind: str, key: str, content: str, language: str) -> None:
+        created = time.time()
+        with self._lock:
+            self._entries[(kind, key)] = (created, content)
+            self.stores += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO treatment_cache VALUES (?, ?, ?, ?, ?)",
+                    (kind, key, language, content, created)
+                )
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            kinds = {}
+            for kind, _ in self._entries:
+                kinds[kind] = kinds.get(kind, 0) + 1
+            lookups = self.hits + self.misses
+            return {
+                "entries": kinds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "persistent": self._db is not None,
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Treatment plan cache tools")
+    parser.add_argument("--prewarm", action="store_true",
+                        help="Generate reports for every class x severity x growth stage x confidence bucket")
+    parser.add_argument("--languages", nargs="+", default=None, help="Languages to pre-warm (default Hinglish)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent LLM requests while pre-warming")
+    parser.add_argument("--stats", action="store_true", help="Print cache contents by kind")
+    args = parser.parse_args()
+
+    from disease_detector import DEFAULT_LANGUAGE, prewarm_treatment_cache, treatment_cache
+
+    if args.prewarm:
+        report = prewarm_treatment_cache(args.languages or [DEFAULT_LANGUAGE], args.workers)
+        print(json.dumps(report, indent=2))
+    if args.stats or not args.prewarm:
+        print(json.dumps(treatment_cache.stats(), indent=2))
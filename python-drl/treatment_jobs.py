@@ -0,0 +1,169 @@
+"""
+treatment_jobs.py - Background treatment reports for deferred detections
+
+With deferred treatment, /detect-disease answers as soon as inference is
+done and the treatment report is generated here, as a task on the API's
+event loop (async Groq client), while the client already shows the result.
+Reports are fetched by job id or streamed as Server-Sent Events. Finished
+jobs expire after a TTL and at most max_jobs are kept.
+
+Environment:
+    TREATMENT_JOB_TTL  seconds a finished job is kept (default 600)
+    TREATMENT_JOB_MAX  jobs kept (default 1000; oldest finished dropped first)
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_JOBS = 1000
+KEEPALIVE_SECONDS = 15.0
+
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class TreatmentJobs:
+    """Treatment report tasks by job id, for polling or SSE streaming"""
+
+    def __init__(self, generate: Callable[[Dict, str], Awaitable[Dict]],
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, max_jobs: int = DEFAULT_MAX_JOBS):
+        self.generate = generate
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._jobs = {}  # job id -> job dict, in submission order
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self._total_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, generate: Callable[[Dict, str], Awaitable[Dict]]) -> "TreatmentJobs":
+        """Build from TREATMENT_JOB_TTL and TREATMENT_JOB_MAX"""
+        return cls(
+            generate,
+            ttl_seconds=float(os.getenv("TREATMENT_JOB_TTL", DEFAULT_TTL_SECONDS)),
+            max_jobs=int(os.getenv("TREATMENT_JOB_MAX", DEFAULT_MAX_JOBS)),
+        )
+
+    def submit(self, result: Dict, language: str) -> str:
+        """Start generating the treatment for a detection result; call from the event loop"""
+        self._prune()
+        job_id = uuid.uuid4().hex
+        job = {
+            "status": "pending",
+            "created": time.time(),
+            "finished": None,
+            "treatment": None,
+            "error": None,
+            "done": asyncio.Event(),
+        }
+        self._jobs[job_id] = job
+        self.submitted += 1
+        job["task"] = asyncio.get_running_loop().create_task(self._run(job, result, language))
+        return job_id
+
+    async def _run(self, job: Dict, result: Dict, language: str) -> None:
+        start = time.perf_counter()
+        try:
+            job["treatment"] = await self.generate(result, language)
+            job["status"] = "done"
+            self.completed += 1
+        except asyncio.CancelledError:
+            job["status"], job["error"] = "failed", "cancelled"
+            self.failed += 1
+            raise
+        except Exception as e:
+            job["status"], job["error"] = "failed", str(e)
+            self.failed += 1
+        finally:
+            job["finished"] = time.time()
+            self._total_seconds += time.perf_counter() - start
+            job["done"].set()
+
+    def _prune(self) -> None:
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job["finished"] is not None and now - job["finished"] > self.ttl_seconds]:
+            del self._jobs[job_id]
+            self.expired += 1
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished"] is not None]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs + 1)]:
+            del self._jobs[job_id]
+            self.expired += 1
+
+    def _view(self, job_id: str, job: Dict) -> Dict:
+        view = {"treatment_id": job_id, "status": job["status"]}
+        if job["finished"] is not None:
+            view["seconds"] = round(job["finished"] - job["created"], 3)
+        if job["treatment"] is not None:
+            view.update(job["treatment"])
+        if job["error"] is not None:
+            view["error"] = job["error"]
+        return view
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Status (and treatment fields once done) of a job, or None if unknown or expired"""
+        job = self._jobs.get(job_id)
+        return self._view(job_id, job) if job is not None else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """get(), after waiting up to timeout seconds for the job to finish"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        try:
+            await asyncio.wait_for(job["done"].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._view(job_id, job)
+
+    async def stream(self, job_id: str) -> AsyncIterator[str]:
+        """
+        Server-Sent Events for a job: "summary" (quick_summary), "plan"
+        (treatment_plan, treatment_sections) and "done" (ai_generated,
+        treatment_cached), or "error"; comment lines keep the connection alive
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            yield sse_event("error", {"error": "Unknown or expired treatment_id"})
+            return
+        while not job["done"].is_set():
+            try:
+                await asyncio.wait_for(job["done"].wait(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+        treatment = job["treatment"]
+        if treatment is None:
+            yield sse_event("error", {"error": job["error"]})
+            return
+        yield sse_event("summary", {"quick_summary": treatment["quick_summary"]})
+        yield sse_event("plan", {"treatment_plan": treatment["treatment_plan"],
+                                 "treatment_sections": treatment["treatment_sections"]})
+        yield sse_event("done", {"ai_generated": treatment["ai_generated"],
+                                 "treatment_cached": treatment["treatment_cached"]})
+
+    def shutdown(self) -> None:
+        for job in self._jobs.values():
+            if not job["done"].is_set():
+                job["task"].cancel()
+
+    def stats(self) -> Dict:
+        finished = self.completed + self.failed
+        return {
+            "jobs": len(self._jobs),
+            "pending": sum(not job["done"].is_set() for job in self._jobs.values()),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+            "mean_seconds": round(self._total_seconds / finished, 3) if finished else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+        }
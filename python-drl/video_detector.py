@@ -0,0 +1,302 @@
+"""
+video_detector.py - Disease detection on drone and fixed-camera video
+
+Frames are decoded lazily: only one frame per min_interval is retrieved as
+a candidate, the others are just grabbed (never converted or copied), and a
+candidate is sampled only when its grayscale thumbnail differs enough from
+the last sampled frame, or when max_interval has passed. Sampled
+frames are letterboxed straight into a stacked input tensor and run through
+the detector batch_size at a time. Every sampled frame becomes one JSONL
+record; the last record is a per-video summary with the diagnoses
+deduplicated across frames into sightings (time segments).
+
+Usage (from python-drl/):
+    python video_detector.py flight.mp4 > frames.jsonl
+    python video_detector.py flight.mp4 --output frames.jsonl --treatment --language English
+"""
+
+import json
+import os
+import sys
+import time
+
+import cv2
+
+from disease_detector import (
+    DEFAULT_LANGUAGE,
+    DETECTOR_BATCH_SIZE,
+    DETECTOR_VARIANT,
+    StageTimer,
+    _get_executor,
+    build_result,
+    generate_treatment,
+    get_input_buffer,
+    infer_prepared,
+    prepare_array,
+    resolve_language,
+    resolve_model,
+    supports_batching,
+)
+
+DEFAULT_MIN_INTERVAL = 0.5    # seconds; at most 2 sampled frames per second
+DEFAULT_MAX_INTERVAL = 5.0    # seconds; sample at least this often, even on static footage
+DEFAULT_DIFF_THRESHOLD = 8.0  # mean absolute thumbnail difference (0-255) that counts as new content
+DEFAULT_SEGMENT_GAP = 2.0     # sightings of one diagnosis closer than this many max_intervals are merged
+
+THUMBNAIL_SIZE = (64, 36)
+
+
+def thumbnail(frame):
+    """Small grayscale copy used to compare frames"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def sample_frames(capture, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                  diff_threshold=DEFAULT_DIFF_THRESHOLD, stats=None):
+    """
+    Yield (frame index, seconds, BGR frame, difference) for the frames worth
+    running the detector on. difference is the mean absolute thumbnail
+    difference to the previous sampled frame (None for the first one).
+    stats, if given, is updated with frames read / candidates / sampled.
+    """
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    min_step = max(1, int(round(min_interval * fps)))
+    stats = stats if stats is not None else {}
+    stats.update(fps=round(fps, 3), frames=0, candidates=0, sampled=0)
+
+    index = -1
+    checked_index = None
+    last_index, last_thumbnail = None, None
+    while capture.grab():
+        index += 1
+        stats["frames"] += 1
+        if checked_index is not None and index - checked_index < min_step:
+            continue
+
+        ok, frame = capture.retrieve()
+        if not ok:
+            continue
+        checked_index = index
+        stats["candidates"] += 1
+        small = thumbnail(frame)
+        difference = None
+        if last_thumbnail is not None:
+            difference = float(cv2.absdiff(small, last_thumbnail).mean())
+            if difference < diff_threshold and (index - last_index) / fps < max_interval:
+                continue
+
+        last_index, last_thumbnail = index, small
+        stats["sampled"] += 1
+        yield index, index / fps, frame, difference
+
+
+def summarize_video(records, max_interval=DEFAULT_MAX_INTERVAL):
+    """
+    Diagnoses across the frame records, deduplicated: one entry per (crop,
+    disease) with frame counts, best confidence, worst severity and the time
+    segments it was seen in (sightings less than DEFAULT_SEGMENT_GAP *
+    max_interval apart are one segment)
+    """
+    gap = DEFAULT_SEGMENT_GAP * max_interval
+    diagnoses = {}
+    for record in records:
+        if "error" in record:
+            continue
+        key = (record["crop_type"], record["disease_name"])
+        diagnosis = diagnoses.setdefault(key, {
+            "crop_type": record["crop_type"],
+            "disease_name": record["disease_name"],
+            "disease_status": record["disease_status"],
+            "frames": 0,
+            "first_seen": record["time"],
+            "last_seen": record["time"],
+            "max_confidence": 0.0,
+            "max_severity": record["severity"],
+            "best_frame": record["frame"],
+            "segments": []
+        })
+        diagnosis["frames"] += 1
+        diagnosis["last_seen"] = record["time"]
+        if record["confidence"] > diagnosis["max_confidence"]:
+            diagnosis["max_confidence"] = record["confidence"]
+            diagnosis["best_frame"] = record["frame"]
+        if record["severity"]["score"] > diagnosis["max_severity"]["score"]:
+            diagnosis["max_severity"] = record["severity"]
+
+        segments = diagnosis["segments"]
+        if segments and record["time"] - segments[-1]["end"] <= gap:
+            segments[-1]["end"] = record["time"]
+            segments[-1]["frames"] += 1
+        else:
+            segments.append({"start": record["time"], "end": record["time"], "frames": 1})
+
+    detected = sum("error" not in record for record in records)
+    return {
+        "detected_frames": detected,
+        "diseased_frames": sum(record.get("disease_status") == "diseased" for record in records),
+        "diagnoses": sorted(diagnoses.values(), key=lambda d: (-d["frames"], -d["max_severity"]["score"]))
+    }
+
+
+def detect_video(video_path, confidence_threshold=0.20, return_all=False, variant=None, input_size=None,
+                 batch_size=None, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 diff_threshold=DEFAULT_DIFF_THRESHOLD, treatment=False, language=None, stop=None):
+    """
+    Detect diseases along a video file
+
+    Yields one {"type": "frame", "frame", "time", "difference", ...} record
+    per sampled frame (detection fields as in detect_disease_bytes, without
+    treatment, or an "error"), then one {"type": "summary", ...} record. With
+    treatment, every diagnosis in the summary gets its treatment report,
+    prompted with its most confident frame. Invalid options or an unreadable
+    video yield a single {"type": "summary", "error": ...} record. stop, if
+    given, is polled before every sampled frame; once it returns True
+    decoding ends and the summary is {"type": "summary", "error": "Cancelled"}.
+    """
+    try:
+        pool, input_size = resolve_model(variant, input_size)
+        language = resolve_language(language)
+    except ValueError as e:
+        yield {"type": "summary", "error": str(e)}
+        return
+    except Exception as e:
+        yield {"type": "summary", "error": f"Model not loaded: {e}"}
+        return
+
+    capture = cv2.VideoCapture(str(video_path))
+    if not capture.isOpened():
+        yield {"type": "summary", "error": "Could not open video. Please upload a valid MP4, MOV or AVI file."}
+        return
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    executor = _get_executor()
+    batch_size = max(1, batch_size or DETECTOR_BATCH_SIZE)
+    batched = supports_batching(pool)
+    sampling = {}
+    records = []
+    best = {}  # (crop, disease) -> most confident frame result, for treatment
+
+    def run_batch(frames):
+        input_data = get_input_buffer(input_size, len(frames))
+        prepared = list(executor.map(lambda item: prepare_array(item[1][2], input_size, input_data[item[0]]),
+                                     enumerate(frames)))
+        timer.lap("preprocess")
+        candidates = infer_prepared(pool, input_data, prepared, confidence_threshold, batched)
+        timer.lap("inference")
+        batch_records = []
+        for (index, seconds, _, difference), item, found in zip(frames, prepared, candidates):
+            result = build_result(found, item, return_all)
+            result.pop("success", None)
+            record = {"type": "frame", "frame": index, "time": round(seconds, 3),
+                      "difference": None if difference is None else round(difference, 2), **result}
+            if "error" not in result:
+                key = (result["crop_type"], result["disease_name"])
+                if key not in best or result["confidence"] > best[key]["confidence"]:
+                    best[key] = result
+            batch_records.append(record)
+        timer.lap("postprocess")
+        return batch_records
+
+    try:
+        frames = []
+        for sample in sample_frames(capture, min_interval, max_interval, diff_threshold, sampling):
+            if stop is not None and stop():
+                yield {"type": "summary", "error": "Cancelled"}
+                return
+            frames.append(sample)
+            if len(frames) == batch_size:
+                timer.lap("decode")
+                for record in run_batch(frames):
+                    records.append(record)
+                    yield record
+                frames = []
+        timer.lap("decode")
+        if frames:
+            for record in run_batch(frames):
+                records.append(record)
+                yield record
+    finally:
+        capture.release()
+
+    summary = summarize_video(records, max_interval)
+    if treatment:
+        for diagnosis in summary["diagnoses"]:
+            result = best[(diagnosis["crop_type"], diagnosis["disease_name"])]
+            diagnosis["treatment"] = generate_treatment(result, language)
+        timer.lap("treatment")
+
+    elapsed = time.perf_counter() - start
+    yield {
+        "type": "summary",
+        "video": {
+            "fps": sampling.get("fps"),
+            "frames": sampling.get("frames", 0),
+            "duration_seconds": round(sampling.get("frames", 0) / sampling["fps"], 2) if sampling.get("fps") else 0.0,
+            "sampled_frames": sampling.get("sampled", 0),
+            "skipped_similar": sampling.get("candidates", 0) - sampling.get("sampled", 0)
+        },
+        **summary,
+        "model": {"variant": variant or DETECTOR_VARIANT, "input_size": input_size, "batched_inference": batched},
+        "frames_per_second": round(sampling.get("frames", 0) / elapsed, 1) if elapsed else 0.0,
+        "timings_ms": timer.timings()
+    }
+
+
+def detect_video_file(video_path, output_path, cancel_path=None, **options):
+    """
+    Run detect_video, appending each record to output_path as one JSON line
+    (flushed as it is produced, so it can be tailed); returns the summary.
+    Creating cancel_path stops the run after the current sampled frame.
+    """
+    stop = (lambda: os.path.exists(cancel_path)) if cancel_path else None
+    if stop is not None and stop():
+        return {"type": "summary", "error": "Cancelled"}
+    summary = None
+    with open(output_path, "a", encoding="utf-8") as output:
+        for record in detect_video(video_path, stop=stop, **options):
+            if record["type"] == "summary":
+                summary = record
+                if "error" in summary:
+                    break
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect crop diseases along a video")
+    parser.add_argument("video", help="Video file (MP4, MOV, AVI, ...)")
+    parser.add_argument("--output", default=None, help="JSONL output file (default: stdout)")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Confidence threshold")
+    parser.add_argument("--return-all", action="store_true", help="Every detection per frame, not only the best")
+    parser.add_argument("--variant", default=None, help="Model variant (e.g. fp32, int8)")
+    parser.add_argument("--input-size", type=int, default=None, help="Model input size (320/480/640)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Frames per inference call")
+    parser.add_argument("--min-interval", type=float, default=DEFAULT_MIN_INTERVAL,
+                        help="Minimum seconds between sampled frames")
+    parser.add_argument("--max-interval", type=float, default=DEFAULT_MAX_INTERVAL,
+                        help="Maximum seconds between sampled frames")
+    parser.add_argument("--diff-threshold", type=float, default=DEFAULT_DIFF_THRESHOLD,
+                        help="Thumbnail difference (0-255) needed to sample a frame early")
+    parser.add_argument("--treatment", action="store_true", help="Treatment report per diagnosis in the summary")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, help="Treatment language")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in detect_video(
+                args.video, args.threshold, args.return_all, args.variant, args.input_size, args.batch_size,
+                args.min_interval, args.max_interval, args.diff_threshold, args.treatment, args.language):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            if record["type"] == "summary":
+                print(f"✅ {record.get('video', {}).get('sampled_frames', 0)} frames sampled, "
+                      f"{len(record.get('diagnoses', []))} diagnoses"
+                      if "error" not in record else f"❌ {record['error']}", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()